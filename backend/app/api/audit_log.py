@@ -9,6 +9,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 
 from app.db.connection import get_db
 from app.schemas.audit_log import AuditLogEntrySchema, AuditLogListSchema
+from app.services.keyset import approx_counts, fetch_keyset_page, parse_cursor
 
 router = APIRouter()
 
@@ -69,14 +70,26 @@ def list_audit_log(
     to_ts: str | None = Query(None, alias="to"),
     sort: str = Query("created_at"),
     order: str = Query("desc"),
+    cursor: str | None = Query(None),
+    with_total: bool = Query(True),
 ) -> AuditLogListSchema:
-    """List audit log entries (only for iterations owned by current user)."""
+    """
+    List audit log entries (only for iterations owned by current user).
+    sort=created_at pages by keyset: pass next_cursor from the previous page as cursor.
+    """
     uid = get_current_user_id(request)
     if sort not in ("created_at", "id", "event_type"):
         sort = "created_at"
     if order not in ("asc", "desc"):
         order = "desc"
     order_sql = "ASC" if order == "asc" else "DESC"
+    try:
+        after = parse_cursor(cursor, sort, order)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
 
     base = (
         "FROM audit_log a "
@@ -101,18 +114,32 @@ def list_audit_log(
         base += " AND a.created_at <= ?"
         params.append(to_ts)
 
-    total_row = db.execute(
-        f"SELECT COUNT(*) AS total {base}",
-        params,
-    ).fetchone()
-    total = total_row["total"] if total_row else 0
+    total = approx_counts.count(db, base, params, "a.id") if with_total else None
 
     offset = (page - 1) * page_size
-    params.extend([page_size, offset])
-    rows = db.execute(
-        f"SELECT a.id, a.iteration_id, a.event_type, a.payload, a.user_id, a.created_at {base} ORDER BY a.{sort} {order_sql} LIMIT ? OFFSET ?",
-        params,
-    ).fetchall()
+    select_sql = "SELECT a.id, a.iteration_id, a.event_type, a.payload, a.user_id, a.created_at"
+    next_cursor = None
+    if sort == "created_at":
+        rows, next_cursor = fetch_keyset_page(
+            db,
+            select_sql,
+            base,
+            params,
+            created_at_col="a.created_at",
+            id_col="a.id",
+            order=order,
+            page_size=page_size,
+            cursor=after,
+            offset=offset,
+        )
+    else:
+        params.extend([page_size, offset])
+        rows = db.execute(
+            f"{select_sql} {base} ORDER BY a.{sort} {order_sql} LIMIT ? OFFSET ?",
+            params,
+        ).fetchall()
     items = [AuditLogEntrySchema(**_row_to_entry(r)) for r in rows]
-    return AuditLogListSchema(items=items, total=total, page=page, page_size=page_size)
+    return AuditLogListSchema(
+        items=items, total=total, page=page, page_size=page_size, next_cursor=next_cursor
+    )
 
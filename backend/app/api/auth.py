@@ -3,13 +3,13 @@ import sqlite3
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
-from app.db.connection import get_db
+from app.db.connection import get_read_db
 from app.schemas.auth import (
     AuthLoginCommandSchema,
     AuthLoginResponseSchema,
     AuthUserSchema,
 )
-from app.auth.session import load_session_settings
+from app.auth.session import get_session_settings
 from app.services.auth import create_session_or_token, get_user_by_login, verify_password
 
 logger = logging.getLogger(__name__)
@@ -25,7 +25,7 @@ router = APIRouter()
 def login(
     payload: AuthLoginCommandSchema,
     response: Response,
-    db: sqlite3.Connection = Depends(get_db),
+    db: sqlite3.Connection = Depends(get_read_db),
 ) -> AuthLoginResponseSchema:
     """
     Authenticate user by login/password.
@@ -64,7 +64,7 @@ def login(
     auth_user = AuthUserSchema(id=user["id"], login=user["login"])
     try:
         token = create_session_or_token({"id": user["id"], "login": user["login"]})
-        settings = load_session_settings()
+        settings = get_session_settings()
         response.set_cookie(
             key=settings.cookie_name,
             value=token,
@@ -87,7 +87,7 @@ def login(
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
 def logout(response: Response) -> Response:
     """Clear the auth session cookie. Requires valid session (no body on success)."""
-    settings = load_session_settings()
+    settings = get_session_settings()
     response.delete_cookie(
         key=settings.cookie_name,
         path="/",
@@ -6,15 +6,36 @@ import json
 import logging
 import os
 import sqlite3
-import uuid
+from collections.abc import Callable
+from contextlib import AbstractContextManager
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 
-from app.db.connection import get_db
+from app.db.connection import get_db, get_db_factory
 from app.schemas.images import ImageSchema, PagedImagesSchema, ImageUpdateSchema
 from app.schemas.audit_log import AuditLogEntrySchema, AuditLogListSchema
+from app.services.image_meta import probe_image_file
+from app.services.image_variants import (
+    IMAGE_SIZE_FULL,
+    IMAGE_SIZES,
+    get_variant_cache,
+    needs_variant,
+    render_variant,
+    variant_format,
+    variant_key,
+)
+from app.services.keyset import approx_counts, fetch_keyset_page, parse_cursor
+from app.services.upload_store import (
+    UploadTooLarge,
+    content_addressed_name,
+    discard_staged,
+    get_max_upload_bytes,
+    place_staged,
+    release_file,
+    stage_upload,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +67,8 @@ def _row_to_image(row: sqlite3.Row) -> dict:
         "id": row["id"],
         "storage_path": row["storage_path"],
         "width_mm": row["width_mm"],
+        "width_px": row["width_px"],
+        "height_px": row["height_px"],
         "created_by": row["created_by"],
         "created_at": row["created_at"],
     }
@@ -59,8 +82,13 @@ def list_images(
     page_size: int = 20,
     sort: str = "created_at",
     order: str = "desc",
+    cursor: str | None = None,
+    with_total: bool = True,
 ) -> PagedImagesSchema:
-    """List images for the current user (paginated)."""
+    """
+    List images for the current user (paginated).
+    sort=created_at pages by keyset: pass next_cursor from the previous page as cursor.
+    """
     if page < 1:
         page = 1
     if page_size < 1:
@@ -71,25 +99,47 @@ def list_images(
         sort = "created_at"
     if order not in ("asc", "desc"):
         order = "desc"
+    try:
+        after = parse_cursor(cursor, sort, order)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
 
     user_id = get_current_user_id(request)
     offset = (page - 1) * page_size
 
-    total_row = db.execute(
-        "SELECT COUNT(*) AS total FROM images WHERE created_by = ?",
-        (user_id,),
-    ).fetchone()
-    total = total_row["total"] if total_row else 0
-
-    cursor = db.execute(
-        f"SELECT id, storage_path, width_mm, created_by, created_at "
-        f"FROM images WHERE created_by = ? ORDER BY {sort} {order} LIMIT ? OFFSET ?",
-        (user_id, page_size, offset),
-    )
-    rows = cursor.fetchall()
+    base = "FROM images WHERE created_by = ?"
+    params: list[object] = [user_id]
+    # Exact count (images are deleted): a range scan of the (created_by, created_at) index
+    total = db.execute(f"SELECT COUNT(*) {base}", params).fetchone()[0] if with_total else None
+
+    select_sql = "SELECT id, storage_path, width_mm, width_px, height_px, created_by, created_at"
+    next_cursor = None
+    if sort == "created_at":
+        rows, next_cursor = fetch_keyset_page(
+            db,
+            select_sql,
+            base,
+            params,
+            created_at_col="created_at",
+            id_col="id",
+            order=order,
+            page_size=page_size,
+            cursor=after,
+            offset=offset,
+        )
+    else:
+        rows = db.execute(
+            f"{select_sql} {base} ORDER BY {sort} {order} LIMIT ? OFFSET ?",
+            (user_id, page_size, offset),
+        ).fetchall()
     items = [_row_to_image(row) for row in rows]
 
-    return PagedImagesSchema(items=items, total=total, page=page, page_size=page_size)
+    return PagedImagesSchema(
+        items=items, total=total, page=page, page_size=page_size, next_cursor=next_cursor
+    )
 
 
 def _get_upload_dir() -> Path:
@@ -104,11 +154,14 @@ def _get_upload_dir() -> Path:
 @router.post("", status_code=status.HTTP_201_CREATED, response_model=ImageSchema)
 def create_image(
     request: Request,
-    db: sqlite3.Connection = Depends(get_db),
+    db_factory: Callable[[], AbstractContextManager[sqlite3.Connection]] = Depends(get_db_factory),
     file: UploadFile = File(...),
     width_mm: float = Form(...),
 ) -> ImageSchema:
-    """Upload image (PNG/JPG) and set scale (width_mm)."""
+    """
+    Upload image (PNG/JPG) and set scale (width_mm); pixel size and content hash are stored with it.
+    The body is streamed to disk (bounded by UPLOAD_MAX_BYTES) and stored content-addressed.
+    """
     if width_mm <= 0:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -131,12 +184,15 @@ def create_image(
 
     user_id = get_current_user_id(request)
     upload_dir = _get_upload_dir()
-    unique_name = f"{uuid.uuid4().hex}{suffix}"
-    storage_path = f"uploads/{unique_name}"
-    dest_path = upload_dir / unique_name
+    max_bytes = get_max_upload_bytes()
 
     try:
-        contents = file.file.read()
+        staged = stage_upload(file.file, upload_dir, max_bytes)
+    except UploadTooLarge as exc:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File too large (max {max_bytes} bytes)",
+        ) from exc
     except Exception as exc:
         logger.exception("Failed to read uploaded file.")
         raise HTTPException(
@@ -144,44 +200,71 @@ def create_image(
             detail="Failed to read file",
         ) from exc
 
-    try:
-        dest_path.write_bytes(contents)
-    except Exception as exc:
-        logger.exception("Failed to write file to %s", dest_path)
+    meta = probe_image_file(staged.temp_path, staged.content_sha256)
+    if meta is None:
+        discard_staged(staged)
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to save file",
-        ) from exc
-
-    try:
-        cursor = db.execute(
-            "INSERT INTO images (storage_path, width_mm, created_by, created_at) "
-            "VALUES (?, ?, ?, datetime('now'))",
-            (storage_path, width_mm, user_id),
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid image file",
         )
-        db.commit()
-        row_id = cursor.lastrowid
-    except Exception as exc:
-        logger.exception("Failed to insert image row.")
+
+    # Content-addressed: identical uploads share one file (reference count = rows using it)
+    unique_name = content_addressed_name(meta.content_sha256, suffix)
+    storage_path = f"uploads/{unique_name}"
+    dest_path = upload_dir / unique_name
+
+    # Writer connection only for the write transaction (the body is already staged and hashed)
+    with db_factory() as db:
         try:
-            dest_path.unlink(missing_ok=True)
-        except OSError:
-            pass
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to save image record",
-        ) from exc
+            # Write lock first: serializes with delete_image releasing the same file
+            db.execute("BEGIN IMMEDIATE")
+            cursor = db.execute(
+                "INSERT INTO images (storage_path, width_mm, width_px, height_px, content_sha256, created_by, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, datetime('now'))",
+                (storage_path, width_mm, meta.width_px, meta.height_px, meta.content_sha256, user_id),
+            )
+            row_id = cursor.lastrowid
+        except Exception as exc:
+            db.rollback()
+            discard_staged(staged)
+            logger.exception("Failed to insert image row.")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to save image record",
+            ) from exc
 
-    row = db.execute(
-        "SELECT id, storage_path, width_mm, created_by, created_at FROM images WHERE id = ?",
-        (row_id,),
-    ).fetchone()
-    if not row:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Image not found after insert",
-        )
-    return ImageSchema(**_row_to_image(row))
+        try:
+            place_staged(staged, dest_path)
+        except Exception as exc:
+            db.rollback()
+            discard_staged(staged)
+            logger.exception("Failed to write file to %s", dest_path)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to save file",
+            ) from exc
+
+        try:
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            _release_unreferenced_file(db, upload_dir, storage_path, meta.content_sha256)
+            logger.exception("Failed to insert image row.")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to save image record",
+            ) from exc
+
+        row = db.execute(
+            "SELECT id, storage_path, width_mm, width_px, height_px, created_by, created_at FROM images WHERE id = ?",
+            (row_id,),
+        ).fetchone()
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Image not found after insert",
+            )
+        return ImageSchema(**_row_to_image(row))
 
 
 @router.get("/{image_id:int}", response_model=ImageSchema)
@@ -193,7 +276,7 @@ def get_image(
     """Get one image by id (must belong to current user)."""
     user_id = get_current_user_id(request)
     row = db.execute(
-        "SELECT id, storage_path, width_mm, created_by, created_at FROM images WHERE id = ? AND created_by = ?",
+        "SELECT id, storage_path, width_mm, width_px, height_px, created_by, created_at FROM images WHERE id = ? AND created_by = ?",
         (image_id, user_id),
     ).fetchone()
     if not row:
@@ -243,8 +326,13 @@ def list_image_audit_log(
     to_ts: str | None = Query(None, alias="to"),
     sort: str = Query("created_at"),
     order: str = Query("desc"),
+    cursor: str | None = Query(None),
+    with_total: bool = Query(True),
 ) -> AuditLogListSchema:
-    """List audit log entries for all iterations of this image (image must belong to current user)."""
+    """
+    List audit log entries for all iterations of this image (image must belong to current user).
+    sort=created_at pages by keyset: pass next_cursor from the previous page as cursor.
+    """
     user_id = get_current_user_id(request)
     row = db.execute(
         "SELECT id FROM images WHERE id = ? AND created_by = ?",
@@ -260,6 +348,13 @@ def list_image_audit_log(
     if order not in ("asc", "desc"):
         order = "desc"
     order_sql = "ASC" if order == "asc" else "DESC"
+    try:
+        after = parse_cursor(cursor, sort, order)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
 
     base = (
         "FROM audit_log a "
@@ -277,32 +372,56 @@ def list_image_audit_log(
         base += " AND a.created_at <= ?"
         params.append(to_ts)
 
-    total_row = db.execute(
-        f"SELECT COUNT(*) AS total {base}",
-        params,
-    ).fetchone()
-    total = total_row["total"] if total_row else 0
+    total = approx_counts.count(db, base, params, "a.id") if with_total else None
 
     offset = (page - 1) * page_size
-    params.extend([page_size, offset])
-    rows = db.execute(
-        f"SELECT a.id, a.iteration_id, a.event_type, a.payload, a.user_id, a.created_at {base} ORDER BY a.{sort} {order_sql} LIMIT ? OFFSET ?",
-        params,
-    ).fetchall()
+    select_sql = "SELECT a.id, a.iteration_id, a.event_type, a.payload, a.user_id, a.created_at"
+    next_cursor = None
+    if sort == "created_at":
+        rows, next_cursor = fetch_keyset_page(
+            db,
+            select_sql,
+            base,
+            params,
+            created_at_col="a.created_at",
+            id_col="a.id",
+            order=order,
+            page_size=page_size,
+            cursor=after,
+            offset=offset,
+        )
+    else:
+        params.extend([page_size, offset])
+        rows = db.execute(
+            f"{select_sql} {base} ORDER BY a.{sort} {order_sql} LIMIT ? OFFSET ?",
+            params,
+        ).fetchall()
     items = [AuditLogEntrySchema(**_audit_row_to_entry(r)) for r in rows]
-    return AuditLogListSchema(items=items, total=total, page=page, page_size=page_size)
+    return AuditLogListSchema(
+        items=items, total=total, page=page, page_size=page_size, next_cursor=next_cursor
+    )
 
 
 @router.get("/{image_id:int}/file")
 def get_image_file(
     image_id: int,
     request: Request,
-    db: sqlite3.Connection = Depends(get_db),
+    db: sqlite3.Connection = Depends(get_db, scope="function"),
+    size: str = Query(IMAGE_SIZE_FULL),
 ):
-    """Serve image file (PNG/JPG). Must belong to current user."""
+    """
+    Serve image file (PNG/JPG). Must belong to current user.
+    size=thumb|medium serves a downscaled variant (generated on first request, cached on disk).
+    The DB connection goes back to the pool before the file is sent (function-scoped dependency).
+    """
+    if size not in IMAGE_SIZES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"size must be one of: {', '.join(IMAGE_SIZES)}",
+        )
     user_id = get_current_user_id(request)
     row = db.execute(
-        "SELECT id, storage_path FROM images WHERE id = ? AND created_by = ?",
+        "SELECT id, storage_path, width_px, height_px, content_sha256 FROM images WHERE id = ? AND created_by = ?",
         (image_id, user_id),
     ).fetchone()
     if not row:
@@ -319,7 +438,31 @@ def get_image_file(
         )
     suffix = path.suffix.lower()
     media_type = "image/png" if suffix == ".png" else "image/jpeg"
-    return FileResponse(path, media_type=media_type)
+    if not needs_variant(size, row["width_px"], row["height_px"]):
+        return FileResponse(path, media_type=media_type)
+
+    variant_cache = get_variant_cache(upload_dir)
+    output_format = variant_format(path)
+    cache_key = variant_key(path, size, row["content_sha256"])
+    cached_path = variant_cache.get(cache_key, output_format)
+    if cached_path is not None:
+        return FileResponse(cached_path, media_type=media_type)
+    try:
+        content = render_variant(path, size)
+    except Exception as exc:
+        logger.exception("Failed to render %s variant of %s", size, path)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to render image variant",
+        ) from exc
+    if content is None:
+        return FileResponse(path, media_type=media_type)
+    try:
+        variant_cache.put(cache_key, output_format, content)
+    except OSError:
+        logger.warning("Image variant cache not writable; serving rendered bytes.", exc_info=True)
+    # The rendered bytes are in memory already: serve them, not the file (it could be evicted meanwhile)
+    return Response(content=content, media_type=media_type)
 
 
 @router.patch("/{image_id:int}", response_model=ImageSchema)
@@ -347,27 +490,64 @@ def update_image(
             detail="Image not found",
         )
     row = db.execute(
-        "SELECT id, storage_path, width_mm, created_by, created_at FROM images WHERE id = ?",
+        "SELECT id, storage_path, width_mm, width_px, height_px, created_by, created_at FROM images WHERE id = ?",
         (image_id,),
     ).fetchone()
     return ImageSchema(**_row_to_image(row))
 
 
+def _release_unreferenced_file(
+    db: sqlite3.Connection, upload_dir: Path, storage_path: str, content_sha256: str | None
+) -> None:
+    """
+    Remove a stored file whose last row is already gone (called only after that change is final).
+    The check and unlink run under BEGIN IMMEDIATE so a concurrent upload of the same content
+    cannot reference the file in between. A failure only leaves an unreferenced file behind.
+    """
+    try:
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            release_file(db, upload_dir, storage_path, content_sha256)
+        finally:
+            db.rollback()
+    except (OSError, sqlite3.Error):
+        logger.exception("Failed to remove stored file %s", storage_path)
+
+
 @router.delete("/{image_id:int}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_image(
     image_id: int,
     request: Request,
     db: sqlite3.Connection = Depends(get_db),
 ) -> None:
-    """Delete image (cascades to masks, iterations, spots)."""
+    """
+    Delete image (cascades to masks, iterations, spots).
+    The stored file is removed after the delete is committed, when no other image row references
+    the same content.
+    """
     user_id = get_current_user_id(request)
-    cursor = db.execute(
-        "DELETE FROM images WHERE id = ? AND created_by = ?",
+    row = db.execute(
+        "SELECT storage_path, content_sha256 FROM images WHERE id = ? AND created_by = ?",
         (image_id, user_id),
-    )
-    db.commit()
+    ).fetchone()
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found",
+        )
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = db.execute(
+            "DELETE FROM images WHERE id = ? AND created_by = ?",
+            (image_id, user_id),
+        )
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
     if cursor.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Image not found",
         )
+    _release_unreferenced_file(db, _get_upload_dir(), row["storage_path"], row["content_sha256"])
@@ -1,4 +1,4 @@
-"""Iterations by id API: GET, PATCH, DELETE /api/iterations/{id}; GET spots, GET export."""
+"""Iterations by id API: GET, PATCH, DELETE /api/iterations/{id}; GET spots, GET validation, GET export."""
 
 from __future__ import annotations
 
@@ -8,11 +8,11 @@ import json
 import logging
 import os
 import sqlite3
+from collections.abc import Iterator
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
-from fastapi.responses import Response
-from PIL import Image, ImageDraw
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 from app.db.connection import get_db
 from app.schemas.audit_log import AuditLogEntrySchema, AuditLogListSchema
@@ -20,8 +20,29 @@ from app.schemas.iterations import (
     IterationExportJsonSchema,
     IterationSchema,
     IterationUpdateSchema,
+    IterationValidationSchema,
 )
-from app.schemas.spots import SpotSchema, SpotsListSchema
+from app.schemas.spots import SpotsListSchema
+from app.services.export_cache import get_export_cache
+from app.services.http_cache import (
+    cache_control_for,
+    cache_headers,
+    etag_matches,
+    make_etag,
+    not_modified,
+)
+from app.services.keyset import approx_counts, fetch_keyset_page, parse_cursor
+from app.services.mask_geometry import parse_mask_vertices
+from app.services.overlay_render import render_overlay
+from app.services.plan_validation import validate_plan_spots
+from app.services.spot_store import (
+    iter_spots,
+    load_spot_arrays,
+    load_spot_xy,
+    load_spots,
+    spot_storage_of,
+)
+from app.services.spot_wire import SPOTS_BIN_MEDIA_TYPE, encode_spots_bin
 
 logger = logging.getLogger(__name__)
 
@@ -92,21 +113,6 @@ def _get_iteration_owned_by_user(
     ).fetchone()
 
 
-def _row_to_spot(row: sqlite3.Row) -> dict:
-    return {
-        "id": row["id"],
-        "iteration_id": row["iteration_id"],
-        "sequence_index": row["sequence_index"],
-        "x_mm": row["x_mm"],
-        "y_mm": row["y_mm"],
-        "theta_deg": row["theta_deg"],
-        "t_mm": row["t_mm"],
-        "mask_id": row["mask_id"],
-        "component_id": row["component_id"],
-        "created_at": row["created_at"],
-    }
-
-
 @router.get("/{iteration_id:int}", response_model=IterationSchema)
 def get_iteration(
     iteration_id: int,
@@ -124,14 +130,23 @@ def get_iteration(
     return IterationSchema(**_row_to_iteration(row))
 
 
-@router.get("/{iteration_id:int}/spots", response_model=None)
+@router.get(
+    "/{iteration_id:int}/spots",
+    response_model=None,
+    responses={200: {"model": SpotsListSchema}},
+)
 def get_iteration_spots(
     iteration_id: int,
     request: Request,
     db: sqlite3.Connection = Depends(get_db),
-    format: str = Query("json", pattern="^(json|csv)$"),
-) -> SpotsListSchema | Response:
-    """Get spots for iteration (ordered by sequence_index). JSON or CSV."""
+    format: str | None = Query(None, pattern="^(json|csv|bin)$"),
+) -> Response:
+    """
+    Get spots for iteration (ordered by sequence_index). JSON, CSV or binary (format=bin,
+    or Accept: application/octet-stream without format; layout in app.services.spot_wire).
+    JSON (SpotsListSchema shape) and CSV are streamed in chunks read from the cursor.
+    Strong ETag per format; If-None-Match -> 304.
+    """
     user_id = get_current_user_id(request)
     row = _get_iteration_owned_by_user(db, iteration_id, user_id)
     if row is None:
@@ -139,45 +154,123 @@ def get_iteration_spots(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Iteration not found",
         )
-    rows = db.execute(
-        "SELECT id, iteration_id, sequence_index, x_mm, y_mm, theta_deg, t_mm, "
-        "mask_id, component_id, created_at FROM spots WHERE iteration_id = ? "
-        "ORDER BY sequence_index ASC",
-        (iteration_id,),
-    ).fetchall()
-    items = [SpotSchema(**_row_to_spot(r)) for r in rows]
-    if format == "csv":
-        params = _parse_params_snapshot(row["params_snapshot"])
-        buf = io.StringIO()
-        if params:
-            if params.get("algorithm_mode") is not None:
-                buf.write(f"# algorithm_mode={params['algorithm_mode']}\n")
-            if params.get("grid_spacing_mm") is not None:
-                buf.write(f"# grid_spacing_mm={params['grid_spacing_mm']}\n")
-        writer = csv.writer(buf)
-        writer.writerow(
-            ["sequence_index", "theta_deg", "t_mm", "x_mm", "y_mm", "mask_id", "component_id"]
-        )
-        for s in items:
-            writer.writerow(
-                [
-                    s.sequence_index,
-                    s.theta_deg,
-                    s.t_mm,
-                    s.x_mm,
-                    s.y_mm,
-                    s.mask_id if s.mask_id is not None else "",
-                    s.component_id if s.component_id is not None else "",
-                ]
-            )
+    if format is None:
+        accept = request.headers.get("accept", "")
+        format = "bin" if SPOTS_BIN_MEDIA_TYPE in accept else "json"
+    # Spot values never change after create_iteration: id + created_at + count identify them; the
+    # storage format is included because ids differ (block spots get synthetic ids) and
+    # scripts/migrate_spots_to_blocks.py converts rows to blocks under immutable responses
+    etag = make_etag(
+        "spots",
+        iteration_id,
+        row["created_at"],
+        row["spots_count"],
+        spot_storage_of(db, iteration_id),
+        format,
+    )
+    headers = cache_headers(etag, cache_control_for(row["status"], immutable=True), vary="Accept")
+    if etag_matches(request, etag):
+        return not_modified(headers)
+    if format == "bin":
+        sequence_index, spots = load_spot_arrays(db, iteration_id)
         return Response(
-            content=buf.getvalue(),
+            content=encode_spots_bin(iteration_id, sequence_index, spots),
+            media_type=SPOTS_BIN_MEDIA_TYPE,
+            headers=headers,
+        )
+    chunks = iter_spots(db, iteration_id)
+    if format == "csv":
+        headers["Content-Disposition"] = f"attachment; filename=iteration-{iteration_id}-spots.csv"
+        return StreamingResponse(
+            _stream_spots_csv(_parse_params_snapshot(row["params_snapshot"]), chunks),
             media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename=iteration-{iteration_id}-spots.csv"
-            },
+            headers=headers,
         )
-    return SpotsListSchema(items=items)
+    return StreamingResponse(_stream_spots_json(chunks), media_type="application/json", headers=headers)
+
+
+def _stream_spots_json(chunks: Iterator[list[dict]]) -> Iterator[str]:
+    """SpotsListSchema JSON ({"items": [...]}) emitted one chunk of spots at a time."""
+    yield '{"items":['
+    first = True
+    for chunk in chunks:
+        text = ",".join(json.dumps(s, separators=(",", ":")) for s in chunk)
+        yield text if first else "," + text
+        first = False
+    yield "]}"
+
+
+def _stream_spots_csv(params: dict | None, chunks: Iterator[list[dict]]) -> Iterator[str]:
+    """Spots CSV (comment lines with plan params, header, rows) emitted one chunk at a time."""
+    buf = io.StringIO()
+    if params:
+        if params.get("algorithm_mode") is not None:
+            buf.write(f"# algorithm_mode={params['algorithm_mode']}\n")
+        if params.get("grid_spacing_mm") is not None:
+            buf.write(f"# grid_spacing_mm={params['grid_spacing_mm']}\n")
+    writer = csv.writer(buf)
+    writer.writerow(
+        ["sequence_index", "theta_deg", "t_mm", "x_mm", "y_mm", "mask_id", "component_id"]
+    )
+    yield buf.getvalue()
+    for chunk in chunks:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(
+            [
+                s["sequence_index"],
+                s["theta_deg"],
+                s["t_mm"],
+                s["x_mm"],
+                s["y_mm"],
+                s["mask_id"] if s["mask_id"] is not None else "",
+                s["component_id"] if s["component_id"] is not None else "",
+            ]
+            for s in chunk
+        )
+        yield buf.getvalue()
+
+
+@router.get("/{iteration_id:int}/validation", response_model=IterationValidationSchema)
+def get_iteration_validation(
+    iteration_id: int,
+    request: Request,
+    db: sqlite3.Connection = Depends(get_db),
+) -> IterationValidationSchema:
+    """
+    Re-validate stored spots against the image's current masks.
+    Spots and mask vertices are both in top-left mm, so no conversion is needed.
+    """
+    user_id = get_current_user_id(request)
+    row = _get_iteration_owned_by_user(db, iteration_id, user_id)
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Iteration not found",
+        )
+    params = _parse_params_snapshot(row["params_snapshot"]) or {}
+    spot_diameter_mm = float(params.get("spot_diameter_um") or 300.0) / 1000.0
+    spot_xy_mm = load_spot_xy(db, iteration_id)
+    mask_rows = db.execute(
+        "SELECT vertices FROM masks WHERE image_id = ?",
+        (row["image_id"],),
+    ).fetchall()
+    # Same parsing as planning: {x, y} or [x, y] points; unusable masks are skipped
+    mask_vertices_list = [
+        verts for mr in mask_rows if (verts := parse_mask_vertices(mr["vertices"])) is not None
+    ]
+    validation = validate_plan_spots(
+        spot_xy_mm,
+        mask_vertices_list,
+        spot_diameter_mm * 1.05,
+    )
+    return IterationValidationSchema(
+        iteration_id=iteration_id,
+        spots_count=validation.spots_count,
+        spots_outside_mask_count=validation.spots_outside_mask_count,
+        overlap_count=validation.overlap_count,
+        plan_valid=validation.plan_valid,
+    )
 
 
 def _get_upload_dir() -> Path:
@@ -195,39 +288,28 @@ def _render_export_image(
     mask_vertices_list: list[list[tuple[float, float]]],
     spot_xy_mm: list[tuple[float, float]],
     output_format: str,
+    max_px: int | None = None,
 ) -> bytes:
-    """Draw masks and spots on image, return PNG or JPEG bytes."""
-    img = Image.open(image_path).convert("RGB")
-    w, h = img.size
-    if width_mm <= 0:
-        scale = 1.0
-    else:
-        scale = w / width_mm
-    draw = ImageDraw.Draw(img)
-    for verts_mm in mask_vertices_list:
-        verts_px = [(int(x * scale), int(y * scale)) for x, y in verts_mm]
-        if len(verts_px) >= 3:
-            draw.polygon(verts_px, outline=(100, 200, 100), fill=(200, 255, 200))
-    r = max(2, int(3 * scale))
-    for x_mm, y_mm in spot_xy_mm:
-        x, y = int(x_mm * scale), int(y_mm * scale)
-        draw.ellipse((x - r, y - r, x + r, y + r), fill=(255, 100, 100), outline=(180, 0, 0))
-    buf = io.BytesIO()
-    if output_format == "jpg":
-        img.save(buf, format="JPEG", quality=90)
-    else:
-        img.save(buf, format="PNG")
-    return buf.getvalue()
+    """Draw masks and spots on image, return PNG or JPEG bytes (optionally downscaled to max_px)."""
+    return render_overlay(image_path, width_mm, mask_vertices_list, spot_xy_mm, output_format, max_px)
 
 
 @router.get("/{iteration_id:int}/export", response_model=None)
 def get_iteration_export(
     iteration_id: int,
     request: Request,
-    db: sqlite3.Connection = Depends(get_db),
+    response: Response,
+    db: sqlite3.Connection = Depends(get_db, scope="function"),
     format: str = Query(..., pattern="^(json|png|jpg)$"),
+    max_px: int | None = Query(None, ge=64, le=20000),
 ) -> IterationExportJsonSchema | Response:
-    """Export iteration as JSON or image (PNG/JPG) with overlay."""
+    """
+    Export iteration as JSON or image (PNG/JPG) with overlay.
+    ETag covers the iteration, the image's current masks and (PNG/JPG) the image file; If-None-Match -> 304.
+    Rendered images are cached on disk by ETag (app.services.export_cache) and served as files.
+    max_px (PNG/JPG only) limits the longest side of the rendered image.
+    The DB connection goes back to the pool before the response is sent (function-scoped dependency).
+    """
     user_id = get_current_user_id(request)
     row = _get_iteration_owned_by_user(db, iteration_id, user_id)
     if not row:
@@ -236,6 +318,12 @@ def get_iteration_export(
             detail="Iteration not found",
         )
     image_id = row["image_id"]
+    mask_rows = db.execute(
+        "SELECT id, image_id, vertices, mask_label, created_at FROM masks WHERE image_id = ?",
+        (image_id,),
+    ).fetchall()
+    mask_fingerprint = [tuple(mr) for mr in mask_rows]
+    cache_control = cache_control_for(row["status"], immutable=False)
     if format in ("png", "jpg"):
         img_row = db.execute(
             "SELECT storage_path, width_mm FROM images WHERE id = ? AND created_by = ?",
@@ -253,38 +341,61 @@ def get_iteration_export(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Image file not found",
             )
-        mask_rows = db.execute(
-            "SELECT vertices FROM masks WHERE image_id = ?",
-            (image_id,),
-        ).fetchall()
-        mask_vertices_list = []
-        for mr in mask_rows:
-            raw = mr["vertices"]
-            try:
-                verts = json.loads(raw) if isinstance(raw, str) else raw
-            except (TypeError, json.JSONDecodeError):
-                verts = []
-            mask_vertices_list.append([(float(v["x"]), float(v["y"])) for v in verts])
-        spot_rows = db.execute(
-            "SELECT x_mm, y_mm FROM spots WHERE iteration_id = ? ORDER BY sequence_index ASC",
-            (iteration_id,),
-        ).fetchall()
-        spot_xy_mm = [(float(s["x_mm"]), float(s["y_mm"])) for s in spot_rows]
+        stat = path.stat()
+        etag = make_etag(
+            "export",
+            iteration_id,
+            row["created_at"],
+            format,
+            mask_fingerprint,
+            img_row["storage_path"],
+            img_row["width_mm"],
+            stat.st_mtime_ns,
+            stat.st_size,
+            max_px,
+        )
+        headers = cache_headers(etag, cache_control)
+        if etag_matches(request, etag):
+            return not_modified(headers)
+        media_type = "image/png" if format == "png" else "image/jpeg"
+        headers["Content-Disposition"] = f"attachment; filename=iteration-{iteration_id}-export.{format}"
+        # Rendered files are keyed by the ETag: same inputs -> same file, no decode/encode
+        render_cache = get_export_cache(upload_dir)
+        cache_key = etag.strip('"')
+        cached_path = render_cache.get(cache_key, format)
+        if cached_path is not None:
+            return FileResponse(cached_path, media_type=media_type, headers=headers)
+        mask_vertices_list = [
+            verts for mr in mask_rows if (verts := parse_mask_vertices(mr["vertices"])) is not None
+        ]
+        spot_xy_mm = load_spot_xy(db, iteration_id)
         content = _render_export_image(
             path,
             float(img_row["width_mm"]),
             mask_vertices_list,
             spot_xy_mm,
             format,
+            max_px,
         )
-        media_type = "image/png" if format == "png" else "image/jpeg"
-        return Response(
-            content=content,
-            media_type=media_type,
-            headers={
-                "Content-Disposition": f"attachment; filename=iteration-{iteration_id}-export.{format}"
-            },
-        )
+        try:
+            render_cache.put(cache_key, format, content)
+        except OSError:
+            logger.warning("Export render cache not writable; serving rendered bytes.", exc_info=True)
+        # The rendered bytes are in memory already: serve them, not the file (it could be evicted meanwhile)
+        return Response(content=content, media_type=media_type, headers=headers)
+    # JSON points carry spot ids, which depend on the storage format (see get_iteration_spots)
+    etag = make_etag(
+        "export",
+        iteration_id,
+        row["created_at"],
+        format,
+        mask_fingerprint,
+        spot_storage_of(db, iteration_id),
+    )
+    headers = cache_headers(etag, cache_control)
+    if etag_matches(request, etag):
+        return not_modified(headers)
+    response.headers.update(headers)
     params = _parse_params_snapshot(row["params_snapshot"])
     metadata = {
         "version": "1.0",
@@ -295,33 +406,19 @@ def get_iteration_export(
         "algorithm_mode": (params or {}).get("algorithm_mode"),
         "grid_spacing_mm": (params or {}).get("grid_spacing_mm"),
     }
-    mask_rows = db.execute(
-        "SELECT id, image_id, vertices, mask_label, created_at FROM masks WHERE image_id = ?",
-        (image_id,),
-    ).fetchall()
     masks = []
     for mr in mask_rows:
-        raw = mr["vertices"]
-        try:
-            verts = json.loads(raw) if isinstance(raw, str) else raw
-        except (TypeError, json.JSONDecodeError):
-            verts = []
+        verts = parse_mask_vertices(mr["vertices"]) or []
         masks.append(
             {
                 "id": mr["id"],
                 "image_id": mr["image_id"],
-                "vertices": [{"x": v["x"], "y": v["y"]} for v in verts],
+                "vertices": [{"x": x, "y": y} for x, y in verts],
                 "mask_label": mr["mask_label"],
                 "created_at": mr["created_at"],
             }
         )
-    spot_rows = db.execute(
-        "SELECT id, iteration_id, sequence_index, x_mm, y_mm, theta_deg, t_mm, "
-        "mask_id, component_id, created_at FROM spots WHERE iteration_id = ? "
-        "ORDER BY sequence_index ASC",
-        (iteration_id,),
-    ).fetchall()
-    points = [_row_to_spot(s) for s in spot_rows]
+    points = load_spots(db, iteration_id)
     metrics = {
         "achieved_coverage_pct": row["achieved_coverage_pct"],
         "target_coverage_pct": row["target_coverage_pct"],
@@ -369,8 +466,13 @@ def list_iteration_audit_log(
     page_size: int = Query(50, ge=1, le=100),
     sort: str = Query("created_at"),
     order: str = Query("desc"),
+    cursor: str | None = Query(None),
+    with_total: bool = Query(True),
 ) -> AuditLogListSchema:
-    """List audit log entries for one iteration (must belong to user's image)."""
+    """
+    List audit log entries for one iteration (must belong to user's image).
+    sort=created_at pages by keyset: pass next_cursor from the previous page as cursor.
+    """
     user_id = get_current_user_id(request)
     if _get_iteration_owned_by_user(db, iteration_id, user_id) is None:
         raise HTTPException(
@@ -379,20 +481,44 @@ def list_iteration_audit_log(
         )
     if sort not in ("created_at", "id", "event_type"):
         sort = "created_at"
+    if order not in ("asc", "desc"):
+        order = "desc"
     order_sql = "ASC" if order == "asc" else "DESC"
-    total_row = db.execute(
-        "SELECT COUNT(*) AS total FROM audit_log WHERE iteration_id = ?",
-        (iteration_id,),
-    ).fetchone()
-    total = total_row["total"] if total_row else 0
+    try:
+        after = parse_cursor(cursor, sort, order)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
+    base = "FROM audit_log WHERE iteration_id = ?"
+    params: list = [iteration_id]
+    total = approx_counts.count(db, base, params, "id") if with_total else None
     offset = (page - 1) * page_size
-    rows = db.execute(
-        "SELECT id, iteration_id, event_type, payload, user_id, created_at "
-        "FROM audit_log WHERE iteration_id = ? ORDER BY " + sort + " " + order_sql + " LIMIT ? OFFSET ?",
-        (iteration_id, page_size, offset),
-    ).fetchall()
+    select_sql = "SELECT id, iteration_id, event_type, payload, user_id, created_at"
+    next_cursor = None
+    if sort == "created_at":
+        rows, next_cursor = fetch_keyset_page(
+            db,
+            select_sql,
+            base,
+            params,
+            created_at_col="created_at",
+            id_col="id",
+            order=order,
+            page_size=page_size,
+            cursor=after,
+            offset=offset,
+        )
+    else:
+        rows = db.execute(
+            f"{select_sql} {base} ORDER BY {sort} {order_sql} LIMIT ? OFFSET ?",
+            (iteration_id, page_size, offset),
+        ).fetchall()
     items = [AuditLogEntrySchema(**_row_to_audit_entry(r)) for r in rows]
-    return AuditLogListSchema(items=items, total=total, page=page, page_size=page_size)
+    return AuditLogListSchema(
+        items=items, total=total, page=page, page_size=page_size, next_cursor=next_cursor
+    )
 
 
 @router.patch("/{iteration_id:int}", response_model=IterationSchema)
@@ -468,6 +594,8 @@ def delete_iteration(
             detail="Only draft iterations can be deleted",
         )
     cursor = db.execute("DELETE FROM plan_iterations WHERE id = ?", (iteration_id,))
+    # foreign_keys is off on these connections, so the cascade does not fire
+    db.execute("DELETE FROM spot_blocks WHERE iteration_id = ?", (iteration_id,))
     db.commit()
     if cursor.rowcount == 0:
         raise HTTPException(
@@ -6,23 +6,38 @@ import json
 import logging
 import os
 import sqlite3
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
-from PIL import Image as PILImage
+from fastapi.responses import JSONResponse
 
-from app.db.connection import get_db
+from app.db.connection import get_db, get_db_factory, get_read_db
 from app.schemas.iterations import (
     IterationSchema,
     IterationListSchema,
     IterationCreateSchema,
     IterationParamsSnapshotSchema,
+    IterationSummaryListSchema,
+    IterationSummarySchema,
+    PlanJobSchema,
 )
-from app.services.coordinates import (
-    center_mm_to_top_left_mm,
-    vertices_top_left_to_center,
+from app.services.coordinates import vertices_top_left_to_center
+from app.services.image_meta import height_mm_from_pixels, probe_image_file, store_image_meta
+from app.services.keyset import fetch_keyset_page, parse_cursor
+from app.services.mask_geometry import parse_mask_vertices
+from app.services.plan_cache import plan_cache, plan_cache_key
+from app.services.plan_grid import MaskPolygon, PlanResult, generate_plan_by_mode
+from app.services.plan_jobs import (
+    PlanFinisher,
+    PlanQueueFull,
+    estimate_plan_spots,
+    get_plan_job_queue,
+    should_run_async,
 )
-from app.services.plan_grid import MaskPolygon, generate_plan_by_mode
+from app.services.spot_store import IterationInsert, save_iteration
 
 logger = logging.getLogger(__name__)
 
@@ -94,7 +109,31 @@ def _row_to_iteration(row: sqlite3.Row) -> dict:
     }
 
 
-@router.get("/{image_id:int}/iterations", response_model=IterationListSchema)
+def _row_to_iteration_summary(row: sqlite3.Row) -> dict:
+    return {
+        "id": row["id"],
+        "image_id": row["image_id"],
+        "parent_id": row["parent_id"],
+        "created_by": row["created_by"],
+        "status": row["status"],
+        "accepted_at": row["accepted_at"],
+        "accepted_by": row["accepted_by"],
+        "is_demo": row["is_demo"],
+        "algorithm_mode": row["algorithm_mode"] if row["algorithm_mode"] in ("simple", "advanced") else None,
+        "target_coverage_pct": row["target_coverage_pct"],
+        "achieved_coverage_pct": row["achieved_coverage_pct"],
+        "spots_count": row["spots_count"],
+        "spots_outside_mask_count": row["spots_outside_mask_count"],
+        "overlap_count": row["overlap_count"],
+        "plan_valid": row["plan_valid"],
+        "created_at": row["created_at"],
+    }
+
+
+@router.get(
+    "/{image_id:int}/iterations",
+    response_model=IterationListSchema | IterationSummaryListSchema,
+)
 def list_iterations(
     image_id: int,
     request: Request,
@@ -106,8 +145,15 @@ def list_iterations(
     algorithm_mode: str | None = Query(None, alias="algorithm_mode"),
     sort: str = "created_at",
     order: str = "desc",
-) -> IterationListSchema:
-    """List iterations for an image (paginated, filterable)."""
+    cursor: str | None = None,
+    with_total: bool = True,
+    view: str = Query("full", pattern="^(full|summary)$"),
+) -> IterationListSchema | IterationSummaryListSchema:
+    """
+    List iterations for an image (paginated, filterable).
+    sort=created_at pages by keyset: pass next_cursor from the previous page as cursor.
+    view=summary returns rows without params_snapshot (algorithm_mode comes from its column).
+    """
     if page < 1:
         page = 1
     if page_size < 1:
@@ -118,6 +164,13 @@ def list_iterations(
         sort = "created_at"
     if order not in ("asc", "desc"):
         order = "desc"
+    try:
+        after = parse_cursor(cursor, sort, order)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
 
     user_id = get_current_user_id(request)
     _ensure_image_owned(db, image_id, user_id)
@@ -135,24 +188,48 @@ def list_iterations(
         where_clauses.append("algorithm_mode = ?")
         params.append(algorithm_mode)
 
-    where_sql = " AND ".join(where_clauses)
-    total_row = db.execute(
-        f"SELECT COUNT(*) AS total FROM plan_iterations WHERE {where_sql}",
-        params,
-    ).fetchone()
-    total = total_row["total"] if total_row else 0
-
-    params.extend([page_size, offset])
-    cursor = db.execute(
-        f"SELECT id, image_id, parent_id, created_by, status, accepted_at, accepted_by, "
-        f"is_demo, params_snapshot, target_coverage_pct, achieved_coverage_pct, "
-        f"spots_count, spots_outside_mask_count, overlap_count, plan_valid, created_at "
-        f"FROM plan_iterations WHERE {where_sql} ORDER BY {sort} {order} LIMIT ? OFFSET ?",
-        params,
+    base = "FROM plan_iterations WHERE " + " AND ".join(where_clauses)
+    # Exact count (iterations are deleted and change status): range scan of (image_id, created_at)
+    total = db.execute(f"SELECT COUNT(*) {base}", params).fetchone()[0] if with_total else None
+
+    summary = view == "summary"
+    select_sql = (
+        "SELECT id, image_id, parent_id, created_by, status, accepted_at, accepted_by, is_demo, "
+        + ("algorithm_mode" if summary else "params_snapshot")
+        + ", target_coverage_pct, achieved_coverage_pct, "
+        "spots_count, spots_outside_mask_count, overlap_count, plan_valid, created_at"
     )
-    rows = cursor.fetchall()
+    next_cursor = None
+    if sort == "created_at":
+        rows, next_cursor = fetch_keyset_page(
+            db,
+            select_sql,
+            base,
+            params,
+            created_at_col="created_at",
+            id_col="id",
+            order=order,
+            page_size=page_size,
+            cursor=after,
+            offset=offset,
+        )
+    else:
+        rows = db.execute(
+            f"{select_sql} {base} ORDER BY {sort} {order} LIMIT ? OFFSET ?",
+            [*params, page_size, offset],
+        ).fetchall()
+    if summary:
+        return IterationSummaryListSchema(
+            items=[IterationSummarySchema(**_row_to_iteration_summary(r)) for r in rows],
+            total=total,
+            page=page,
+            page_size=page_size,
+            next_cursor=next_cursor,
+        )
     items = [IterationSchema(**_row_to_iteration(r)) for r in rows]
-    return IterationListSchema(items=items, total=total, page=page, page_size=page_size)
+    return IterationListSchema(
+        items=items, total=total, page=page, page_size=page_size, next_cursor=next_cursor
+    )
 
 
 def _get_upload_dir() -> Path:
@@ -166,56 +243,47 @@ def _get_upload_dir() -> Path:
 
 
 def _get_image_width_height_mm(
-    db: sqlite3.Connection, image_id: int, user_id: int
+    db: sqlite3.Connection,
+    image_id: int,
+    user_id: int,
+    db_factory: Callable[[], AbstractContextManager[sqlite3.Connection]],
 ) -> tuple[float, float]:
     """
     Return (width_mm, height_mm) for the image.
-    height_mm = width_mm * H / W from pixel dimensions; if image file is missing, assume square.
+    height_mm = width_mm * H / W from width_px/height_px stored at upload (no file access).
+    Rows without pixel size (uploaded before the columns existed) are probed once and updated
+    on a writer from db_factory (db may be a reader); if the file is missing or unreadable,
+    assume square.
     """
     row = db.execute(
-        "SELECT storage_path, width_mm FROM images WHERE id = ? AND created_by = ?",
+        "SELECT storage_path, width_mm, width_px, height_px FROM images WHERE id = ? AND created_by = ?",
         (image_id, user_id),
     ).fetchone()
     if not row:
         return (0.0, 0.0)
     width_mm = float(row["width_mm"])
-    upload_dir = _get_upload_dir()
-    path = upload_dir / Path(row["storage_path"]).name
-    if not path.is_file():
-        return (width_mm, width_mm)  # assume square if file missing
-    try:
-        with PILImage.open(path) as img:
-            w, h = img.size
-        if w <= 0:
-            return (width_mm, width_mm)
-        height_mm = width_mm * h / w
+    height_mm = height_mm_from_pixels(width_mm, row["width_px"], row["height_px"])
+    if height_mm is not None:
         return (width_mm, height_mm)
-    except Exception:
-        return (width_mm, width_mm)
+    meta = probe_image_file(_get_upload_dir() / Path(row["storage_path"]).name)
+    if meta is None:
+        return (width_mm, width_mm)  # assume square if file missing
+    with db_factory() as write_db:
+        store_image_meta(write_db, image_id, meta)
+        write_db.commit()
+    return (width_mm, width_mm * meta.height_px / meta.width_px)
 
 
 def _load_masks_for_plan(db: sqlite3.Connection, image_id: int) -> list[MaskPolygon]:
-    """Load masks for image; vertices in top-left mm (JSON array of {x,y})."""
+    """Load masks for image; vertices in top-left mm (unusable masks are skipped)."""
     rows = db.execute(
         "SELECT id, vertices, mask_label FROM masks WHERE image_id = ?",
         (image_id,),
     ).fetchall()
     result: list[MaskPolygon] = []
     for r in rows:
-        raw = r["vertices"]
-        try:
-            data = json.loads(raw) if isinstance(raw, str) else raw
-        except (TypeError, json.JSONDecodeError):
-            continue
-        if not isinstance(data, list) or len(data) < 3:
-            continue
-        verts: list[tuple[float, float]] = []
-        for p in data:
-            if isinstance(p, dict) and "x" in p and "y" in p:
-                verts.append((float(p["x"]), float(p["y"])))
-            elif isinstance(p, (list, tuple)) and len(p) >= 2:
-                verts.append((float(p[0]), float(p[1])))
-        if len(verts) >= 3:
+        verts = parse_mask_vertices(r["vertices"])
+        if verts is not None:
             result.append(
                 MaskPolygon(
                     mask_id=int(r["id"]),
@@ -226,18 +294,30 @@ def _load_masks_for_plan(db: sqlite3.Connection, image_id: int) -> list[MaskPoly
     return result
 
 
-@router.post("/{image_id:int}/iterations", status_code=status.HTTP_201_CREATED, response_model=IterationSchema)
-def create_iteration(
+@dataclass(frozen=True)
+class _PreparedPlan:
+    """Planner inputs and iteration fields resolved from the request (plain data: safe to queue)."""
+
+    image_id: int
+    user_id: int
+    width_mm: float
+    height_mm: float
+    params_json: str
+    is_demo: int
+    target_coverage_pct: float
+    algorithm_mode: str
+    cache_key: str
+    plan_kwargs: dict
+
+
+def _prepare_plan(
+    db: sqlite3.Connection,
     image_id: int,
+    user_id: int,
     payload: IterationCreateSchema,
-    request: Request,
-    db: sqlite3.Connection = Depends(get_db),
-) -> IterationSchema:
-    """Create iteration: run grid/sequence algorithm, store spots and metrics."""
-    user_id = get_current_user_id(request)
-    _ensure_image_owned(db, image_id, user_id)
-
-    width_mm, height_mm = _get_image_width_height_mm(db, image_id, user_id)
+    db_factory: Callable[[], AbstractContextManager[sqlite3.Connection]],
+) -> _PreparedPlan:
+    width_mm, height_mm = _get_image_width_height_mm(db, image_id, user_id, db_factory)
     if width_mm <= 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -256,15 +336,6 @@ def create_iteration(
         params_snapshot["grid_spacing_mm"] = (
             payload.grid_spacing_mm if payload.grid_spacing_mm is not None else 0.8
         )
-    params_json = json.dumps(params_snapshot)
-
-    is_demo_int = 1 if payload.is_demo else 0
-
-    parent_row = db.execute(
-        "SELECT id FROM plan_iterations WHERE image_id = ? ORDER BY created_at DESC LIMIT 1",
-        (image_id,),
-    ).fetchone()
-    parent_id: int | None = int(parent_row["id"]) if parent_row else None
 
     masks_tl = _load_masks_for_plan(db, image_id)
     # Convert mask vertices from top-left mm to center mm (+y up) for planner
@@ -282,7 +353,8 @@ def create_iteration(
     grid_spacing = (
         payload.grid_spacing_mm if payload.algorithm_mode == "simple" else None
     )
-    plan = generate_plan_by_mode(
+    # Deterministic planner: identical inputs (masks, coverage, mode, spacing) reuse the cached plan
+    cache_key = plan_cache_key(
         masks_center,
         payload.target_coverage_pct,
         coverage_per_mask,
@@ -290,72 +362,125 @@ def create_iteration(
         payload.algorithm_mode,
         grid_spacing_mm=grid_spacing,
     )
+    return _PreparedPlan(
+        image_id=image_id,
+        user_id=user_id,
+        width_mm=width_mm,
+        height_mm=height_mm,
+        params_json=json.dumps(params_snapshot),
+        is_demo=1 if payload.is_demo else 0,
+        target_coverage_pct=payload.target_coverage_pct,
+        algorithm_mode=payload.algorithm_mode,
+        cache_key=cache_key,
+        plan_kwargs={
+            "masks": masks_center,
+            "target_coverage_pct": payload.target_coverage_pct,
+            "coverage_per_mask": coverage_per_mask,
+            "image_width_mm": width_mm,
+            "algorithm_mode": payload.algorithm_mode,
+            "grid_spacing_mm": grid_spacing,
+        },
+    )
 
-    try:
-        cursor = db.execute(
-            "INSERT INTO plan_iterations (image_id, parent_id, created_by, status, is_demo, "
-            "params_snapshot, target_coverage_pct, achieved_coverage_pct, spots_count, "
-            "spots_outside_mask_count, overlap_count, plan_valid, algorithm_mode, created_at) "
-            "VALUES (?, ?, ?, 'draft', ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))",
-            (
-                image_id,
-                parent_id,
-                user_id,
-                is_demo_int,
-                params_json,
-                payload.target_coverage_pct,
-                plan.achieved_coverage_pct,
-                plan.spots_count,
-                plan.spots_outside_mask_count,
-                plan.overlap_count,
-                plan.plan_valid,
-                payload.algorithm_mode,
-            ),
-        )
-        row_id = cursor.lastrowid
 
-        # Store spots in top-left mm (DB/frontend convention)
-        for seq_idx, spot in enumerate(plan.spots):
-            x_tl, y_tl = center_mm_to_top_left_mm(
-                spot.x_mm, spot.y_mm, width_mm, height_mm
-            )
-            db.execute(
-                "INSERT INTO spots (iteration_id, sequence_index, x_mm, y_mm, theta_deg, t_mm, mask_id, component_id, created_at) "
-                "VALUES (?, ?, ?, ?, ?, ?, ?, NULL, datetime('now'))",
-                (
-                    row_id,
-                    seq_idx,
-                    x_tl,
-                    y_tl,
-                    spot.theta_deg,
-                    spot.t_mm,
-                    spot.mask_id,
-                ),
-            )
+def _save_plan(db: sqlite3.Connection, prepared: _PreparedPlan, plan: PlanResult) -> int:
+    """Insert the iteration (parent = latest iteration of the image), its spots and audit rows."""
+    parent_row = db.execute(
+        "SELECT id FROM plan_iterations WHERE image_id = ? ORDER BY created_at DESC LIMIT 1",
+        (prepared.image_id,),
+    ).fetchone()
+    parent_id: int | None = int(parent_row["id"]) if parent_row else None
+    return save_iteration(
+        db,
+        IterationInsert(
+            image_id=prepared.image_id,
+            parent_id=parent_id,
+            created_by=prepared.user_id,
+            is_demo=prepared.is_demo,
+            params_snapshot=prepared.params_json,
+            target_coverage_pct=prepared.target_coverage_pct,
+            algorithm_mode=prepared.algorithm_mode,
+        ),
+        plan,
+        prepared.width_mm,
+        prepared.height_mm,
+    )
 
-        db.execute(
-            "INSERT INTO audit_log (iteration_id, event_type, payload, user_id, created_at) VALUES (?, ?, ?, ?, datetime('now'))",
-            (row_id, "iteration_created", "{}", user_id),
-        )
-        db.execute(
-            "INSERT INTO audit_log (iteration_id, event_type, payload, user_id, created_at) VALUES (?, ?, ?, ?, datetime('now'))",
-            (
-                row_id,
-                "plan_generated",
-                json.dumps({
-                    "target_coverage_pct": payload.target_coverage_pct,
-                    "spots_count": plan.spots_count,
-                    "achieved_coverage_pct": plan.achieved_coverage_pct,
-                }),
-                user_id,
-            ),
-        )
-        if plan.fallback_used:
-            db.execute(
-                "INSERT INTO audit_log (iteration_id, event_type, payload, user_id, created_at) VALUES (?, ?, ?, ?, datetime('now'))",
-                (row_id, "fallback_used", "{}", user_id),
+
+def _plan_job_finisher(
+    prepared: _PreparedPlan,
+    db_factory: Callable[[], AbstractContextManager[sqlite3.Connection]],
+) -> PlanFinisher:
+    """
+    Job completion for the queue: plan via the cache (computed in a worker process), then save.
+    Connections are taken only around the cache lookup/store and the save, never while the plan
+    is computed, so writers are not blocked by a running job.
+    """
+
+    def finish(compute: Callable[[], PlanResult]) -> int:
+        plan = plan_cache.get_or_compute(prepared.cache_key, compute, connect=db_factory)
+        with db_factory() as db:
+            return _save_plan(db, prepared, plan)
+
+    return finish
+
+
+@router.post(
+    "/{image_id:int}/iterations",
+    status_code=status.HTTP_201_CREATED,
+    response_model=IterationSchema,
+    responses={status.HTTP_202_ACCEPTED: {"model": PlanJobSchema}},
+)
+def create_iteration(
+    image_id: int,
+    payload: IterationCreateSchema,
+    request: Request,
+    db: sqlite3.Connection = Depends(get_read_db),
+    db_factory: Callable[[], AbstractContextManager[sqlite3.Connection]] = Depends(get_db_factory),
+    execution: str = Query("auto", pattern="^(auto|sync|async)$"),
+):
+    """
+    Create iteration: run grid/sequence algorithm, store spots and metrics.
+    execution=auto (default) plans synchronously (201) unless the plan is large and not cached;
+    then (or with execution=async) it returns 202 with a job, polled at GET /api/plan-jobs/{job_id}.
+    Inputs are read on a reader connection; a writer is taken only for the cache store and the save.
+    """
+    user_id = get_current_user_id(request)
+    _ensure_image_owned(db, image_id, user_id)
+    prepared = _prepare_plan(db, image_id, user_id, payload, db_factory)
+
+    kwargs = prepared.plan_kwargs
+    estimated = estimate_plan_spots(
+        kwargs["masks"], kwargs["target_coverage_pct"], kwargs["algorithm_mode"], kwargs["grid_spacing_mm"]
+    )
+    run_async = should_run_async(execution, estimated)
+    if run_async and execution == "auto" and plan_cache.contains(prepared.cache_key):
+        run_async = False
+    if run_async:
+        try:
+            job = get_plan_job_queue().submit(
+                user_id, image_id, kwargs, _plan_job_finisher(prepared, db_factory)
             )
-        db.commit()
+        except PlanQueueFull as exc:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many plans in progress, try again later",
+            ) from exc
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=PlanJobSchema(**job.to_dict()).model_dump(),
+            headers={"Location": f"/api/plan-jobs/{job.job_id}"},
+        )
+
+    plan = plan_cache.get_or_compute(
+        prepared.cache_key,
+        lambda: generate_plan_by_mode(**kwargs),
+        connect=db_factory,
+    )
+
+    try:
+        with db_factory() as write_db:
+            row_id = _save_plan(write_db, prepared, plan)
     except Exception as exc:
         logger.exception("Failed to insert iteration or spots.")
         raise HTTPException(
@@ -0,0 +1,40 @@
+"""Plan jobs API: status of background planning jobs (created by POST /api/images/{id}/iterations)."""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, Request, status
+
+from app.schemas.iterations import PlanJobSchema
+from app.services.plan_jobs import get_plan_job_queue
+
+router = APIRouter()
+
+
+def get_current_user_id(request: Request) -> int:
+    """Return current user id from request.state (set by auth middleware)."""
+    user = getattr(request.state, "user", None)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required",
+        )
+    user_id = user.get("id")
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required",
+        )
+    return int(user_id)
+
+
+@router.get("/{job_id}", response_model=PlanJobSchema)
+def get_plan_job(job_id: str, request: Request) -> PlanJobSchema:
+    """Job status: queued / running / done (iteration_id set) / failed (error set), with progress 0-1."""
+    user_id = get_current_user_id(request)
+    job = get_plan_job_queue().get(job_id)
+    if job is None or job.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Plan job not found",
+        )
+    return PlanJobSchema(**job.to_dict())
@@ -5,13 +5,18 @@ import hmac
 import json
 import logging
 import os
+import threading
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from hashlib import sha256
 from typing import Any
 
 logger = logging.getLogger(__name__)
 
+# Verified tokens kept by the auth middleware (token -> payload, dropped at exp)
+SESSION_TOKEN_CACHE_MAX_ENTRIES = 1024
+
 
 @dataclass(frozen=True)
 class AuthSessionSettings:
@@ -42,6 +47,82 @@ def load_session_settings() -> AuthSessionSettings:
     )
 
 
+_settings: AuthSessionSettings | None = None
+_settings_lock = threading.Lock()
+
+
+def get_session_settings() -> AuthSessionSettings:
+    """Settings parsed once from the environment (first use or startup); see reload_session_settings."""
+    global _settings
+    settings = _settings
+    if settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = load_session_settings()
+            settings = _settings
+    return settings
+
+
+def reload_session_settings() -> AuthSessionSettings:
+    """Re-read AUTH_* variables and drop cached verified tokens (they may belong to the old secret)."""
+    global _settings
+    with _settings_lock:
+        _settings = load_session_settings()
+        settings = _settings
+    session_token_cache.clear()
+    return settings
+
+
+class SessionTokenCache:
+    """Bounded LRU of verified token -> payload; an entry is used only until the token's exp."""
+
+    def __init__(self, max_entries: int = SESSION_TOKEN_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[dict[str, Any], int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str, now: int | None = None) -> dict[str, Any] | None:
+        now = int(time.time()) if now is None else now
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            payload, exp = entry
+            if exp <= now:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return payload
+
+    def put(self, token: str, payload: dict[str, Any]) -> None:
+        exp = int(payload.get("exp", 0))
+        with self._lock:
+            self._entries[token] = (payload, exp)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Process-wide cache used by the auth middleware
+session_token_cache = SessionTokenCache()
+
+
+def verify_session_token_cached(token: str, secret_key: str) -> dict[str, Any]:
+    """verify_session_token with the verified-token cache (HMAC + JSON decode only on a miss)."""
+    payload = session_token_cache.get(token)
+    if payload is None:
+        payload = verify_session_token(token, secret_key)
+        session_token_cache.put(token, payload)
+    return payload
+
+
 def create_session_token(
     *, user_id: int, login: str, secret_key: str, ttl_seconds: int
 ) -> str:
@@ -1,6 +1,12 @@
+# Połączenie SQLite, modele, zapytania.
 import os
 import sqlite3
-from collections.abc import Generator
+from collections.abc import Callable, Generator
+from contextlib import AbstractContextManager
+
+from fastapi import HTTPException, Request, status
+
+from app.db.pool import PoolTimeout, get_pools
 
 
 def get_db_path() -> str:
@@ -12,12 +18,47 @@ def get_db_path() -> str:
     return path
 
 
-def get_db() -> Generator[sqlite3.Connection, None, None]:
-    """FastAPI dependency that yields a SQLite connection.
+def get_db(request: Request) -> Generator[sqlite3.Connection, None, None]:
+    """FastAPI dependency that yields a pooled SQLite connection (app.db.pool).
+    GET/HEAD use the reader pool, other methods the writer pool; the connection goes back to
+    its pool after the response (an uncommitted transaction is rolled back); file responses use
+    Depends(get_db, scope="function") so it is returned before the file is sent.
     check_same_thread=False: FastAPI runs Depends in one thread and the endpoint in another (threadpool)."""
-    conn = sqlite3.connect(get_db_path(), check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+    pool = get_pools(get_db_path()).for_method(request.method)
+    try:
+        conn = pool.acquire()
+    except PoolTimeout as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database busy, try again",
+        ) from exc
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
+
+
+def get_read_db() -> Generator[sqlite3.Connection, None, None]:
+    """FastAPI dependency: reader-pool connection for any method. For POST handlers that mostly
+    read or spend their time outside the database (login: bcrypt; planning: prepare inputs) and
+    take a writer from get_db_factory only around the actual write transaction."""
+    pool = get_pools(get_db_path()).reader
+    try:
+        conn = pool.acquire()
+    except PoolTimeout as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database busy, try again",
+        ) from exc
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+def get_db_factory() -> Callable[[], AbstractContextManager[sqlite3.Connection]]:
+    """FastAPI dependency: factory of writer-pool connections for short write transactions
+    (background planning jobs, uploads and plans saved after slow work done without a connection).
+    Each call returns a context manager that releases the connection."""
+    db_path = get_db_path()
+    return lambda: get_pools(db_path).writer.connection()
@@ -0,0 +1,273 @@
+"""
+Pooled SQLite connections: long-lived, configured once, readers separated from the writer.
+
+- Every connection gets the pragmas once at creation: journal_mode=WAL (readers never block the
+  writer and vice versa), synchronous=NORMAL (safe with WAL), mmap_size, busy_timeout, and
+  foreign_keys (off by default: audit_log -> plan_iterations has no ON DELETE CASCADE and
+  delete_iteration relies on that). The statement cache is sqlite3's cached_statements.
+- Writer pool: DB_WRITER_POOL_SIZE (default 4) for other methods. A request holds its connection
+  for the whole handler, so a single writer would serialize whole requests; SQLite itself still
+  serializes the write transactions (WAL + busy_timeout), as without the pool. Slow handlers
+  (login, upload, planning) read from the reader pool and take a writer only around the write.
+- Reader pool: DB_READER_POOL_SIZE (default 8) for GET/HEAD requests; streamed spot responses keep
+  theirs until the stream ends (file responses release it before sending). Readers are ordinary
+  connections (not query_only), so a handler that does write from a GET still works; it just
+  waits on busy_timeout like any other writer.
+- acquire() waits at most DB_POOL_TIMEOUT_SECONDS and raises PoolTimeout; release() rolls back a
+  transaction left open by the caller, and a connection that cannot be rolled back is discarded.
+- stats(): size, idle, checked_out, waiting, acquisitions, waits, wait time (total/max ms), timeouts.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+
+# Defaults (environment overrides are read when a pool is created)
+DEFAULT_READER_POOL_SIZE = 8
+DEFAULT_WRITER_POOL_SIZE = 4
+DEFAULT_POOL_TIMEOUT_SECONDS = 30.0
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+DEFAULT_STATEMENT_CACHE_SIZE = 256
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class PoolTimeout(Exception):
+    """No pooled connection became available within the pool timeout."""
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.environ.get(name)
+    if raw is None or not raw.strip():
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+def connect(
+    db_path: str,
+    *,
+    busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS,
+    mmap_size: int = DEFAULT_MMAP_SIZE,
+    statement_cache_size: int = DEFAULT_STATEMENT_CACHE_SIZE,
+    foreign_keys: bool = False,
+) -> sqlite3.Connection:
+    """New connection with the pool pragmas applied (usable from any thread, one at a time)."""
+    conn = sqlite3.connect(
+        db_path,
+        check_same_thread=False,
+        cached_statements=statement_cache_size,
+        timeout=busy_timeout_ms / 1000.0,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+    conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+    conn.execute(f"PRAGMA foreign_keys={'ON' if foreign_keys else 'OFF'}")
+    return conn
+
+
+class ConnectionPool:
+    """Bounded set of connections to one database file (thread-safe; connections opened lazily)."""
+
+    def __init__(
+        self,
+        db_path: str,
+        max_size: int,
+        *,
+        timeout: float = DEFAULT_POOL_TIMEOUT_SECONDS,
+        name: str = "pool",
+        **connect_kwargs,
+    ) -> None:
+        self.db_path = db_path
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.name = name
+        self._connect_kwargs = connect_kwargs
+        self._idle: list[sqlite3.Connection] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.checked_out = 0
+        self.waiting = 0
+        self.acquisitions = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def acquire(self) -> sqlite3.Connection:
+        """Idle connection, a new one while below max_size, or wait up to timeout."""
+        start = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError(f"{self.name} is closed")
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    break
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"{self.name}: no connection available after {self.timeout:.1f}s")
+                waited = True
+                self.waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.checked_out += 1
+            self.acquisitions += 1
+            if waited:
+                wait_ms = (time.perf_counter() - start) * 1000.0
+                self.waits += 1
+                self.wait_ms_total += wait_ms
+                self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        if conn is None:
+            try:
+                conn = connect(self.db_path, **self._connect_kwargs)
+            except BaseException:
+                self._discard()
+                raise
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection; an open transaction is rolled back (broken connections are dropped)."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            try:
+                conn.close()
+            finally:
+                self._discard()
+            return
+        with self._cond:
+            self.checked_out -= 1
+            if self._closed:
+                self._size -= 1
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self.checked_out = max(0, self.checked_out - 1)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Generator[sqlite3.Connection, None, None]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """Close idle connections; checked-out ones are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> dict[str, int | float]:
+        with self._cond:
+            return {
+                "size": self._size,
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "checked_out": self.checked_out,
+                "waiting": self.waiting,
+                "acquisitions": self.acquisitions,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "wait_ms_total": round(self.wait_ms_total, 3),
+                "wait_ms_max": round(self.wait_ms_max, 3),
+            }
+
+
+class DatabasePools:
+    """Reader and writer pools for one database file."""
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        timeout = float(os.environ.get("DB_POOL_TIMEOUT_SECONDS", str(DEFAULT_POOL_TIMEOUT_SECONDS)))
+        connect_kwargs = {
+            "busy_timeout_ms": int(os.environ.get("DB_BUSY_TIMEOUT_MS", str(DEFAULT_BUSY_TIMEOUT_MS))),
+            "mmap_size": int(os.environ.get("DB_MMAP_SIZE", str(DEFAULT_MMAP_SIZE))),
+            "statement_cache_size": int(
+                os.environ.get("DB_STATEMENT_CACHE_SIZE", str(DEFAULT_STATEMENT_CACHE_SIZE))
+            ),
+            "foreign_keys": _env_bool("DB_FOREIGN_KEYS", False),
+        }
+        self.writer = ConnectionPool(
+            db_path,
+            int(os.environ.get("DB_WRITER_POOL_SIZE", str(DEFAULT_WRITER_POOL_SIZE))),
+            timeout=timeout,
+            name="writer",
+            **connect_kwargs,
+        )
+        self.reader = ConnectionPool(
+            db_path,
+            int(os.environ.get("DB_READER_POOL_SIZE", str(DEFAULT_READER_POOL_SIZE))),
+            timeout=timeout,
+            name="reader",
+            **connect_kwargs,
+        )
+
+    def for_method(self, method: str) -> ConnectionPool:
+        """Reader pool for GET/HEAD/OPTIONS, writer pool for everything else."""
+        return self.reader if method.upper() in READ_METHODS else self.writer
+
+    def close(self) -> None:
+        self.writer.close()
+        self.reader.close()
+
+    def stats(self) -> dict[str, dict[str, int | float]]:
+        return {"writer": self.writer.stats(), "reader": self.reader.stats()}
+
+
+_pools: DatabasePools | None = None
+_pools_lock = threading.Lock()
+
+
+def get_pools(db_path: str) -> DatabasePools:
+    """Process-wide pools for db_path (recreated when the configured path changes)."""
+    global _pools
+    with _pools_lock:
+        if _pools is None or _pools.db_path != db_path:
+            if _pools is not None:
+                _pools.close()
+            _pools = DatabasePools(db_path)
+        return _pools
+
+
+def close_pools() -> None:
+    """Close the process-wide pools (application shutdown)."""
+    global _pools
+    with _pools_lock:
+        if _pools is not None:
+            _pools.close()
+            _pools = None
+
+
+def pool_stats() -> dict[str, dict[str, int | float]] | None:
+    """Stats of the process-wide pools, or None before the first request."""
+    with _pools_lock:
+        return None if _pools is None else _pools.stats()
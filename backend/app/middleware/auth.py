@@ -1,44 +1,78 @@
+"""
+Session auth for /api as a pure ASGI middleware.
+
+No BaseHTTPMiddleware: response bodies (streamed spots, exports, files) pass straight through
+instead of being re-wrapped per request. Settings come from get_session_settings() (parsed once;
+reload_session_settings() re-reads them) and verified tokens from the LRU token cache, so a
+repeated cookie costs a dict lookup instead of an HMAC and a JSON decode.
+"""
+
 import logging
 
-from fastapi import Request
+from starlette.requests import cookie_parser
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from app.auth.session import load_session_settings, verify_session_token
+from app.auth.session import get_session_settings, verify_session_token_cached
 
 logger = logging.getLogger(__name__)
 
 PUBLIC_PATHS = {"/api/auth/login"}
 
 
-async def auth_middleware(request: Request, call_next):
-    # CORS preflight: browser sends OPTIONS without credentials; allow so actual request can run with cookie.
-    if request.method == "OPTIONS":
-        return await call_next(request)
-    path = request.url.path
-    if not path.startswith("/api") or path in PUBLIC_PATHS:
-        return await call_next(request)
-
-    settings = load_session_settings()
-    token = request.cookies.get(settings.cookie_name)
-    if not token:
-        return JSONResponse(
-            status_code=401,
-            content={"detail": "Authentication required"},
-        )
-
-    try:
-        payload = verify_session_token(token, settings.secret_key)
-    except ValueError:
-        return JSONResponse(
-            status_code=401,
-            content={"detail": "Invalid or expired session"},
-        )
-    except Exception:
-        logger.exception("Failed to verify session token.")
-        return JSONResponse(
-            status_code=500,
-            content={"detail": "Internal server error"},
-        )
-
-    request.state.user = {"id": payload.get("sub"), "login": payload.get("login")}
-    return await call_next(request)
+def _cookie_header(scope: Scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"cookie":
+            return value.decode("latin-1")
+    return ""
+
+
+class AuthMiddleware:
+    """Require a valid session cookie on /api (except PUBLIC_PATHS); sets request.state.user."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # CORS preflight: browser sends OPTIONS without credentials; allow so actual request can run with cookie.
+        if scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if not path.startswith("/api") or path in PUBLIC_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        settings = get_session_settings()
+        token = cookie_parser(_cookie_header(scope)).get(settings.cookie_name)
+        if not token:
+            response = JSONResponse(
+                status_code=401,
+                content={"detail": "Authentication required"},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            payload = verify_session_token_cached(token, settings.secret_key)
+        except ValueError:
+            response = JSONResponse(
+                status_code=401,
+                content={"detail": "Invalid or expired session"},
+            )
+            await response(scope, receive, send)
+            return
+        except Exception:
+            logger.exception("Failed to verify session token.")
+            response = JSONResponse(
+                status_code=500,
+                content={"detail": "Internal server error"},
+            )
+            await response(scope, receive, send)
+            return
+
+        scope.setdefault("state", {})["user"] = {"id": payload.get("sub"), "login": payload.get("login")}
+        await self.app(scope, receive, send)
@@ -0,0 +1,66 @@
+"""
+Request body limit for uploads, enforced while the body is received (pure ASGI).
+
+FastAPI parses the multipart form (and Starlette spools the file part to disk) before the
+handler runs, so the handler's UPLOAD_MAX_BYTES check alone would only reject an oversized file
+after all of it was received. Here a Content-Length over the limit is answered with 413 before any
+body is read, and a body without one (chunked) is counted as it arrives and cut off at the limit.
+The limit allows UPLOAD_MULTIPART_OVERHEAD_BYTES for boundaries and the other form fields; the
+handler still enforces the exact file size.
+"""
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.upload_store import get_max_upload_bytes, max_upload_request_bytes
+
+# POST paths whose body is an image upload
+UPLOAD_PATHS = {"/api/images"}
+
+
+def _content_length(scope: Scope) -> int | None:
+    for name, value in scope["headers"]:
+        if name == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+def _too_large_detail() -> str:
+    return f"File too large (max {get_max_upload_bytes()} bytes)"
+
+
+class UploadLimitMiddleware:
+    """Reject upload bodies over max_upload_request_bytes() with 413 without receiving them."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in UPLOAD_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        limit = max_upload_request_bytes()
+        declared = _content_length(scope)
+        if declared is not None and declared > limit:
+            response = JSONResponse(status_code=413, content={"detail": _too_large_detail()})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside form parsing: FastAPI re-raises HTTPException -> 413 response
+                    raise HTTPException(status_code=413, detail=_too_large_detail())
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -17,9 +17,14 @@ class AuditLogEntrySchema(BaseModel):
 
 
 class AuditLogListSchema(BaseModel):
-    """Paginated list of audit log entries."""
+    """
+    Paginated list of audit log entries.
+    next_cursor continues after the last item (None on the last page); total is approximate
+    (app.services.keyset.ApproxCountCache) and None when requested with with_total=false.
+    """
 
     items: list[AuditLogEntrySchema]
-    total: int
+    total: int | None
     page: int
     page_size: int
+    next_cursor: str | None = None
@@ -13,17 +13,20 @@ class ImageSchema(BaseModel):
     id: int
     storage_path: str
     width_mm: float
+    width_px: int | None = None
+    height_px: int | None = None
     created_by: int | None
     created_at: str
 
 
 class PagedImagesSchema(BaseModel):
-    """Paginated list of images (ImageListResponseDto)."""
+    """Paginated list of images (ImageListResponseDto); next_cursor as in audit log (total is exact, None with with_total=false)."""
 
     items: list[ImageSchema]
-    total: int
+    total: int | None
     page: int
     page_size: int
+    next_cursor: str | None = None
 
 
 class ImageUpdateSchema(BaseModel):
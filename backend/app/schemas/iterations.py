@@ -41,13 +41,45 @@ class IterationSchema(BaseModel):
     created_at: str
 
 
+class IterationSummarySchema(BaseModel):
+    """List row without params_snapshot (view=summary): columns only, no JSON parsing."""
+
+    id: int
+    image_id: int
+    parent_id: int | None
+    created_by: int | None
+    status: str
+    accepted_at: str | None
+    accepted_by: int | None
+    is_demo: int
+    algorithm_mode: Literal["simple", "advanced"] | None = None
+    target_coverage_pct: float | None
+    achieved_coverage_pct: float | None
+    spots_count: int | None
+    spots_outside_mask_count: int | None
+    overlap_count: int | None
+    plan_valid: int
+    created_at: str
+
+
 class IterationListSchema(BaseModel):
-    """Paginated list of iterations (IterationListResponseDto)."""
+    """Paginated list of iterations (IterationListResponseDto); next_cursor as in audit log (total is exact, None with with_total=false)."""
 
     items: list[IterationSchema]
-    total: int
+    total: int | None
+    page: int
+    page_size: int
+    next_cursor: str | None = None
+
+
+class IterationSummaryListSchema(BaseModel):
+    """Paginated list of iteration summaries (view=summary)."""
+
+    items: list[IterationSummarySchema]
+    total: int | None
     page: int
     page_size: int
+    next_cursor: str | None = None
 
 
 class IterationCreateSchema(BaseModel):
@@ -62,6 +94,20 @@ class IterationCreateSchema(BaseModel):
     grid_spacing_mm: float | None = Field(None, ge=0.3, le=2.0)
 
 
+class PlanJobSchema(BaseModel):
+    """Background planning job (202 response of POST /iterations, GET /api/plan-jobs/{job_id})."""
+
+    job_id: str
+    image_id: int
+    status: Literal["queued", "running", "done", "failed"]
+    progress: float
+    iteration_id: int | None = None
+    error: str | None = None
+    created_at: str
+    started_at: str | None = None
+    finished_at: str | None = None
+
+
 class IterationUpdateSchema(BaseModel):
     """PATCH body: update iteration (e.g. status)."""
 
@@ -70,6 +116,16 @@ class IterationUpdateSchema(BaseModel):
     status: str | None = Field(None, pattern="^(draft|accepted|rejected)$")
 
 
+class IterationValidationSchema(BaseModel):
+    """GET validation response: metrics recomputed from stored spots and current masks."""
+
+    iteration_id: int
+    spots_count: int
+    spots_outside_mask_count: int
+    overlap_count: int
+    plan_valid: int
+
+
 class IterationExportJsonSchema(BaseModel):
     """GET export?format=json response (IterationExportJsonDto)."""
 
@@ -8,7 +8,7 @@ try:
 except ImportError:
     bcrypt = None
 
-from app.auth.session import create_session_token, load_session_settings
+from app.auth.session import create_session_token, get_session_settings
 
 
 def get_user_by_login(db: sqlite3.Connection, login: str) -> dict[str, Any] | None:
@@ -31,7 +31,7 @@ def verify_password(password: str, password_hash: str) -> bool:
 
 def create_session_or_token(user: dict[str, Any]) -> str:
     """Create a signed session token for cookie-based auth."""
-    settings = load_session_settings()
+    settings = get_session_settings()
     return create_session_token(
         user_id=user["id"],
         login=user["login"],
@@ -15,6 +15,8 @@ Mapping:
 
 from __future__ import annotations
 
+import numpy as np
+
 
 def top_left_mm_to_center_mm(
     x_tl: float,
@@ -62,3 +64,15 @@ def vertices_center_to_top_left(
         center_mm_to_top_left_mm(x, y, width_mm, height_mm)
         for x, y in vertices
     ]
+
+
+def center_mm_to_top_left_mm_arrays(
+    x_center: np.ndarray,
+    y_center: np.ndarray,
+    width_mm: float,
+    height_mm: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized center_mm_to_top_left_mm for coordinate arrays (same formulas, same results)."""
+    x_tl = np.asarray(x_center, dtype=np.float64) + width_mm / 2
+    y_tl = height_mm / 2 - np.asarray(y_center, dtype=np.float64)
+    return (x_tl, y_tl)
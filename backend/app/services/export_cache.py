@@ -0,0 +1,118 @@
+"""
+On-disk cache of rendered PNG/JPG exports (iteration overlay images).
+
+- Key: the export ETag (iteration id + created_at, mask rows, image path/width/mtime/size, format),
+  so any change to the inputs yields a new file; stale files simply age out.
+- Directory: EXPORT_CACHE_DIR, default <UPLOAD_DIR>/.export-cache (upload files are looked up by
+  name in UPLOAD_DIR itself, so the subdirectory never collides with them).
+- Size bound: EXPORT_CACHE_MAX_BYTES (default 256 MiB); least recently used files (mtime, touched on
+  every hit) are removed after each write. Files used within RENDER_CACHE_EVICT_MIN_AGE_SECONDS are
+  kept even over the bound: a response may still be sending them.
+- One instance per directory (shared_render_cache), so its lock serializes eviction across requests.
+- Writes go to a temporary file and are renamed into place, so readers never see partial files.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Default size bound for the whole cache directory
+EXPORT_CACHE_DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Files returned by get()/put() this recently are never evicted (FileResponse opens them at send time)
+RENDER_CACHE_EVICT_MIN_AGE_SECONDS = 60
+_EXTENSIONS = {"png": ".png", "jpg": ".jpg"}
+
+
+class ExportRenderCache:
+    """Directory of rendered exports named <key><ext>, bounded in total size."""
+
+    def __init__(self, directory: Path, max_bytes: int = EXPORT_CACHE_DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str, output_format: str) -> Path:
+        return self.directory / f"{key}{_EXTENSIONS[output_format]}"
+
+    def get(self, key: str, output_format: str) -> Path | None:
+        """Cached file for key, or None. A hit refreshes the file's mtime (LRU order)."""
+        path = self.path_for(key, output_format)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, output_format: str, content: bytes) -> Path:
+        """Store rendered bytes atomically and evict old files beyond max_bytes."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(key, output_format)
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(content)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: Path) -> None:
+        recent_ns = time.time_ns() - int(RENDER_CACHE_EVICT_MIN_AGE_SECONDS * 1e9)
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if entry.name.startswith(".tmp-") or not entry.is_file():
+                    continue
+                st = entry.stat()
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                total += st.st_size
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for mtime_ns, size, name in entries:
+                if total <= self.max_bytes:
+                    break
+                if Path(name) == keep or mtime_ns >= recent_ns:
+                    continue
+                try:
+                    os.unlink(name)
+                    total -= size
+                except OSError:
+                    logger.debug("Could not evict export cache file %s", name, exc_info=True)
+
+
+_caches: dict[Path, ExportRenderCache] = {}
+_caches_lock = threading.Lock()
+
+
+def shared_render_cache(directory: Path, max_bytes: int) -> ExportRenderCache:
+    """Process-wide cache instance for directory (max_bytes follows the latest configuration)."""
+    with _caches_lock:
+        cache = _caches.get(directory)
+        if cache is None:
+            cache = _caches[directory] = ExportRenderCache(directory, max_bytes)
+        cache.max_bytes = max_bytes
+        return cache
+
+
+def get_export_cache(upload_dir: Path) -> ExportRenderCache:
+    """Cache configured from EXPORT_CACHE_DIR / EXPORT_CACHE_MAX_BYTES (relative dir -> under backend/)."""
+    base = os.environ.get("EXPORT_CACHE_DIR", "").strip()
+    if base:
+        directory = Path(base)
+        if not directory.is_absolute():
+            directory = Path(__file__).resolve().parent.parent.parent / directory
+    else:
+        directory = upload_dir / ".export-cache"
+    max_bytes = int(os.environ.get("EXPORT_CACHE_MAX_BYTES", str(EXPORT_CACHE_DEFAULT_MAX_BYTES)))
+    return shared_render_cache(directory, max_bytes)
@@ -3,7 +3,8 @@ Standalone grid generator for two handpiece apertures.
 
 No image or masks required. Generates emission points from geometric parameters.
 - Simple: 12×12 mm rectangle, regular XY grid, boustrophedon order.
-- Advanced: 25 mm diameter circle, diameter lines, candidate-based selection.
+- Advanced: 25 mm diameter circle, diameter lines, candidate-based selection
+  (circle handled analytically: area pi*R^2, containment r <= R).
 
 Refs: .ai/grid-generator-implementation-plan.md
 """
@@ -14,10 +15,11 @@ import math
 from dataclasses import dataclass
 from typing import Literal
 
+import numpy as np
+
 from app.services.plan_grid import (
     APERTURE_RADIUS_MM,
-    MaskPolygon,
-    generate_plan,
+    generate_plan_full_aperture,
 )
 
 # Simple aperture: 12×12 mm rectangle
@@ -35,17 +37,6 @@ def _spot_area_mm2(spot_diameter_um: int) -> float:
     return math.pi * r_mm * r_mm
 
 
-def _circle_polygon(cx: float, cy: float, radius_mm: float, n_vertices: int = 360) -> list[tuple[float, float]]:
-    """Vertices approximating a circle (center mm, +y up)."""
-    verts: list[tuple[float, float]] = []
-    for i in range(n_vertices):
-        angle = 2 * math.pi * i / n_vertices
-        x = cx + radius_mm * math.cos(angle)
-        y = cy + radius_mm * math.sin(angle)
-        verts.append((x, y))
-    return verts
-
-
 @dataclass
 class GridSpot:
     """Single spot for grid generator response."""
@@ -67,6 +58,8 @@ class GridGeneratorResult:
     spots_count: int
     achieved_coverage_pct: float
     params: dict
+    # Real evaluations spent searching spacing (advanced with target coverage); 0 = none
+    spacing_evaluations: int = 0
 
 
 def _simple_valid_region(spot_diameter_um: int) -> tuple[float, float, float, float]:
@@ -78,43 +71,49 @@ def _simple_valid_region(spot_diameter_um: int) -> tuple[float, float, float, fl
     return (r_mm, SIMPLE_WIDTH_MM - r_mm, r_mm, SIMPLE_HEIGHT_MM - r_mm)
 
 
+def _simple_axis_count(axis_distance_mm: float, spot_diameter_um: int) -> int:
+    """
+    Grid points per axis for spacing d: floor((x_max - x_min) / d) + 1 (same 1e-9 slack as the
+    original while-loop walk). The 12×12 valid region is square, so the grid has count² points.
+    """
+    x_min, x_max, _, _ = _simple_valid_region(spot_diameter_um)
+    d = max(axis_distance_mm, 1e-6)
+    return max(0, int(math.floor((x_max - x_min + 1e-9) / d)) + 1)
+
+
+def _simple_axis_positions(axis_distance_mm: float, spot_diameter_um: int, lo: float, hi: float) -> np.ndarray:
+    """
+    Positions along one axis: n points at spacing d, block centered on 6 mm and clamped to [lo, hi].
+    """
+    n = _simple_axis_count(axis_distance_mm, spot_diameter_um)
+    d = max(axis_distance_mm, 1e-6)
+    pos = lo + np.arange(n, dtype=np.float64) * d
+    if n == 0:
+        return pos
+    offset = 6.0 - (pos[0] + pos[-1]) / 2.0
+    offset = max(lo - pos[0], min(hi - pos[-1], offset))
+    return pos + offset
+
+
 def _generate_simple_grid_with_spacing(
     axis_distance_mm: float,
     spot_diameter_um: int,
-) -> tuple[list[tuple[float, float]], float]:
+) -> tuple[np.ndarray, np.ndarray, float]:
     """
-    Generate grid points entirely inside aperture (spots fit within 12×12).
-    Returns (candidates, achieved_coverage_pct).
+    Grid points entirely inside aperture (spots fit within 12×12), in boustrophedon order.
+    Returns (xs, ys, achieved_coverage_pct).
     Grid is centered in the valid region [r, 12-r] × [r, 12-r].
+    Order: rows by y ascending; even rows x ascending, odd rows x descending.
     """
-    spot_area = _spot_area_mm2(spot_diameter_um)
     x_min, x_max, y_min, y_max = _simple_valid_region(spot_diameter_um)
-    d = max(axis_distance_mm, 1e-6)
-
-    candidates: list[tuple[float, float]] = []
-    x = x_min
-    while x <= x_max + 1e-9:
-        y = y_min
-        while y <= y_max + 1e-9:
-            candidates.append((x, y))
-            y += d
-        x += d
-
-    if candidates:
-        xs = [p[0] for p in candidates]
-        ys = [p[1] for p in candidates]
-        grid_cx = (min(xs) + max(xs)) / 2.0
-        grid_cy = (min(ys) + max(ys)) / 2.0
-        target_cx, target_cy = 6.0, 6.0
-        offset_x = target_cx - grid_cx
-        offset_y = target_cy - grid_cy
-        offset_x = max(x_min - min(xs), min(x_max - max(xs), offset_x))
-        offset_y = max(y_min - min(ys), min(y_max - max(ys), offset_y))
-        candidates = [(px + offset_x, py + offset_y) for px, py in candidates]
-
-    n = len(candidates)
-    achieved = (100.0 * n * spot_area / SIMPLE_AREA_MM2) if n > 0 else 0.0
-    return candidates, achieved
+    col_x = _simple_axis_positions(axis_distance_mm, spot_diameter_um, x_min, x_max)
+    row_y = _simple_axis_positions(axis_distance_mm, spot_diameter_um, y_min, y_max)
+    grid_x = np.tile(col_x, (row_y.shape[0], 1))
+    grid_x[1::2] = grid_x[1::2, ::-1]
+    grid_y = np.repeat(row_y, col_x.shape[0])
+    n = grid_y.shape[0]
+    achieved = (100.0 * n * _spot_area_mm2(spot_diameter_um) / SIMPLE_AREA_MM2) if n > 0 else 0.0
+    return grid_x.ravel(), grid_y, achieved
 
 
 def generate_grid_simple(
@@ -129,6 +128,7 @@ def generate_grid_simple(
     User provides EITHER target_coverage_pct OR axis_distance_mm.
     - If axis_distance_mm: fill aperture with that spacing, report achieved coverage.
     - If target_coverage_pct: find axis_distance to hit target, report it.
+      The search uses the analytic point count; the lattice is built once for the result.
 
     All treatment points fit entirely inside aperture (spot centers in [r, 12-r]×[r, 12-r]).
     Emission order: boustrophedon.
@@ -139,64 +139,38 @@ def generate_grid_simple(
         raise ValueError("Provide only one: target_coverage_pct or axis_distance_mm")
 
     spot_area = _spot_area_mm2(spot_diameter_um)
-    x_min, x_max, y_min, y_max = _simple_valid_region(spot_diameter_um)
 
     if axis_distance_mm is not None:
         # User provided spacing: use it, fill aperture
-        candidates, achieved = _generate_simple_grid_with_spacing(axis_distance_mm, spot_diameter_um)
         used_axis_distance = axis_distance_mm
-        used_target = achieved
     else:
-        # User provided target coverage: binary search axis_distance
+        # User provided target coverage: binary search axis_distance on the analytic count
         target_n = max(1, int(round((target_coverage_pct / 100.0) * SIMPLE_AREA_MM2 / spot_area)))
         d_lo, d_hi = 0.3, 5.0
-        best_candidates: list[tuple[float, float]] = []
+        best_n = 0
         best_d = 0.8
         for _ in range(25):
             d_mid = (d_lo + d_hi) / 2.0
-            cand, _ = _generate_simple_grid_with_spacing(d_mid, spot_diameter_um)
-            n = len(cand)
-            if not best_candidates or abs(n - target_n) < abs(len(best_candidates) - target_n):
-                best_candidates = cand
+            n = _simple_axis_count(d_mid, spot_diameter_um) ** 2
+            if best_n == 0 or abs(n - target_n) < abs(best_n - target_n):
+                best_n = n
                 best_d = d_mid
             if n > target_n:
                 d_lo = d_mid
             else:
                 d_hi = d_mid
-        candidates = best_candidates
         used_axis_distance = best_d
-        used_target = target_coverage_pct
-        achieved = (100.0 * len(candidates) * spot_area / SIMPLE_AREA_MM2) if candidates else 0.0
-
-    # Boustrophedon order (use actual grid extent after centering)
-    d = used_axis_distance
-    cand_ys = [p[1] for p in candidates]
-    grid_y_min = min(cand_ys) if candidates else y_min
-
-    def _boustrophedon_key(p: tuple[float, float]) -> tuple[float, float]:
-        x, y = p
-        row_idx = round((y - grid_y_min) / d) if d > 0 else 0
-        x_sort = x if row_idx % 2 == 0 else -x
-        return (y, x_sort)
-
-    candidates.sort(key=_boustrophedon_key)
+    xs, ys, achieved = _generate_simple_grid_with_spacing(used_axis_distance, spot_diameter_um)
 
     cx_tl, cy_tl = 6.0, 6.0
-    spots: list[GridSpot] = []
-    for seq_idx, (x_tl, y_tl) in enumerate(candidates):
-        dx = x_tl - cx_tl
-        dy = y_tl - cy_tl
-        t_mm = math.hypot(dx, dy)
-        theta_deg = math.degrees(math.atan2(dy, dx))
-        spots.append(
-            GridSpot(
-                sequence_index=seq_idx,
-                x_mm=x_tl,
-                y_mm=y_tl,
-                theta_deg=theta_deg,
-                t_mm=t_mm,
-            )
+    dx = xs - cx_tl
+    dy = ys - cy_tl
+    spots = [
+        GridSpot(sequence_index=seq_idx, x_mm=x, y_mm=y, theta_deg=th, t_mm=t)
+        for seq_idx, (x, y, th, t) in enumerate(
+            zip(xs.tolist(), ys.tolist(), np.degrees(np.arctan2(dy, dx)).tolist(), np.hypot(dx, dy).tolist())
         )
+    ]
 
     return GridGeneratorResult(
         spots=spots,
@@ -224,7 +198,7 @@ def generate_grid_advanced(
     - Origin: center (0, 0); radius 12.5 mm.
     - Diameter lines at 0°, angle_step°, 2×angle_step°, … up to 175°.
     - Candidate-based selection with target_coverage_pct or fixed spacing.
-    - Reuses plan_grid logic with full-aperture circle mask.
+    - Analytic full-circle engine (plan_grid.generate_plan_full_aperture): no mask polygon.
     """
     if target_coverage_pct is None and axis_distance_mm is None:
         raise ValueError(
@@ -235,38 +209,25 @@ def generate_grid_advanced(
             "Provide only one: target_coverage_pct or axis_distance_mm for advanced aperture"
         )
 
-    spot_diameter_mm = spot_diameter_um / 1000.0
-    circle_verts = _circle_polygon(0.0, 0.0, APERTURE_RADIUS_MM)
-    full_aperture_mask = MaskPolygon(mask_id=0, vertices=circle_verts, mask_label=None)
-
-    plan = generate_plan(
-        masks=[full_aperture_mask],
-        target_coverage_pct=target_coverage_pct or 0.0,
-        coverage_per_mask=None,
-        image_width_mm=25.0,
+    plan = generate_plan_full_aperture(
+        target_coverage_pct,
         angle_step_deg=angle_step_deg,
-        spot_diameter_mm=spot_diameter_mm,
-        use_unison_grid=True,
+        spot_diameter_mm=spot_diameter_um / 1000.0,
         grid_spacing_mm=axis_distance_mm,
     )
 
-    # Estimate effective radial spacing (distance between rings) from plan spots.
-    spacing_est: float | None = None
-    radii = sorted({abs(s.t_mm) for s in plan.spots if abs(s.t_mm) > 1e-6})
-    if radii:
-        spacing_est = radii[0]
-
-    spots: list[GridSpot] = []
-    for seq_idx, s in enumerate(plan.spots):
-        spots.append(
-            GridSpot(
-                sequence_index=seq_idx,
-                x_mm=s.x_mm,
-                y_mm=s.y_mm,
-                theta_deg=s.theta_deg,
-                t_mm=s.t_mm,
-            )
+    # Effective radial spacing (distance between rings) = smallest non-zero radius.
+    arrays = plan.arrays
+    radii = np.abs(arrays.t_mm)
+    radii = radii[radii > 1e-6]
+    spacing_est = float(radii.min()) if radii.size else None
+
+    spots = [
+        GridSpot(sequence_index=seq_idx, x_mm=x, y_mm=y, theta_deg=th, t_mm=t)
+        for seq_idx, (x, y, th, t) in enumerate(
+            zip(arrays.x_mm.tolist(), arrays.y_mm.tolist(), arrays.theta_deg.tolist(), arrays.t_mm.tolist())
         )
+    ]
 
     achieved = plan.achieved_coverage_pct or 0.0
     used_spacing = spacing_est
@@ -283,6 +244,7 @@ def generate_grid_advanced(
             "axis_distance_mm": round(used_spacing, 4) if used_spacing is not None else None,
             "angle_step_deg": angle_step_deg,
         },
+        spacing_evaluations=plan.spacing_evaluations,
     )
 
 
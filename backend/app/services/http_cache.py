@@ -0,0 +1,67 @@
+"""
+Conditional-GET helpers for iteration artifacts (spots, exports): strong ETags, 304, Cache-Control.
+
+- ETag: quoted SHA-256 prefix over the parts that fully determine the representation
+  (iteration id, created_at, format, serialization version, mask/image fingerprints).
+- If-None-Match uses the weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored, "*" matches.
+- Cache-Control: responses are per-user (private). Accepted iterations are frozen, so their
+  immutable artifacts may be cached outright; drafts must be revalidated (they can be deleted).
+"""
+
+from __future__ import annotations
+
+import hashlib
+
+from fastapi import Request, Response, status
+
+# Bump when the JSON/CSV/binary/export serialization changes (invalidates client caches)
+ARTIFACT_ETAG_VERSION = 1
+# Accepted iteration, content immutable (spots)
+CACHE_CONTROL_IMMUTABLE = "private, max-age=31536000, immutable"
+# Accepted iteration, content still depends on mutable inputs (masks, image file)
+CACHE_CONTROL_ACCEPTED = "private, max-age=300"
+# Draft / rejected: always revalidate with If-None-Match
+CACHE_CONTROL_REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts: object) -> str:
+    """Strong ETag over the given parts (str() of each, in order)."""
+    digest = hashlib.sha256()
+    for part in (ARTIFACT_ETAG_VERSION, *parts):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if If-None-Match lists etag (or *)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def cache_control_for(iteration_status: str, immutable: bool) -> str:
+    if iteration_status != "accepted":
+        return CACHE_CONTROL_REVALIDATE
+    return CACHE_CONTROL_IMMUTABLE if immutable else CACHE_CONTROL_ACCEPTED
+
+
+def cache_headers(etag: str, cache_control: str, vary: str | None = None) -> dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if vary:
+        headers["Vary"] = vary
+    return headers
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    """304 with the validator and caching headers only (no body)."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
@@ -0,0 +1,95 @@
+"""
+Image metadata captured at upload: pixel size and SHA-256 of the file content.
+
+Planning needs only height_mm = width_mm * height_px / width_px, so it reads the images row
+instead of opening the file. PIL reads just the header here (Image.open is lazy, no decode).
+Rows created before the columns existed are filled by backfill_image_dimensions
+(scripts/backfill_image_dimensions.py) or lazily on first planning.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image, UnidentifiedImageError
+
+# Read size when hashing files (backfill)
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ImageMeta:
+    """Pixel dimensions and content hash of one image file."""
+
+    width_px: int
+    height_px: int
+    content_sha256: str
+
+
+def _image_size(source: Path | io.BytesIO) -> tuple[int, int] | None:
+    try:
+        with Image.open(source) as img:
+            w, h = img.size
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+    if w <= 0 or h <= 0:
+        return None
+    return w, h
+
+
+def probe_image_bytes(contents: bytes) -> ImageMeta | None:
+    """Metadata for uploaded bytes, or None if they are not a readable image."""
+    size = _image_size(io.BytesIO(contents))
+    if size is None:
+        return None
+    return ImageMeta(width_px=size[0], height_px=size[1], content_sha256=hashlib.sha256(contents).hexdigest())
+
+
+def probe_image_file(path: Path, content_sha256: str | None = None) -> ImageMeta | None:
+    """Metadata for a stored file (hashed in chunks unless the hash is given), or None if missing/unreadable."""
+    if not path.is_file():
+        return None
+    size = _image_size(path)
+    if size is None:
+        return None
+    if content_sha256 is None:
+        digest = hashlib.sha256()
+        with path.open("rb") as handle:
+            while chunk := handle.read(_HASH_CHUNK_BYTES):
+                digest.update(chunk)
+        content_sha256 = digest.hexdigest()
+    return ImageMeta(width_px=size[0], height_px=size[1], content_sha256=content_sha256)
+
+
+def store_image_meta(db: sqlite3.Connection, image_id: int, meta: ImageMeta) -> None:
+    """Write width_px/height_px/content_sha256 for one image (caller commits)."""
+    db.execute(
+        "UPDATE images SET width_px = ?, height_px = ?, content_sha256 = ? WHERE id = ?",
+        (meta.width_px, meta.height_px, meta.content_sha256, image_id),
+    )
+
+
+def height_mm_from_pixels(width_mm: float, width_px: int | None, height_px: int | None) -> float | None:
+    """height_mm = width_mm * H / W, or None when the pixel size is unknown."""
+    if not width_px or not height_px or width_px <= 0:
+        return None
+    return width_mm * height_px / width_px
+
+
+def backfill_image_dimensions(db: sqlite3.Connection, upload_dir: Path) -> tuple[int, int]:
+    """Fill metadata for rows without width_px; returns (updated, missing_or_unreadable)."""
+    rows = db.execute("SELECT id, storage_path FROM images WHERE width_px IS NULL").fetchall()
+    updated = missing = 0
+    for image_id, storage_path in rows:
+        meta = probe_image_file(upload_dir / Path(storage_path).name)
+        if meta is None:
+            missing += 1
+            continue
+        store_image_meta(db, image_id, meta)
+        updated += 1
+    db.commit()
+    return updated, missing
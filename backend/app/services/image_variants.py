@@ -0,0 +1,92 @@
+"""
+Downscaled variants of uploaded images (thumbnail / medium) for list tiles and overviews.
+
+- Sizes: "thumb" and "medium" bound the longest side (IMAGE_VARIANT_MAX_PX); "full" is the
+  original file. Images already within the bound are served as the original (no copy).
+- Generated lazily on first request and kept on disk; the key is the content hash (uploads are
+  content-addressed) or, for legacy rows without a hash, file name + mtime + size, so a variant is
+  shared by identical uploads and never outlives its source content.
+- Storage: the shared ExportRenderCache for IMAGE_VARIANT_CACHE_DIR, default <UPLOAD_DIR>/.variant-cache,
+  bounded by IMAGE_VARIANT_CACHE_MAX_BYTES (default 512 MiB, LRU by mtime).
+- Output keeps the source format (PNG stays PNG with alpha, JPEG is re-encoded at quality 85).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+from pathlib import Path
+
+from PIL import Image
+
+from app.services.export_cache import ExportRenderCache, shared_render_cache
+
+IMAGE_SIZE_FULL = "full"
+# Longest side in pixels per variant
+IMAGE_VARIANT_MAX_PX = {"thumb": 320, "medium": 1280}
+IMAGE_SIZES = (*IMAGE_VARIANT_MAX_PX, IMAGE_SIZE_FULL)
+# Bump when the resampling or encoding changes (old variant files age out of the cache)
+IMAGE_VARIANT_VERSION = 1
+IMAGE_VARIANT_DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+JPEG_VARIANT_QUALITY = 85
+
+
+def variant_format(path: Path) -> str:
+    """Cache/output format for a source file: "png" or "jpg"."""
+    return "png" if path.suffix.lower() == ".png" else "jpg"
+
+
+def variant_key(source: Path, size: str, content_sha256: str | None) -> str:
+    """Cache key for one variant of a source file."""
+    if content_sha256:
+        identity = content_sha256
+    else:
+        stat = source.stat()
+        identity = f"{source.name}:{stat.st_mtime_ns}:{stat.st_size}"
+    text = f"v{IMAGE_VARIANT_VERSION}:{size}:{IMAGE_VARIANT_MAX_PX[size]}:{identity}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def needs_variant(size: str, width_px: int | None, height_px: int | None) -> bool:
+    """False when the original already fits the variant bound (or size is "full")."""
+    if size == IMAGE_SIZE_FULL:
+        return False
+    if not width_px or not height_px:
+        return True
+    return max(width_px, height_px) > IMAGE_VARIANT_MAX_PX[size]
+
+
+def render_variant(source: Path, size: str) -> bytes | None:
+    """Downscaled PNG/JPEG bytes with the longest side <= the variant bound; None if already smaller."""
+    max_px = IMAGE_VARIANT_MAX_PX[size]
+    output_format = variant_format(source)
+    with Image.open(source) as img:
+        if max(img.size) <= max_px:
+            return None
+        # JPEG: decode directly at 1/2, 1/4 or 1/8 scale before resampling
+        img.draft("RGB", (max_px, max_px))
+        if output_format == "jpg":
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert("RGBA")
+        img.thumbnail((max_px, max_px), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        buf = io.BytesIO()
+        if output_format == "jpg":
+            img.save(buf, format="JPEG", quality=JPEG_VARIANT_QUALITY)
+        else:
+            img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def get_variant_cache(upload_dir: Path) -> ExportRenderCache:
+    """Variant cache from IMAGE_VARIANT_CACHE_DIR / IMAGE_VARIANT_CACHE_MAX_BYTES (relative dir -> under backend/)."""
+    base = os.environ.get("IMAGE_VARIANT_CACHE_DIR", "").strip()
+    if base:
+        directory = Path(base)
+        if not directory.is_absolute():
+            directory = Path(__file__).resolve().parent.parent.parent / directory
+    else:
+        directory = upload_dir / ".variant-cache"
+    max_bytes = int(os.environ.get("IMAGE_VARIANT_CACHE_MAX_BYTES", str(IMAGE_VARIANT_DEFAULT_MAX_BYTES)))
+    return shared_render_cache(directory, max_bytes)
@@ -0,0 +1,173 @@
+"""
+Keyset (cursor) pagination on (created_at, id) and cached approximate totals.
+
+- A page continues strictly after the last row of the previous one:
+  (created_at, id) < (?, ?) for desc, > for asc. SQLite compares row values in one step and walks
+  the (filter..., created_at) index from that point, so deep pages cost the same as page 1
+  (OFFSET reads and discards every skipped row). id breaks created_at ties, so no row is skipped
+  or repeated; it is the rowid, i.e. implicitly the last column of every index.
+- Cursor: opaque base64url JSON {"c": created_at, "i": id, "o": order}; decode_cursor raises
+  ValueError for malformed cursors or a cursor taken with the other sort order.
+- Totals: COUNT(*) is O(rows). ApproxCountCache keeps (count, max id) per filter and tops it
+  up with the rows added since (id > max id: a rowid range, cheap on an append-mostly table); a
+  full recount happens every refresh_seconds, which also picks up deleted rows.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+# Full COUNT(*) at most this often per filter (in between: incremental by id)
+APPROX_COUNT_REFRESH_SECONDS = 300.0
+APPROX_COUNT_MAX_ENTRIES = 256
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """Position after a row: its created_at and id, and the sort order it belongs to."""
+
+    created_at: str
+    id: int
+    order: str
+
+
+def encode_cursor(created_at: str, row_id: int, order: str) -> str:
+    raw = json.dumps({"c": created_at, "i": row_id, "o": order}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, order: str) -> Cursor:
+    """Parse a cursor from encode_cursor; ValueError if malformed or for the other order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        parsed = Cursor(created_at=str(data["c"]), id=int(data["i"]), order=str(data["o"]))
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if parsed.order != order:
+        raise ValueError("Cursor does not match sort order")
+    return parsed
+
+
+def parse_cursor(cursor: str | None, sort: str, order: str) -> Cursor | None:
+    """Cursor query parameter -> Cursor (None for offset pages); ValueError unless sort is created_at."""
+    if cursor is None:
+        return None
+    if sort != "created_at":
+        raise ValueError("Cursor pagination requires sort=created_at")
+    return decode_cursor(cursor, order)
+
+
+def keyset_condition(
+    created_at_col: str, id_col: str, order: str, cursor: Cursor | None
+) -> tuple[str, list]:
+    """SQL fragment ("" on the first page) and params continuing after cursor."""
+    if cursor is None:
+        return "", []
+    op = ">" if order == "asc" else "<"
+    return f" AND ({created_at_col}, {id_col}) {op} (?, ?)", [cursor.created_at, cursor.id]
+
+
+def keyset_order_by(created_at_col: str, id_col: str, order: str) -> str:
+    direction = "ASC" if order == "asc" else "DESC"
+    return f"ORDER BY {created_at_col} {direction}, {id_col} {direction}"
+
+
+def next_cursor(
+    rows: Sequence[sqlite3.Row],
+    page_size: int,
+    order: str,
+    created_at_key: str = "created_at",
+    id_key: str = "id",
+) -> str | None:
+    """Cursor after the last row of a page fetched with LIMIT page_size + 1 (None = last page)."""
+    if len(rows) <= page_size:
+        return None
+    last = rows[page_size - 1]
+    return encode_cursor(last[created_at_key], int(last[id_key]), order)
+
+
+def fetch_keyset_page(
+    db: sqlite3.Connection,
+    select_sql: str,
+    base_sql: str,
+    params: Sequence,
+    *,
+    created_at_col: str,
+    id_col: str,
+    order: str,
+    page_size: int,
+    cursor: Cursor | None,
+    offset: int = 0,
+) -> tuple[list[sqlite3.Row], str | None]:
+    """
+    One page ordered by (created_at, id): after cursor when given, else at offset (legacy page=N).
+    base_sql is "FROM ... WHERE ..."; select_sql must include the created_at and id columns.
+    Returns the rows and the cursor of the next page (None on the last page).
+    """
+    condition, condition_params = keyset_condition(created_at_col, id_col, order, cursor)
+    rows = db.execute(
+        f"{select_sql} {base_sql}{condition} {keyset_order_by(created_at_col, id_col, order)} LIMIT ? OFFSET ?",
+        [*params, *condition_params, page_size + 1, 0 if cursor is not None else offset],
+    ).fetchall()
+    return rows[:page_size], next_cursor(rows, page_size, order)
+
+
+class ApproxCountCache:
+    """Per-filter row counts kept current by counting only rows added since the last count."""
+
+    def __init__(
+        self,
+        refresh_seconds: float = APPROX_COUNT_REFRESH_SECONDS,
+        max_entries: int = APPROX_COUNT_MAX_ENTRIES,
+    ) -> None:
+        self.refresh_seconds = refresh_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[int, int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, db: sqlite3.Connection, base_sql: str, params: Sequence, id_col: str) -> int:
+        """
+        Rows matched by base_sql ("FROM ... WHERE ..."), approximately: exact at the last full
+        count plus rows with a larger id since. id_col must be the table's increasing rowid.
+        """
+        key = (base_sql, tuple(params))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None and now - entry[2] < self.refresh_seconds:
+            total, max_id, counted_at = entry
+            row = db.execute(
+                f"SELECT COUNT(*), MAX({id_col}) {base_sql} AND {id_col} > ?", [*params, max_id]
+            ).fetchone()
+            added = int(row[0] or 0)
+            if added == 0:
+                return total
+            total, max_id = total + added, int(row[1])
+        else:
+            row = db.execute(f"SELECT COUNT(*), MAX({id_col}) {base_sql}", list(params)).fetchone()
+            total, max_id, counted_at = int(row[0] or 0), int(row[1] or 0), now
+        with self._lock:
+            self._entries[key] = (total, max_id, counted_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return total
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide totals used by the list endpoints (keys contain the SQL, so one cache serves all)
+approx_counts = ApproxCountCache()
@@ -0,0 +1,311 @@
+"""
+Mask polygon geometry: area, centroid, point-in-polygon (ray casting) and batched containment.
+
+Vertices are (x, y) tuples in mm, in any consistent frame (planner: center mm, DB: top-left mm).
+parse_mask_vertices reads the stored masks.vertices JSON ({x, y} objects or [x, y] pairs).
+
+Batched containment (NumPy): a polygon is prepared once (edge arrays, bbox, area, centroid,
+y-bucketed edges); a batch of points is tested by broadcasting points × edges and counting
+crossings (odd = inside). Points are grouped by y-bucket so each point only meets the edges
+whose y-span overlaps its bucket. Same crossing rule as point_in_polygon, so both give identical
+answers (horizontal edges never count).
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+# Upper bound on points × edges per broadcast block (keeps temporaries at a few MB)
+_BROADCAST_BLOCK = 1 << 18
+# Below this many edges a single bucket is cheaper than grouping points by y
+_MIN_EDGES_FOR_BUCKETS = 48
+_MAX_Y_BUCKETS = 256
+
+
+def parse_mask_vertices(raw: str | list | None) -> list[tuple[float, float]] | None:
+    """
+    masks.vertices JSON -> [(x, y), ...]; points may be {x, y} objects or [x, y] pairs (others are
+    skipped). None when unusable (invalid JSON, non-numeric coordinates, fewer than 3 points).
+    """
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else raw
+    except (TypeError, json.JSONDecodeError):
+        return None
+    if not isinstance(data, list):
+        return None
+    verts: list[tuple[float, float]] = []
+    try:
+        for p in data:
+            if isinstance(p, dict) and "x" in p and "y" in p:
+                verts.append((float(p["x"]), float(p["y"])))
+            elif isinstance(p, (list, tuple)) and len(p) >= 2:
+                verts.append((float(p[0]), float(p[1])))
+    except (TypeError, ValueError):
+        return None
+    return verts if len(verts) >= 3 else None
+
+
+def point_in_polygon(px: float, py: float, vertices: Sequence[tuple[float, float]]) -> bool:
+    """Ray casting: odd number of crossings = inside."""
+    n = len(vertices)
+    if n < 3:
+        return False
+    inside = False
+    x1, y1 = vertices[0]
+    for i in range(1, n + 1):
+        x2, y2 = vertices[i % n]
+        if min(y1, y2) < py <= max(y1, y2) and px <= max(x1, x2):
+            if y1 != y2:
+                x_intersect = (py - y1) * (x2 - x1) / (y2 - y1) + x1
+            if y1 == y2 or px <= x_intersect:
+                inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+def polygon_area(vertices: Sequence[tuple[float, float]]) -> float:
+    """Shoelace formula; vertices in mm. Returns area in mm² (absolute value)."""
+    if len(vertices) < 3:
+        return 0.0
+    n = len(vertices)
+    area = 0.0
+    for i in range(n):
+        j = (i + 1) % n
+        area += vertices[i][0] * vertices[j][1]
+        area -= vertices[j][0] * vertices[i][1]
+    return abs(area) / 2.0
+
+
+def polygon_centroid(vertices: Sequence[tuple[float, float]]) -> tuple[float, float]:
+    """Area centroid of a simple polygon; vertex mean when the area is zero."""
+    n = len(vertices)
+    if n == 0:
+        return (0.0, 0.0)
+    a2 = 0.0
+    cx = 0.0
+    cy = 0.0
+    for i in range(n):
+        x1, y1 = vertices[i]
+        x2, y2 = vertices[(i + 1) % n]
+        cross = x1 * y2 - x2 * y1
+        a2 += cross
+        cx += (x1 + x2) * cross
+        cy += (y1 + y2) * cross
+    if abs(a2) < 1e-12:
+        return (sum(v[0] for v in vertices) / n, sum(v[1] for v in vertices) / n)
+    return (cx / (3.0 * a2), cy / (3.0 * a2))
+
+
+def polygon_bbox(vertices: Sequence[tuple[float, float]]) -> tuple[float, float, float, float]:
+    """(x_min, y_min, x_max, y_max) of the vertices."""
+    xs = [v[0] for v in vertices]
+    ys = [v[1] for v in vertices]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+@dataclass(frozen=True, eq=False)
+class PreparedPolygon:
+    """
+    Polygon compiled once per planning run: bbox, area, area centroid, edge arrays and
+    y-bucketed edge indices. Edge arrays hold only non-horizontal edges (horizontal edges
+    never produce a crossing).
+    """
+
+    vertices: tuple[tuple[float, float], ...]
+    bbox: tuple[float, float, float, float]
+    area: float
+    centroid: tuple[float, float]
+    edge_x1: np.ndarray
+    edge_y1: np.ndarray
+    edge_dx: np.ndarray
+    edge_dy: np.ndarray
+    edge_y_min: np.ndarray
+    edge_y_max: np.ndarray
+    edge_x_max: np.ndarray
+    # Bucket k covers y in [bucket_y0 + k*h, bucket_y0 + (k+1)*h), h = 1 / bucket_inv_h;
+    # bucket_edges[k] = indices of edges whose [y_min, y_max] overlaps bucket k.
+    bucket_y0: float
+    bucket_inv_h: float
+    bucket_edges: tuple[np.ndarray, ...]
+
+    @property
+    def is_degenerate(self) -> bool:
+        return len(self.vertices) < 3
+
+    def _bucket_of(self, y: np.ndarray) -> np.ndarray:
+        k = np.floor((y - self.bucket_y0) * self.bucket_inv_h)
+        return np.clip(k, 0, len(self.bucket_edges) - 1).astype(np.int64)
+
+
+def _build_y_buckets(
+    y_lo: float, y_hi: float, edge_y_min: np.ndarray, edge_y_max: np.ndarray
+) -> tuple[float, float, tuple[np.ndarray, ...]]:
+    """Split [y_lo, y_hi] into equal bands and list the edges overlapping each band."""
+    n_edges = edge_y_min.shape[0]
+    all_edges = np.arange(n_edges)
+    span = y_hi - y_lo
+    if n_edges < _MIN_EDGES_FOR_BUCKETS or span <= 0:
+        return (y_lo, 0.0, (all_edges,))
+    n_buckets = min(_MAX_Y_BUCKETS, max(2, int(2 * np.sqrt(n_edges))))
+    inv_h = n_buckets / span
+    first = np.clip(np.floor((edge_y_min - y_lo) * inv_h), 0, n_buckets - 1).astype(np.int64)
+    last = np.clip(np.floor((edge_y_max - y_lo) * inv_h), 0, n_buckets - 1).astype(np.int64)
+    buckets: list[list[int]] = [[] for _ in range(n_buckets)]
+    for e, (b0, b1) in enumerate(zip(first.tolist(), last.tolist())):
+        for b in range(b0, b1 + 1):
+            buckets[b].append(e)
+    return (y_lo, inv_h, tuple(np.asarray(b, dtype=np.int64) for b in buckets))
+
+
+def prepare_polygon(vertices: Sequence[tuple[float, float]]) -> PreparedPolygon:
+    """Build bbox, area, centroid, edge arrays and y-buckets for one polygon (O(vertices))."""
+    verts = tuple((float(x), float(y)) for x, y in vertices)
+    if len(verts) < 3:
+        empty = np.empty(0, dtype=np.float64)
+        return PreparedPolygon(
+            verts, (0.0, 0.0, 0.0, 0.0), 0.0, polygon_centroid(verts),
+            empty, empty, empty, empty, empty, empty, empty,
+            0.0, 0.0, (np.empty(0, dtype=np.int64),),
+        )
+    arr = np.asarray(verts, dtype=np.float64)
+    x1, y1 = arr[:, 0], arr[:, 1]
+    nxt = np.roll(arr, -1, axis=0)
+    x2, y2 = nxt[:, 0], nxt[:, 1]
+    keep = y1 != y2
+    x1, y1, x2, y2 = x1[keep], y1[keep], x2[keep], y2[keep]
+    edge_y_min = np.minimum(y1, y2)
+    edge_y_max = np.maximum(y1, y2)
+    bbox = (float(arr[:, 0].min()), float(arr[:, 1].min()), float(arr[:, 0].max()), float(arr[:, 1].max()))
+    bucket_y0, bucket_inv_h, bucket_edges = _build_y_buckets(bbox[1], bbox[3], edge_y_min, edge_y_max)
+    return PreparedPolygon(
+        vertices=verts,
+        bbox=bbox,
+        area=polygon_area(verts),
+        centroid=polygon_centroid(verts),
+        edge_x1=x1,
+        edge_y1=y1,
+        edge_dx=x2 - x1,
+        edge_dy=y2 - y1,
+        edge_y_min=edge_y_min,
+        edge_y_max=edge_y_max,
+        edge_x_max=np.maximum(x1, x2),
+        bucket_y0=bucket_y0,
+        bucket_inv_h=bucket_inv_h,
+        bucket_edges=bucket_edges,
+    )
+
+
+def _as_prepared(polygon: PreparedPolygon | Sequence[tuple[float, float]]) -> PreparedPolygon:
+    return polygon if isinstance(polygon, PreparedPolygon) else prepare_polygon(polygon)
+
+
+def _crossings_odd_for_edges(
+    poly: PreparedPolygon, edges: np.ndarray | None, px: np.ndarray, py: np.ndarray
+) -> np.ndarray:
+    """Broadcast points × edges (all edges when edges is None); True where crossings are odd."""
+    if edges is None:
+        x1, y1, dx, dy = poly.edge_x1, poly.edge_y1, poly.edge_dx, poly.edge_dy
+        y_min, y_max, x_max = poly.edge_y_min, poly.edge_y_max, poly.edge_x_max
+    else:
+        x1, y1, dx, dy = poly.edge_x1[edges], poly.edge_y1[edges], poly.edge_dx[edges], poly.edge_dy[edges]
+        y_min, y_max, x_max = poly.edge_y_min[edges], poly.edge_y_max[edges], poly.edge_x_max[edges]
+    n_edges = x1.shape[0]
+    out = np.zeros(px.shape[0], dtype=bool)
+    if n_edges == 0 or px.shape[0] == 0:
+        return out
+    block = max(1, _BROADCAST_BLOCK // n_edges)
+    for start in range(0, px.shape[0], block):
+        bx = px[start : start + block, None]
+        by = py[start : start + block, None]
+        span = (y_min < by) & (by <= y_max) & (bx <= x_max)
+        x_intersect = (by - y1) * dx / dy + x1
+        crossings = np.count_nonzero(span & (bx <= x_intersect), axis=1)
+        out[start : start + block] = (crossings & 1).astype(bool)
+    return out
+
+
+def _crossings_odd(poly: PreparedPolygon, px: np.ndarray, py: np.ndarray) -> np.ndarray:
+    """Crossing parity per point; points only meet the edges of their y-bucket."""
+    if len(poly.bucket_edges) == 1:
+        return _crossings_odd_for_edges(poly, None, px, py)
+    out = np.zeros(px.shape[0], dtype=bool)
+    bucket = poly._bucket_of(py)
+    order = np.argsort(bucket, kind="stable")
+    sorted_bucket = bucket[order]
+    starts = np.flatnonzero(np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]])
+    ends = np.r_[starts[1:], sorted_bucket.shape[0]]
+    for a, b in zip(starts.tolist(), ends.tolist()):
+        sel = order[a:b]
+        out[sel] = _crossings_odd_for_edges(poly, poly.bucket_edges[sorted_bucket[a]], px[sel], py[sel])
+    return out
+
+
+def contains_points(
+    polygon: PreparedPolygon | Sequence[tuple[float, float]],
+    xs: np.ndarray | Sequence[float],
+    ys: np.ndarray | Sequence[float],
+) -> np.ndarray:
+    """
+    Boolean mask: which points (xs[i], ys[i]) lie inside the polygon.
+    Points outside the bounding box are rejected without touching the edges
+    (a ray from outside the bbox always crosses an even number of edges).
+    """
+    poly = _as_prepared(polygon)
+    px = np.asarray(xs, dtype=np.float64)
+    py = np.asarray(ys, dtype=np.float64)
+    inside = np.zeros(px.shape[0], dtype=bool)
+    if poly.is_degenerate or px.shape[0] == 0:
+        return inside
+    x_min, y_min, x_max, y_max = poly.bbox
+    cand = np.flatnonzero((px >= x_min) & (px <= x_max) & (py >= y_min) & (py <= y_max))
+    if cand.size:
+        inside[cand] = _crossings_odd(poly, px[cand], py[cand])
+    return inside
+
+
+def points_in_polygon(
+    points: Sequence[tuple[float, float]],
+    vertices: PreparedPolygon | Sequence[tuple[float, float]],
+) -> list[bool]:
+    """Containment for a batch of (x, y) tuples against one polygon."""
+    if not points:
+        return []
+    xs, ys = zip(*points)
+    return contains_points(vertices, xs, ys).tolist()
+
+
+def first_containing_polygon(
+    polygons: Sequence[PreparedPolygon | Sequence[tuple[float, float]]],
+    xs: np.ndarray | Sequence[float],
+    ys: np.ndarray | Sequence[float],
+) -> np.ndarray:
+    """
+    Index of the first polygon containing each point, -1 if none.
+    Each polygon only tests points not matched by an earlier one.
+    """
+    px = np.asarray(xs, dtype=np.float64)
+    py = np.asarray(ys, dtype=np.float64)
+    owner = np.full(px.shape[0], -1, dtype=np.int64)
+    remaining = np.arange(px.shape[0])
+    for k, polygon in enumerate(polygons):
+        if remaining.size == 0:
+            break
+        hit = contains_points(polygon, px[remaining], py[remaining])
+        owner[remaining[hit]] = k
+        remaining = remaining[~hit]
+    return owner
+
+
+def points_in_any_polygon(
+    points: Sequence[tuple[float, float]],
+    polygons: Sequence[PreparedPolygon | Sequence[tuple[float, float]]],
+) -> list[bool]:
+    """Containment in at least one polygon, for a batch of (x, y) tuples."""
+    if not points:
+        return []
+    xs, ys = zip(*points)
+    return (first_containing_polygon(polygons, xs, ys) >= 0).tolist()
@@ -0,0 +1,267 @@
+"""
+Plan result cache: content-hash key, in-memory LRU, SQLite table, single-flight.
+
+generate_plan_by_mode is deterministic in its inputs (masks in center mm, coverage,
+coverage_per_mask, mode, spacing), so identical re-plans reuse the stored result.
+- Key: SHA-256 of canonical JSON of all planner inputs + PLAN_CACHE_VERSION
+  (bump the version whenever planner output changes for the same inputs).
+- Layers: process-wide LRU (PlanResult objects) -> plan_cache table (column blobs)
+  -> compute. A missing table (DB without the migration) just disables the SQLite layer.
+- Transaction-neutral: SQLite access runs inside a SAVEPOINT on the caller's connection, so the
+  caller's pending work is neither committed nor rolled back here (outside a transaction the
+  savepoint commits on release; inside one, the caller's commit covers it).
+- Single-flight: concurrent requests for the same key wait for one computation.
+- Connection: either the caller's db, or a connect() factory used only around the SQLite lookup
+  and the store, so no pooled connection is held while compute() runs (background jobs).
+- Counters: hits (memory), db_hits, misses (computed), coalesced (waited on in-flight).
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+
+from app.services.plan_grid import MaskPolygon, PlanResult
+from app.services.spot_arrays import SpotArrays
+
+logger = logging.getLogger(__name__)
+
+# Bump when the planner changes output for identical inputs (invalidates old entries)
+PLAN_CACHE_VERSION = 3
+# In-memory LRU size (plans; a 20% full-aperture plan is ~70 KB of arrays)
+PLAN_CACHE_MAX_ENTRIES = 128
+# Rows kept in the plan_cache table (least recently used are pruned)
+PLAN_CACHE_DB_MAX_ROWS = 2000
+
+
+def plan_cache_key(
+    masks: list[MaskPolygon],
+    target_coverage_pct: float,
+    coverage_per_mask: dict[str, float] | None,
+    image_width_mm: float,
+    algorithm_mode: str,
+    grid_spacing_mm: float | None = None,
+) -> str:
+    """Content hash of the planner inputs (vertex order and mask order matter, as in the planner)."""
+    canonical = {
+        "v": PLAN_CACHE_VERSION,
+        "mode": algorithm_mode,
+        "target": target_coverage_pct,
+        "per_mask": sorted((coverage_per_mask or {}).items()),
+        "width": image_width_mm,
+        "spacing": grid_spacing_mm,
+        "masks": [
+            [m.mask_id, m.mask_label, [[x, y] for x, y in m.vertices]] for m in masks
+        ],
+    }
+    # json.dumps writes floats with repr(): exact round-trip, so equal inputs <=> equal text
+    text = json.dumps(canonical, separators=(",", ":"), allow_nan=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _freeze(result: PlanResult) -> PlanResult:
+    """Make the cached arrays read-only so callers cannot mutate shared state."""
+    for column in (
+        result.arrays.x_mm,
+        result.arrays.y_mm,
+        result.arrays.theta_deg,
+        result.arrays.t_mm,
+        result.arrays.mask_id,
+    ):
+        column.flags.writeable = False
+    return result
+
+
+def _share(result: PlanResult) -> PlanResult:
+    """Per-caller PlanResult over the same (read-only) arrays; records are rebuilt lazily."""
+    return dataclasses.replace(result)
+
+
+class PlanCache:
+    """Two-level plan cache with single-flight computation (thread-safe)."""
+
+    def __init__(self, max_entries: int = PLAN_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._memory: OrderedDict[str, PlanResult] = OrderedDict()
+        self._inflight: dict[str, Future[PlanResult]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+    def contains(self, key: str) -> bool:
+        """True when key is in the memory layer (no counters touched, LRU order unchanged)."""
+        with self._lock:
+            return key in self._memory
+
+    def clear(self) -> None:
+        """Drop memory entries and reset counters (SQLite rows are kept)."""
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.db_hits = self.misses = self.coalesced = 0
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], PlanResult],
+        db: sqlite3.Connection | None = None,
+        *,
+        connect: Callable[[], AbstractContextManager[sqlite3.Connection]] | None = None,
+    ) -> PlanResult:
+        """
+        Cached result for key; otherwise load from db or compute once (other callers wait).
+        connect (instead of db) opens a connection just for the lookup and for the store.
+        """
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return _share(cached)
+            waiter = self._inflight.get(key)
+            leader = waiter is None
+            if leader:
+                waiter = Future()
+                self._inflight[key] = waiter
+            else:
+                self.coalesced += 1
+        if not leader:
+            return _share(waiter.result())
+
+        try:
+            with _connection(db, connect) as conn:
+                result = _load_from_db(conn, key) if conn is not None else None
+            from_db = result is not None
+            if result is None:
+                result = compute()
+                with _connection(db, connect) as conn:
+                    if conn is not None:
+                        _store_in_db(conn, key, result)
+            result = _freeze(result)
+            with self._lock:
+                if from_db:
+                    self.db_hits += 1
+                else:
+                    self.misses += 1
+                self._memory[key] = result
+                self._memory.move_to_end(key)
+                while len(self._memory) > self.max_entries:
+                    self._memory.popitem(last=False)
+            waiter.set_result(result)
+            return _share(result)
+        except BaseException as exc:
+            waiter.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+def _connection(
+    db: sqlite3.Connection | None,
+    connect: Callable[[], AbstractContextManager[sqlite3.Connection]] | None,
+) -> AbstractContextManager[sqlite3.Connection | None]:
+    if db is None and connect is not None:
+        return connect()
+    return nullcontext(db)
+
+
+@contextmanager
+def _savepoint(db: sqlite3.Connection) -> Iterator[None]:
+    """Scope writes to a savepoint: released on success, rolled back (alone) on error."""
+    db.execute("SAVEPOINT plan_cache")
+    try:
+        yield
+    except BaseException:
+        db.execute("ROLLBACK TO plan_cache")
+        db.execute("RELEASE plan_cache")
+        raise
+    db.execute("RELEASE plan_cache")
+
+
+def _load_from_db(db: sqlite3.Connection, key: str) -> PlanResult | None:
+    try:
+        with _savepoint(db):
+            row = db.execute(
+                "SELECT achieved_coverage_pct, spots_count, spots_outside_mask_count, overlap_count, "
+                "plan_valid, fallback_used, spacing_evaluations, x_mm, y_mm, theta_deg, t_mm, mask_id "
+                "FROM plan_cache WHERE cache_key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE plan_cache SET last_used_at = datetime('now') WHERE cache_key = ?", (key,)
+                )
+    except sqlite3.OperationalError:
+        logger.debug("plan_cache table unavailable; using memory cache only.", exc_info=True)
+        return None
+    if row is None:
+        return None
+    return PlanResult(
+        arrays=SpotArrays.from_blobs(row[7], row[8], row[9], row[10], row[11]),
+        achieved_coverage_pct=row[0],
+        spots_count=row[1],
+        spots_outside_mask_count=row[2],
+        overlap_count=row[3],
+        plan_valid=row[4],
+        fallback_used=bool(row[5]),
+        spacing_evaluations=row[6],
+    )
+
+
+def _store_in_db(db: sqlite3.Connection, key: str, result: PlanResult) -> None:
+    x_blob, y_blob, theta_blob, t_blob, mask_blob = result.arrays.to_blobs()
+    try:
+        with _savepoint(db):
+            db.execute(
+                "INSERT OR REPLACE INTO plan_cache (cache_key, achieved_coverage_pct, spots_count, "
+                "spots_outside_mask_count, overlap_count, plan_valid, fallback_used, spacing_evaluations, "
+                "x_mm, y_mm, theta_deg, t_mm, mask_id, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), datetime('now'))",
+                (
+                    key,
+                    result.achieved_coverage_pct,
+                    result.spots_count,
+                    result.spots_outside_mask_count,
+                    result.overlap_count,
+                    result.plan_valid,
+                    1 if result.fallback_used else 0,
+                    result.spacing_evaluations,
+                    x_blob,
+                    y_blob,
+                    theta_blob,
+                    t_blob,
+                    mask_blob,
+                ),
+            )
+            db.execute(
+                "DELETE FROM plan_cache WHERE cache_key NOT IN "
+                "(SELECT cache_key FROM plan_cache ORDER BY last_used_at DESC LIMIT ?)",
+                (PLAN_CACHE_DB_MAX_ROWS,),
+            )
+    except sqlite3.OperationalError:
+        logger.debug("plan_cache table unavailable; result not persisted.", exc_info=True)
+
+
+# Process-wide cache used by the iterations API
+plan_cache = PlanCache()
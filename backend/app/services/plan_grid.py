@@ -13,9 +13,12 @@ Refs: .ai/instrukcje generowania siatki.md, .ai/succesful point and animation al
 - Emission order: 36 diameters 0° to 175° (step 5°); each diameter is full line through center (θ and θ+180° joined); t alternates (even: asc, odd: desc).
 - Points: diameter-line approach (reference). Uniform spacing along each diameter t ∈ [-R, +R].
   Candidates at 0.2 mm step; greedy select + binary search on min_dist per mask to hit target.
-  Per-mask processing with avoid_xy.
+  Per-mask processing with avoid_xy. Spacing searches use a count model plus secant
+  refinement (spacing_model); PlanResult.spacing_evaluations reports the real evaluations.
 - Emission order: (theta_k, t_sort) with t_sort = ± t_mm by line parity.
 - Min mask: 0.5% aperture; discard masks < 1% of total mask surface.
+- Spots travel between stages as SpotArrays (columns, lexsort ordering);
+  PlanResult.spots builds the SpotRecord list only when accessed.
 """
 
 from __future__ import annotations
@@ -24,6 +27,24 @@ import math
 from dataclasses import dataclass, field
 from typing import Literal
 
+import numpy as np
+
+from app.services.mask_geometry import (
+    PreparedPolygon,
+    contains_points,
+    prepare_polygon,
+)
+from app.services.plan_validation import MAX_OUTSIDE_FRACTION, validate_plan_spots
+from app.services.spacing_model import (
+    MAX_SPACING_EVALUATIONS,
+    SpacingSearch,
+    polar_candidate_count,
+    polar_rings,
+    search_spacing,
+)
+from app.services.spatial_index import SpatialIndex
+from app.services.spot_arrays import SpotArrays, SpotRecord
+
 # Aperture 25 mm diameter → radius 12.5 mm
 APERTURE_RADIUS_MM = 12.5
 APERTURE_AREA_MM2 = math.pi * APERTURE_RADIUS_MM**2
@@ -78,35 +99,33 @@ class MaskPolygon:
     mask_label: str | None = None
 
 
-def _polygon_area(vertices: list[tuple[float, float]]) -> float:
-    """Shoelace formula; vertices in mm. Returns area in mm² (absolute value)."""
-    if len(vertices) < 3:
-        return 0.0
-    n = len(vertices)
-    area = 0.0
-    for i in range(n):
-        j = (i + 1) % n
-        area += vertices[i][0] * vertices[j][1]
-        area -= vertices[j][0] * vertices[i][1]
-    return abs(area) / 2.0
+@dataclass(frozen=True)
+class PreparedMask:
+    """Mask compiled once per planning run: area, bbox, centroid and edge tables (geometry)."""
 
+    mask: MaskPolygon
+    geometry: PreparedPolygon
 
-def _point_in_polygon(px: float, py: float, vertices: list[tuple[float, float]]) -> bool:
-    """Ray casting: odd number of crossings = inside."""
-    n = len(vertices)
-    if n < 3:
-        return False
-    inside = False
-    x1, y1 = vertices[0]
-    for i in range(1, n + 1):
-        x2, y2 = vertices[i % n]
-        if min(y1, y2) < py <= max(y1, y2) and px <= max(x1, x2):
-            if y1 != y2:
-                x_intersect = (py - y1) * (x2 - x1) / (y2 - y1) + x1
-            if y1 == y2 or px <= x_intersect:
-                inside = not inside
-        x1, y1 = x2, y2
-    return inside
+    @property
+    def mask_id(self) -> int:
+        return self.mask.mask_id
+
+    @property
+    def vertices(self) -> list[tuple[float, float]]:
+        return self.mask.vertices
+
+    @property
+    def mask_label(self) -> str | None:
+        return self.mask.mask_label
+
+    @property
+    def area_mm2(self) -> float:
+        return self.geometry.area
+
+
+def prepare_masks(masks: list[MaskPolygon]) -> list[PreparedMask]:
+    """Compile masks once (area, bbox, edge arrays) so filters and containment reuse them."""
+    return [PreparedMask(mask=m, geometry=prepare_polygon(m.vertices)) for m in masks]
 
 
 def _centroid(vertices: list[tuple[float, float]]) -> tuple[float, float]:
@@ -151,15 +170,15 @@ def _clip_line_to_polygon(
         if t is not None and r_min <= t <= r_max:
             ts.append(t)
     ts = sorted(set(ts))
-    segments: list[tuple[float, float]] = []
-    for i in range(len(ts) - 1):
-        t_a, t_b = ts[i], ts[i + 1]
-        mid_t = (t_a + t_b) / 2
-        mx = cx + mid_t * cos_t
-        my = cy + mid_t * sin_t
-        if _point_in_polygon(mx, my, vertices):
-            segments.append((t_a, t_b))
-    return segments
+    if len(ts) < 2:
+        return []
+    mids = [(ts[i] + ts[i + 1]) / 2 for i in range(len(ts) - 1)]
+    inside = contains_points(
+        vertices,
+        [cx + mid_t * cos_t for mid_t in mids],
+        [cy + mid_t * sin_t for mid_t in mids],
+    )
+    return [(ts[i], ts[i + 1]) for i in range(len(ts) - 1) if inside[i]]
 
 
 def _place_points_on_segment(
@@ -188,39 +207,33 @@ def _place_points_on_segment(
     return points
 
 
-@dataclass
-class SpotRecord:
-    """Single spot for DB insert."""
-
-    x_mm: float
-    y_mm: float
-    theta_deg: float
-    t_mm: float
-    mask_id: int | None
-
-
 @dataclass
 class PlanResult:
-    """Result of plan generation."""
+    """Result of plan generation. Spots are columnar (arrays); records are built on first access."""
 
-    spots: list[SpotRecord] = field(default_factory=list)
+    arrays: SpotArrays = field(default_factory=SpotArrays.empty)
     achieved_coverage_pct: float | None = None
     spots_count: int = 0
     spots_outside_mask_count: int = 0
     overlap_count: int = 0
     plan_valid: int = 0
     fallback_used: bool = False
+    # Real candidate build + select/filter runs spent searching spacing (0 = no search)
+    spacing_evaluations: int = 0
+    _records: list[SpotRecord] | None = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def spots(self) -> list[SpotRecord]:
+        """Spots as SpotRecord list, in emission order (converted lazily from arrays)."""
+        if self._records is None:
+            self._records = self.arrays.to_records()
+        return self._records
 
 
 def _mask_area_pct_of_aperture(area_mm2: float) -> float:
     return 100.0 * area_mm2 / APERTURE_AREA_MM2
 
 
-def _grid_cell(x_mm: float, y_mm: float, cell_size: float) -> tuple[int, int]:
-    """Cell index for spatial hash."""
-    return (int(math.floor(x_mm / cell_size)), int(math.floor(y_mm / cell_size)))
-
-
 def _build_candidate_lines_for_mask(
     m: MaskPolygon,
     cx: float,
@@ -283,8 +296,7 @@ def _build_candidates_polar_uniform(
     while r <= r_max + 1e-9:
         if r < 1e-6:
             # Center: single point
-            if _point_in_polygon(cx, cy, m.vertices):
-                candidates.append((cx, cy, angles_ordered[0], 0.0, m.mask_id))
+            candidates.append((cx, cy, angles_ordered[0], 0.0, m.mask_id))
         else:
             # Ring at radius r: n points with arc length ≈ spacing_mm
             n_on_ring = max(1, min(n_angles, int(2 * math.pi * r / spacing_mm)))
@@ -296,12 +308,13 @@ def _build_candidates_polar_uniform(
                 rad = math.radians(theta_deg)
                 x = cx + r * math.cos(rad)
                 y = cy + r * math.sin(rad)
-                if (x - cx) ** 2 + (y - cy) ** 2 <= r_max**2 + 1e-9 and _point_in_polygon(
-                    x, y, m.vertices
-                ):
+                if (x - cx) ** 2 + (y - cy) ** 2 <= r_max**2 + 1e-9:
                     candidates.append((x, y, theta_deg, r, m.mask_id))
         r += spacing_mm
-    return candidates
+    if not candidates:
+        return []
+    inside = contains_points(m.vertices, [c[0] for c in candidates], [c[1] for c in candidates])
+    return [c for c, hit in zip(candidates, inside) if hit]
 
 
 def _select_points_from_lines(
@@ -309,55 +322,69 @@ def _select_points_from_lines(
     min_dist_mm: float,
     avoid_xy: list[tuple[float, float]],
     mask_id: int,
+    avoid_index: SpatialIndex | None = None,
 ) -> list[tuple[float, float, float, float, int]]:
     """
     Greedy selection along each line (reference: select_points).
     Walk candidates in order; take first valid (min_dist from last on line, from avoid, from selected).
+    avoid_index: prebuilt index of avoid_xy (built here when None).
     Returns (x, y, theta_deg, t, mask_id).
     """
-    min2 = min_dist_mm * min_dist_mm
+    if avoid_index is None:
+        avoid_index = SpatialIndex(min_dist_mm, avoid_xy)
+    selected_index = SpatialIndex(min_dist_mm)
     selected: list[tuple[float, float, float, float, int]] = []
     for _, th_deg, cand in lines:
         last_t: float | None = None
         for t, x, y in cand:
             if last_t is not None and abs(t - last_t) < min_dist_mm:
                 continue
-            if any((x - ax) ** 2 + (y - ay) ** 2 < min2 for ax, ay in avoid_xy):
+            if avoid_index.has_neighbor(x, y, min_dist_mm):
                 continue
-            if any((x - s[0]) ** 2 + (y - s[1]) ** 2 < min2 for s in selected):
+            if selected_index.has_neighbor(x, y):
                 continue
             selected.append((x, y, th_deg, t, mask_id))
+            selected_index.add(x, y)
             last_t = t
     return selected
 
 
 def _select_points_from_polar_candidates(
-    candidates: list[tuple[float, float, float, float, int]],
+    candidates: SpotArrays,
     min_dist_mm: float,
     avoid_xy: list[tuple[float, float]],
-) -> list[tuple[float, float, float, float, int]]:
+    avoid_index: SpatialIndex | None = None,
+) -> SpotArrays:
     """
     Greedy selection from polar candidates for uniform spacing.
     Process in (|t|, θ) order (center outward) so selection is spatially balanced.
-    Returns (x, y, theta_deg, t_mm, mask_id).
+    avoid_index: prebuilt index of avoid_xy (built here when None).
+    Returns the selected rows in processing order.
     """
-    if not candidates:
-        return []
-    min2 = min_dist_mm * min_dist_mm
-    # Sort by |t| (radius) asc, then theta asc for center-outward processing
-    sorted_cand = sorted(candidates, key=lambda c: (abs(c[3]), c[2]))
-    selected: list[tuple[float, float, float, float, int]] = []
-    for x, y, th_deg, t_mm, mask_id in sorted_cand:
-        if any((x - ax) ** 2 + (y - ay) ** 2 < min2 for ax, ay in avoid_xy):
+    if not len(candidates):
+        return candidates
+    if avoid_index is None:
+        avoid_index = SpatialIndex(min_dist_mm, avoid_xy)
+    selected_index = SpatialIndex(min_dist_mm)
+    order = candidates.center_out_order()
+    keep: list[int] = []
+    for i, x, y in zip(order.tolist(), candidates.x_mm[order].tolist(), candidates.y_mm[order].tolist()):
+        if avoid_index.has_neighbor(x, y, min_dist_mm):
             continue
-        if any((x - s[0]) ** 2 + (y - s[1]) ** 2 < min2 for s in selected):
+        if selected_index.has_neighbor(x, y):
             continue
-        selected.append((x, y, th_deg, t_mm, mask_id))
-    return selected
+        keep.append(i)
+        selected_index.add(x, y)
+    return candidates.take(np.asarray(keep, dtype=np.int64))
+
+
+def _count_tolerance(target_n: int) -> int:
+    """Spot count accepted as on target: within 2% (at least one spot)."""
+    return max(1, int(0.02 * target_n))
 
 
 def _tune_spacing_polar(
-    m: MaskPolygon,
+    m: PreparedMask,
     cx: float,
     cy: float,
     angles_ordered: list[float],
@@ -366,34 +393,42 @@ def _tune_spacing_polar(
     avoid_xy: list[tuple[float, float]],
     r_max: float,
     min_dist_mm: float,
-    max_iter: int = 18,
-) -> list[tuple[float, float, float, float, int]]:
+    max_evaluations: int = MAX_SPACING_EVALUATIONS,
+) -> SpacingSearch:
     """
-    Binary search on spacing_mm to hit target_n spots using polar uniform grid
+    Search spacing_mm to hit target_n spots using polar uniform grid
     (chord-based diameter subsampling, same as full-aperture / grid generator).
+    Count model: full-aperture candidate count scaled by mask area / aperture area.
+    avoid_xy is indexed once here and shared by every evaluation.
     """
-    lo, hi = min_dist_mm, 5.0
-    best: list[tuple[float, float, float, float, int]] = []
-    for _ in range(max_iter):
-        mid = (lo + hi) / 2.0
-        mid = max(mid, min_dist_mm)
+    avoid_index = SpatialIndex(min_dist_mm, avoid_xy)
+    n_angles = len(angles_ordered)
+    area_fraction = m.area_mm2 / (math.pi * r_max * r_max)
+
+    def predict(spacing: float) -> float:
+        return area_fraction * polar_candidate_count(spacing, r_max, n_angles, angle_step_deg)
+
+    def evaluate(spacing: float) -> SpotArrays:
         cand = _build_candidates_polar_uniform_constrained(
             cx, cy,
             angles_ordered=angles_ordered,
-            spacing_mm=mid,
+            spacing_mm=spacing,
             r_max=r_max,
             angle_step_deg=angle_step_deg,
             mask_id=m.mask_id,
-            mask_vertices=m.vertices,
+            mask_vertices=m.geometry,
         )
-        sel = _select_points_from_polar_candidates(cand, min_dist_mm, avoid_xy)
-        if not best or abs(len(sel) - target_n) < abs(len(best) - target_n):
-            best = sel
-        if len(sel) > target_n:
-            lo = mid
-        else:
-            hi = mid
-    return best
+        return _select_points_from_polar_candidates(cand, min_dist_mm, avoid_xy, avoid_index)
+
+    return search_spacing(
+        evaluate,
+        predict,
+        target_n,
+        min_dist_mm,
+        5.0,
+        tolerance=_count_tolerance(target_n),
+        max_evaluations=max_evaluations,
+    )
 
 
 def _tune_min_dist(
@@ -423,50 +458,6 @@ def _tune_min_dist(
     return best
 
 
-def _generate_spots_for_one_mask(
-    m: MaskPolygon,
-    cx: float,
-    cy: float,
-    spacing_mm: float,
-    angles_ordered: list[float],
-    r_min: float,
-    r_max: float,
-) -> list[tuple[float, float, float, float, int | None]]:
-    """Generate spot candidates for one mask with given spacing (legacy: uniform spacing)."""
-    spots: list[tuple[float, float, float, float, int | None]] = []
-    for theta_deg in angles_ordered:
-        rad = math.radians(theta_deg)
-        cos_t = math.cos(rad)
-        sin_t = math.sin(rad)
-        segs = _clip_line_to_polygon(cx, cy, cos_t, sin_t, m.vertices, r_min, r_max)
-        for (ta, tb) in segs:
-            pts = _place_points_on_segment(
-                ta, tb, spacing_mm, cx, cy, cos_t, sin_t, theta_deg, m.mask_id,
-            )
-            for (x, y, th, t, _) in pts:
-                spots.append((x, y, th, t, m.mask_id))
-    return spots
-
-
-def _generate_all_spots_with_spacing(
-    masks: list[MaskPolygon],
-    cx: float,
-    cy: float,
-    spacing_mm: float,
-    angles_ordered: list[float],
-    r_min: float,
-    r_max: float,
-) -> list[tuple[float, float, float, float, int | None]]:
-    """Generate spot candidates for all masks with one spacing (unison grid)."""
-    all_spots: list[tuple[float, float, float, float, int | None]] = []
-    for m in masks:
-        spots = _generate_spots_for_one_mask(
-            m, cx, cy, spacing_mm, angles_ordered, r_min, r_max
-        )
-        all_spots.extend(spots)
-    return all_spots
-
-
 def _build_candidates_polar_uniform_constrained(
     cx: float,
     cy: float,
@@ -476,13 +467,13 @@ def _build_candidates_polar_uniform_constrained(
     r_max: float,
     angle_step_deg: int,
     mask_id: int,
-    mask_vertices: list[tuple[float, float]] | None = None,
-) -> list[tuple[float, float, float, float, int | None]]:
+    mask_vertices: PreparedPolygon | list[tuple[float, float]] | None = None,
+) -> SpotArrays:
     """
     Build candidates with improved 2D uniformity (chord-based diameter subsampling).
 
     Used for both full aperture and lesion masks. When mask_vertices is provided,
-    only points inside the mask polygon are included.
+    only points inside the mask polygon are included (one batched containment call).
 
     Key idea (constraint-aware):
     - Points must lie on machine diameters (θ in [0,180) at fixed Δθ).
@@ -494,103 +485,52 @@ def _build_candidates_polar_uniform_constrained(
     if spacing_mm <= 0:
         spacing_mm = MIN_DIST_MM
     if not angles_ordered:
-        return []
+        return SpotArrays.empty()
 
     n_angles = len(angles_ordered)
-    dtheta_rad = math.radians(float(angle_step_deg))
-    candidates: list[tuple[float, float, float, float, int | None]] = []
-
-    def inside_mask(x: float, y: float) -> bool:
-        if mask_vertices is None:
-            return True
-        return _point_in_polygon(x, y, mask_vertices)
-
-    ring_idx = 0
-    r = 0.0
-    while r <= r_max + 1e-9:
-        if r < 1e-8:
-            if inside_mask(cx, cy):
-                candidates.append((cx, cy, angles_ordered[0], 0.0, mask_id))
-            ring_idx += 1
-            r += spacing_mm
-            continue
+    angles_arr = np.asarray(angles_ordered, dtype=np.float64)
+    # math.cos/sin per angle (not np.cos) so coordinates match the scalar formula bit for bit
+    cos_arr = np.asarray([math.cos(math.radians(a)) for a in angles_ordered], dtype=np.float64)
+    sin_arr = np.asarray([math.sin(math.radians(a)) for a in angles_ordered], dtype=np.float64)
+
+    # Per ring: diameter indices and signed t, in emission-compatible order (idx, then +r / -r)
+    ring_idx_parts: list[np.ndarray] = []
+    ring_t_parts: list[np.ndarray] = []
+    for ring in polar_rings(spacing_mm, r_max, n_angles, angle_step_deg):
+        idxs = np.arange(ring.offset, n_angles, ring.skip)
+        ring_idx_parts.append(np.repeat(idxs, 2))
+        ring_t_parts.append(np.tile(np.array([ring.r_mm, -ring.r_mm], dtype=np.float64), idxs.shape[0]))
+
+    if ring_idx_parts:
+        idx_all = np.concatenate(ring_idx_parts)
+        t_all = np.concatenate(ring_t_parts)
+    else:
+        idx_all = np.empty(0, dtype=np.int64)
+        t_all = np.empty(0, dtype=np.float64)
+    xs = cx + t_all * cos_arr[idx_all]
+    ys = cy + t_all * sin_arr[idx_all]
+    keep = (xs - cx) ** 2 + (ys - cy) ** 2 <= r_max * r_max + 1e-9
 
-        ratio = spacing_mm / (2.0 * r)
-        if ratio >= 1.0:
-            skip = n_angles
-        else:
-            dphi = 2.0 * math.asin(ratio)
-            skip = max(1, int(math.ceil(dphi / max(dtheta_rad, 1e-12))))
-            skip = min(skip, n_angles)
-
-        offset = ring_idx % skip
-
-        for idx in range(offset, n_angles, skip):
-            theta_deg = angles_ordered[idx]
-            rad = math.radians(theta_deg)
-            cos_t = math.cos(rad)
-            sin_t = math.sin(rad)
-
-            for sign in (1.0, -1.0):
-                t = sign * r
-                x = cx + t * cos_t
-                y = cy + t * sin_t
-                if (x - cx) ** 2 + (y - cy) ** 2 <= r_max * r_max + 1e-9 and inside_mask(x, y):
-                    candidates.append((x, y, theta_deg, t, mask_id))
-
-        ring_idx += 1
-        r += spacing_mm
+    # Center point first (same order as the ring walk)
+    xs = np.concatenate(([cx], xs[keep]))
+    ys = np.concatenate(([cy], ys[keep]))
+    thetas = np.concatenate(([angles_ordered[0]], angles_arr[idx_all[keep]]))
+    ts = np.concatenate(([0.0], t_all[keep]))
+    if mask_vertices is not None:
+        inside = contains_points(mask_vertices, xs, ys)
+        xs, ys, thetas, ts = xs[inside], ys[inside], thetas[inside], ts[inside]
 
-    return candidates
+    return SpotArrays.from_columns(xs, ys, thetas, ts, mask_id)
 
 
-def _binary_search_global_spacing(
-    masks: list[MaskPolygon],
-    cx: float,
-    cy: float,
-    total_target: int,
-    angles_ordered: list[float],
-    r_min: float,
-    r_max: float,
-    angle_step: int,
-    min_dist_mm: float = MIN_DIST_MM,
-    max_iter: int = 25,
-) -> float:
+def _lattice_window(lo: float, hi: float, origin: float, step: float, n_cells: int) -> tuple[int, int]:
     """
-    One spacing for the whole plan so treatment points are as uniform as possible.
-    Binary search: spacing such that (generate all with spacing, sort, filter) ≈ total_target.
-    Produces regular grid: concentric rings + radial lines (reference image pattern).
+    Slice [start, stop) of lattice indices (origin + k*step, k = -n..n) that may fall in [lo, hi].
+    One cell of margin on each side; exact containment is decided by the polygon test.
     """
-    if total_target <= 0:
-        return 10.0 * min_dist_mm
-    low = min_dist_mm
-    high = 10.0 * min_dist_mm
-    tolerance = max(1, int(0.02 * total_target))
-    best_spacing = (low + high) / 2.0
-
-    def emission_order_key(s: tuple) -> tuple:
-        theta_deg = s[2]
-        theta_k = int(round(theta_deg)) // angle_step
-        t_sort = s[3] if theta_k % 2 == 0 else -s[3]
-        return (theta_k, t_sort)
-
-    for _ in range(max_iter):
-        mid = (low + high) / 2.0
-        mid = max(mid, min_dist_mm)
-        spots = _generate_all_spots_with_spacing(
-            masks, cx, cy, mid, angles_ordered, r_min, r_max
-        )
-        spots.sort(key=emission_order_key)
-        filtered = _filter_overlaps_in_emission_order(spots, min_dist_mm)
-        n = len(filtered)
-        if abs(n - total_target) <= tolerance:
-            return mid
-        if n > total_target:
-            low = mid
-        else:
-            high = mid
-        best_spacing = mid
-    return best_spacing
+    start = int(math.floor((lo - origin) / step)) - 1 + n_cells
+    stop = int(math.ceil((hi - origin) / step)) + 2 + n_cells
+    return max(0, start), min(2 * n_cells + 1, stop)
 
 
 def generate_plan_simple(
@@ -623,42 +563,53 @@ def generate_plan_simple(
     R = APERTURE_RADIUS_MM
     step = max(grid_spacing_mm, 1e-6)
     n_cells = int(math.ceil(R / step))
-    candidates: list[tuple[float, float, int | None]] = []  # (x, y, mask_id)
-    for i in range(-n_cells, n_cells + 1):
-        for j in range(-n_cells, n_cells + 1):
-            x = cx + i * step
-            y = cy + j * step
-            if (x - cx) ** 2 + (y - cy) ** 2 > R * R + 1e-9:
-                continue
-            mask_id: int | None = None
-            for m in masks:
-                if len(m.vertices) >= 3 and _point_in_polygon(x, y, m.vertices):
-                    mask_id = m.mask_id
-                    break
-            if mask_id is not None:
-                candidates.append((x, y, mask_id))
+    # Lattice as a (2n+1)² meshgrid indexed [i, j] (x = cx + i*step, y = cy + j*step)
+    offsets = np.arange(-n_cells, n_cells + 1, dtype=np.int64)
+    lattice_x = cx + offsets.astype(np.float64) * step
+    lattice_y = cy + offsets.astype(np.float64) * step
+    grid_x, grid_y = np.meshgrid(lattice_x, lattice_y, indexing="ij")
+    in_aperture = (grid_x - cx) ** 2 + (grid_y - cy) ** 2 <= R * R + 1e-9
+
+    # First mask (in input order) containing the point wins. Each mask only sees the lattice
+    # window covering its bbox (bbox index on the regular grid), minus points already owned.
+    usable = prepare_masks([m for m in masks if len(m.vertices) >= 3])
+    owner = np.full(grid_x.shape, -1, dtype=np.int64)
+    for k, m in enumerate(usable):
+        if m.geometry.is_degenerate:
+            continue
+        x_min, y_min, x_max, y_max = m.geometry.bbox
+        i0, i1 = _lattice_window(x_min, x_max, cx, step, n_cells)
+        j0, j1 = _lattice_window(y_min, y_max, cy, step, n_cells)
+        if i0 >= i1 or j0 >= j1:
+            continue
+        window = owner[i0:i1, j0:j1]
+        todo = (window < 0) & in_aperture[i0:i1, j0:j1]
+        if not todo.any():
+            continue
+        hit = contains_points(m.geometry, grid_x[i0:i1, j0:j1][todo], grid_y[i0:i1, j0:j1][todo])
+        sub = window[todo]
+        sub[hit] = k
+        window[todo] = sub
 
     # Emission order: boustrophedon (snake)—row 0 left-to-right, row 1 right-to-left, etc.
-    def _boustrophedon_key(c: tuple[float, float, int | None]) -> tuple[float, float]:
-        x, y, _ = c
-        row_key = round((y - cy) / step)  # discrete row index (higher y = higher row_key)
-        # Top row first: sort by -row_key; within row: even row x asc, odd row x desc
-        x_sort = x if row_key % 2 == 0 else -x
-        return (-row_key, x_sort)
-
-    candidates.sort(key=_boustrophedon_key)
-    sequence: list[SpotRecord] = []
-    for x, y, mask_id in candidates:
-        t_mm = math.hypot(x - cx, y - cy)
-        theta_rad = math.atan2(y - cy, x - cx)
-        theta_deg = math.degrees(theta_rad)
-        sequence.append(
-            SpotRecord(x_mm=x, y_mm=y, theta_deg=theta_deg, t_mm=t_mm, mask_id=mask_id)
-        )
-
-    total_mask_area = sum(
-        _polygon_area(m.vertices) for m in masks if len(m.vertices) >= 3
+    # Top row first (row_key desc); within row: even row x asc, odd row x desc.
+    flat = np.flatnonzero(owner.ravel() >= 0)  # i-major, like the nested lattice walk
+    xs = grid_x.ravel()[flat]
+    ys = grid_y.ravel()[flat]
+    row_key = np.rint((ys - cy) / step).astype(np.int64)  # higher y = higher row_key
+    x_sort = np.where(row_key % 2 == 0, xs, -xs)
+    order = np.lexsort((x_sort, -row_key))
+    xs, ys = xs[order], ys[order]
+    mask_ids = np.asarray([m.mask_id for m in usable], dtype=np.int32)
+    sequence = SpotArrays.from_columns(
+        xs,
+        ys,
+        np.degrees(np.arctan2(ys - cy, xs - cx)),
+        np.hypot(xs - cx, ys - cy),
+        mask_ids[owner.ravel()[flat][order]] if flat.size else np.empty(0, dtype=np.int32),
     )
+
+    total_mask_area = sum(m.area_mm2 for m in usable)
     n_spots = len(sequence)
     achieved = (
         (100.0 * n_spots * SPOT_AREA_MM2 / total_mask_area)
@@ -667,7 +618,7 @@ def generate_plan_simple(
     )
     plan_valid = 1 if n_spots > 0 else 0
     return PlanResult(
-        spots=sequence,
+        arrays=sequence,
         achieved_coverage_pct=achieved,
         spots_count=n_spots,
         spots_outside_mask_count=0,
@@ -677,46 +628,74 @@ def generate_plan_simple(
     )
 
 
-def _filter_overlaps_in_emission_order(
-    spots: list[tuple[float, float, float, float, int | None]],
-    min_dist_mm: float,
-) -> list[tuple[float, float, float, float, int | None]]:
+def _filter_overlaps_in_emission_order(spots: SpotArrays, min_dist_mm: float) -> SpotArrays:
     """
     Keep only spots that are >= min_dist_mm from any already accepted spot.
     Walks in the order of spots (emission order); uses grid hash for fast neighbor lookup.
     """
-    if min_dist_mm <= 0 or not spots:
-        return list(spots)
-    cell_size = min_dist_mm
-    grid: dict[tuple[int, int], list[tuple[float, float]]] = {}
-    accepted: list[tuple[float, float, float, float, int | None]] = []
-
-    def dist_ok(ax: float, ay: float, bx: float, by: float) -> bool:
-        return math.hypot(ax - bx, ay - by) >= min_dist_mm - 1e-9
-
-    for s in spots:
-        x, y = s[0], s[1]
-        ci, cj = _grid_cell(x, y, cell_size)
-        ok = True
-        for di in (-1, 0, 1):
-            for dj in (-1, 0, 1):
-                key = (ci + di, cj + dj)
-                for (ox, oy) in grid.get(key, []):
-                    if not dist_ok(x, y, ox, oy):
-                        ok = False
-                        break
-                if not ok:
-                    break
-            if not ok:
-                break
-        if not ok:
+    if min_dist_mm <= 0 or not len(spots):
+        return spots
+    index = SpatialIndex(min_dist_mm)
+    reject_below = min_dist_mm - 1e-9
+    keep: list[int] = []
+    for i, (x, y) in enumerate(zip(spots.x_mm.tolist(), spots.y_mm.tolist())):
+        if index.has_neighbor(x, y, reject_below):
             continue
-        accepted.append(s)
-        key = (ci, cj)
-        if key not in grid:
-            grid[key] = []
-        grid[key].append((x, y))
-    return accepted
+        keep.append(i)
+        index.add(x, y)
+    return spots.take(np.asarray(keep, dtype=np.int64))
+
+
+def _unison_grid_spots(
+    cx: float,
+    cy: float,
+    *,
+    angles_ordered: list[float],
+    angle_step: int,
+    min_dist_mm: float,
+    spot_area_mm2: float,
+    target_coverage_pct: float,
+    grid_spacing_mm: float | None,
+    mask_id: int,
+) -> SpacingSearch:
+    """
+    Full-aperture unison grid in emission order: one global spacing, rings + diameter subsampling.
+
+    With grid_spacing_mm the candidates are built once; otherwise spacing is searched so the
+    overlap-filtered count hits the target taken from the aperture area (not a polygon area).
+    """
+    n_angles = len(angles_ordered)
+
+    def spots_for(spacing: float) -> SpotArrays:
+        cand = _build_candidates_polar_uniform_constrained(
+            cx,
+            cy,
+            angles_ordered=angles_ordered,
+            spacing_mm=spacing,
+            r_max=APERTURE_RADIUS_MM,
+            angle_step_deg=angle_step,
+            mask_id=mask_id,
+            mask_vertices=None,
+        )
+        return _filter_overlaps_in_emission_order(cand.take(cand.emission_order(angle_step)), min_dist_mm)
+
+    if grid_spacing_mm is not None:
+        # Use explicit global spacing: build candidates once and filter overlaps.
+        spacing = max(grid_spacing_mm, MIN_DIST_MM)
+        return SpacingSearch(spacing_mm=spacing, spots=spots_for(spacing), evaluations=1)
+
+    total_target = max(
+        1, int(round((target_coverage_pct / 100.0) * APERTURE_AREA_MM2 / spot_area_mm2))
+    )
+    # Count model: rings x chord-limited diameters, refined with real (filtered) counts
+    return search_spacing(
+        spots_for,
+        lambda spacing: polar_candidate_count(spacing, APERTURE_RADIUS_MM, n_angles, angle_step),
+        total_target,
+        min_dist_mm,
+        10.0 * min_dist_mm,
+        tolerance=_count_tolerance(total_target),
+    )
 
 
 def generate_plan(
@@ -744,18 +723,20 @@ def generate_plan(
     spot_area_use = math.pi * (spot_d / 2) ** 2
     min_dist_use = spot_d * 1.05
 
-    included: list[MaskPolygon] = []
-    for m in masks:
-        area = _polygon_area(m.vertices)
+    # Area, bbox and edge tables computed once per mask for the whole run
+    prepared = prepare_masks(masks)
+    included: list[PreparedMask] = []
+    for m in prepared:
+        area = m.area_mm2
         if area <= 0:
             continue
         if _mask_area_pct_of_aperture(area) >= MIN_MASK_PCT_APERTURE:
             included.append(m)
-    total_included_area = sum(_polygon_area(m.vertices) for m in included)
+    total_included_area = sum(m.area_mm2 for m in included)
     if total_included_area > 0:
-        included = [m for m in included if _polygon_area(m.vertices) >= (MIN_MASK_PCT_OF_TOTAL / 100.0) * total_included_area]
-    if not included and masks:
-        included = [m for m in masks if _polygon_area(m.vertices) > 0]
+        included = [m for m in included if m.area_mm2 >= (MIN_MASK_PCT_OF_TOTAL / 100.0) * total_included_area]
+    if not included and prepared:
+        included = [m for m in prepared if m.area_mm2 > 0]
     if not included:
         return PlanResult()
 
@@ -777,138 +758,114 @@ def generate_plan(
     # Unison grid: one global spacing for regular concentric rings + radial lines (reference image).
     # Used for full-aperture (e.g. grid generator). Produces uniform t = -R, -R+s, ..., +R per diameter.
     if use_unison_grid:
-        def _unison_emission_key(s: tuple) -> tuple:
-            theta_deg = s[2]
-            # theta_deg is already in [0,180) for this mode
-            theta_k = int(round(theta_deg)) // angle_step
-            t_sort = s[3] if theta_k % 2 == 0 else -s[3]
-            return (theta_k, t_sort)
-
-        if grid_spacing_mm is not None:
-            # Use explicit global spacing: build candidates once and filter overlaps.
-            spacing = max(grid_spacing_mm, MIN_DIST_MM)
-            cand = _build_candidates_polar_uniform_constrained(
-                cx,
-                cy,
-                angles_ordered=angles_ordered,
-                spacing_mm=spacing,
-                r_max=APERTURE_RADIUS_MM,
-                angle_step_deg=angle_step,
-                mask_id=included[0].mask_id if included else 0,
-                mask_vertices=None,
-            )
-            cand.sort(key=_unison_emission_key)
-            filtered = _filter_overlaps_in_emission_order(cand, min_dist_use)
-            all_spots = [
-                (s[0], s[1], s[2], s[3], s[4] if s[4] is not None else 0) for s in filtered
-            ]
-        else:
-            # Full-aperture target count from aperture area (not polygon area approximation).
-            total_target = max(
-                1, int(round((target_coverage_pct / 100.0) * APERTURE_AREA_MM2 / spot_area_use))
-            )
-
-            # Binary search on spacing to hit total_target, using polar rings + diameter subsampling
-            low = min_dist_use
-            high = 10.0 * min_dist_use
-            tolerance = max(1, int(0.02 * total_target))
-            best: list[tuple[float, float, float, float, int | None]] = []
-
-            for _ in range(22):
-                mid = (low + high) / 2.0
-                mid = max(mid, min_dist_use)
-                cand = _build_candidates_polar_uniform_constrained(
-                    cx,
-                    cy,
-                    angles_ordered=angles_ordered,
-                    spacing_mm=mid,
-                    r_max=APERTURE_RADIUS_MM,
-                    angle_step_deg=angle_step,
-                    mask_id=included[0].mask_id if included else 0,
-                    mask_vertices=None,
-                )
-                cand.sort(key=_unison_emission_key)
-                filtered = _filter_overlaps_in_emission_order(cand, min_dist_use)
-
-                if not best or abs(len(filtered) - total_target) < abs(len(best) - total_target):
-                    best = filtered
-
-                if abs(len(filtered) - total_target) <= tolerance:
-                    best = filtered
-                    break
-                if len(filtered) > total_target:
-                    low = mid
-                else:
-                    high = mid
-
-            all_spots = [
-                (s[0], s[1], s[2], s[3], s[4] if s[4] is not None else 0) for s in best
-            ]
+        search = _unison_grid_spots(
+            cx,
+            cy,
+            angles_ordered=angles_ordered,
+            angle_step=angle_step,
+            min_dist_mm=min_dist_use,
+            spot_area_mm2=spot_area_use,
+            target_coverage_pct=target_coverage_pct,
+            grid_spacing_mm=grid_spacing_mm,
+            mask_id=included[0].mask_id if included else 0,
+        )
+        all_spots: SpotArrays = search.spots
+        spacing_evaluations = search.evaluations
     else:
         # Polar uniform approach (same as grid generator): chord-based diameter subsampling,
-        # per-mask binary search on spacing, greedy selection with avoid_xy across masks.
+        # per-mask spacing search (count model + secant), greedy selection with avoid_xy across masks.
         avoid_xy: list[tuple[float, float]] = []
-        all_spots = []
+        per_mask: list[SpotArrays] = []
+        spacing_evaluations = 0
         for m in included:
-            area_mm2 = _polygon_area(m.vertices)
+            area_mm2 = m.area_mm2
             pct = target_coverage_pct
             if coverage_per_mask:
                 key = str(m.mask_id) if str(m.mask_id) in coverage_per_mask else (m.mask_label or str(m.mask_id))
                 pct = coverage_per_mask.get(key, target_coverage_pct)
             pct = max(3.0, min(20.0, pct))
             n_target = max(1, int(round((pct / 100.0) * area_mm2 / spot_area_use)))
-            sel = _tune_spacing_polar(
+            search = _tune_spacing_polar(
                 m, cx, cy, angles_ordered, angle_step,
                 n_target, avoid_xy, APERTURE_RADIUS_MM, min_dist_use,
             )
-            for (x, y, th, t, mask_id) in sel:
-                all_spots.append((x, y, th, t, mask_id))
-                avoid_xy.append((x, y))
+            spacing_evaluations += search.evaluations
+            per_mask.append(search.spots)
+            avoid_xy.extend(zip(search.spots.x_mm.tolist(), search.spots.y_mm.tolist()))
+        all_spots = SpotArrays.concat(per_mask)
 
     # Emission order: diameter-by-diameter 0° to 175° (36 diameters). Each diameter is a full line through center.
     # Points at (r, θ) and (r, θ+180°) are on the same diameter; normalize to diameter_angle in [0, 180).
     # t_signed: +r for θ in [0,180), -r for θ in [180,360) so both sides of center are on one diameter.
-    def emission_order_key(s: tuple) -> tuple:
-        theta_deg = s[2]
-        t_mm = s[3]
-        diameter_angle = theta_deg if theta_deg < 180.0 else theta_deg - 180.0
-        t_signed = t_mm if theta_deg < 180.0 else -t_mm
-        theta_k = int(round(diameter_angle)) // angle_step  # 0°->0, 5°->1, ..., 175°->35
-        t_sort = t_signed if theta_k % 2 == 0 else -t_signed
-        return (theta_k, t_sort)
-    all_spots.sort(key=emission_order_key)
-    sequence: list[SpotRecord] = []
-    for (x, y, th, t, mask_id) in all_spots:
-        sequence.append(SpotRecord(x_mm=x, y_mm=y, theta_deg=th, t_mm=t, mask_id=mask_id))
-
-    total_mask_area = sum(_polygon_area(m.vertices) for m in included)
+    # Sort keys (theta_k, t_sort) with theta_k = 0°->0, 5°->1, ..., 175°->35; lexsort is stable.
+    sequence = all_spots.take(all_spots.emission_order(angle_step))
+
+    total_mask_area = sum(m.area_mm2 for m in included)
     n_spots = len(sequence)
     achieved = (100.0 * n_spots * spot_area_use / total_mask_area) if total_mask_area > 0 else None
-    outside = 0
-    for s in sequence:
-        in_any = False
-        for m in included:
-            if _point_in_polygon(s.x_mm, s.y_mm, m.vertices):
-                in_any = True
-                break
-        if not in_any:
-            outside += 1
-    overlap = 0
-    for i, a in enumerate(sequence):
-        for b in sequence[i + 1 :]:
-            dist = math.hypot(a.x_mm - b.x_mm, a.y_mm - b.y_mm)
-            if dist < min_dist_use - 1e-6:
-                overlap += 1
-    plan_valid = 1 if n_spots > 0 and (outside / n_spots <= 0.05 if n_spots else True) and overlap == 0 else 0
+    validation = validate_plan_spots(
+        list(zip(sequence.x_mm.tolist(), sequence.y_mm.tolist())),
+        [m.geometry for m in included],
+        min_dist_use,
+    )
 
     return PlanResult(
-        spots=sequence,
+        arrays=sequence,
         achieved_coverage_pct=achieved,
         spots_count=n_spots,
+        spots_outside_mask_count=validation.spots_outside_mask_count,
+        overlap_count=validation.overlap_count,
+        plan_valid=validation.plan_valid,
+        fallback_used=fallback_used,
+        spacing_evaluations=spacing_evaluations,
+    )
+
+
+def generate_plan_full_aperture(
+    target_coverage_pct: float | None,
+    *,
+    angle_step_deg: int | None = None,
+    spot_diameter_mm: float | None = None,
+    grid_spacing_mm: float | None = None,
+) -> PlanResult:
+    """
+    Unison grid over the whole 25 mm aperture, without mask polygons.
+
+    Same spots as generate_plan(use_unison_grid=True) on a circle mask, but the aperture is
+    handled analytically: center (0, 0), area pi * R^2, containment r <= R. Overlaps are
+    excluded by the emission-order filter, so no pairwise pass is needed.
+    """
+    angle_step = angle_step_deg if angle_step_deg is not None else ANGLE_STEP_DEG
+    spot_d = spot_diameter_mm if spot_diameter_mm is not None else SPOT_DIAMETER_MM
+    spot_area_use = math.pi * (spot_d / 2) ** 2
+    min_dist_use = spot_d * 1.05
+
+    search = _unison_grid_spots(
+        0.0,
+        0.0,
+        angles_ordered=_angles_0_to_180(angle_step),
+        angle_step=angle_step,
+        min_dist_mm=min_dist_use,
+        spot_area_mm2=spot_area_use,
+        target_coverage_pct=target_coverage_pct or 0.0,
+        grid_spacing_mm=grid_spacing_mm,
+        mask_id=0,
+    )
+    sequence: SpotArrays = search.spots
+
+    n_spots = len(sequence)
+    # Candidates are already clipped to r_max (+1e-9); count with the same tolerance
+    r2_max = APERTURE_RADIUS_MM * APERTURE_RADIUS_MM + 1e-9
+    outside = int(np.count_nonzero(sequence.x_mm**2 + sequence.y_mm**2 > r2_max))
+    plan_valid = 1 if n_spots > 0 and outside / n_spots <= MAX_OUTSIDE_FRACTION else 0
+    return PlanResult(
+        arrays=sequence,
+        achieved_coverage_pct=100.0 * n_spots * spot_area_use / APERTURE_AREA_MM2,
+        spots_count=n_spots,
         spots_outside_mask_count=outside,
-        overlap_count=overlap,
+        overlap_count=0,
         plan_valid=plan_valid,
-        fallback_used=fallback_used,
+        spacing_evaluations=search.evaluations,
     )
 
 
@@ -920,7 +877,7 @@ def generate_plan_by_mode(
     algorithm_mode: Literal["simple", "advanced"],
     grid_spacing_mm: float | None = None,
 ) -> PlanResult:
-    """Dispatch to simple (XY grid) or advanced (diameters, binary search) planner."""
+    """Dispatch to simple (XY grid) or advanced (diameters, spacing search) planner."""
     if algorithm_mode == "simple":
         spacing = grid_spacing_mm if grid_spacing_mm is not None else SIMPLE_GRID_SPACING_MM
         return generate_plan_simple(masks, image_width_mm, spacing)
@@ -0,0 +1,288 @@
+"""
+Background planning jobs: POST /iterations returns 202 + job id, the plan runs in a worker process.
+
+- Planning (generate_plan_by_mode) is CPU-bound Python; in a separate process it neither holds
+  the API's GIL nor occupies a request thread. Worker processes: PLAN_JOB_WORKERS (default 2,
+  "spawn" start method: the API process has threads and open SQLite connections).
+- One dispatcher thread per worker process takes jobs in FIFO order, so a job is "running" exactly
+  while its plan occupies a worker. At most PLAN_JOB_MAX_PENDING jobs wait ("queued"); beyond that
+  submit() raises PlanQueueFull.
+- Job states: queued -> running -> done | failed. progress is stage based (0 queued, 0.1 started,
+  0.8 plan computed, 1.0 saved); the planner itself does not report intermediate progress.
+- The caller's finish(compute) persists the result (plan cache lookup + save_iteration) in the
+  dispatcher thread and returns the iteration id. Jobs live in memory (like plan_cache); finished
+  jobs are kept for PLAN_JOB_RETENTION_SECONDS, at most PLAN_JOB_MAX_FINISHED of them.
+- should_run_async: small plans stay synchronous; "auto" goes async when the estimated spot count
+  (mask area x coverage / spot area, or mask area / grid spacing^2 for simple) reaches
+  PLAN_ASYNC_MIN_SPOTS.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+from app.services.mask_geometry import polygon_area
+from app.services.plan_grid import (
+    SIMPLE_GRID_SPACING_MM,
+    SPOT_DIAMETER_MM,
+    MaskPolygon,
+    PlanResult,
+    generate_plan_by_mode,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PLAN_JOB_WORKERS = 2
+DEFAULT_PLAN_JOB_MAX_PENDING = 32
+DEFAULT_PLAN_ASYNC_MIN_SPOTS = 5000
+# Finished jobs kept for status polling
+PLAN_JOB_RETENTION_SECONDS = 3600
+PLAN_JOB_MAX_FINISHED = 1000
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+PROGRESS_STARTED = 0.1
+PROGRESS_PLANNED = 0.8
+
+
+class PlanQueueFull(Exception):
+    """Too many planning jobs are waiting."""
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+@dataclass
+class PlanJob:
+    """One background planning job (mutable; read through PlanJobQueue.get)."""
+
+    job_id: str
+    user_id: int
+    image_id: int
+    status: str = JOB_QUEUED
+    progress: float = 0.0
+    iteration_id: int | None = None
+    error: str | None = None
+    created_at: str = field(default_factory=_now_iso)
+    started_at: str | None = None
+    finished_at: str | None = None
+    finished_monotonic: float | None = field(default=None, repr=False)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "image_id": self.image_id,
+            "status": self.status,
+            "progress": self.progress,
+            "iteration_id": self.iteration_id,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# finish(compute) -> iteration id; compute() returns the plan computed in a worker process
+PlanFinisher = Callable[[Callable[[], PlanResult]], int]
+
+
+@dataclass
+class _QueuedJob:
+    job: PlanJob
+    plan_kwargs: dict[str, Any]
+    finish: PlanFinisher
+
+
+def estimate_plan_spots(
+    masks: list[MaskPolygon],
+    target_coverage_pct: float,
+    algorithm_mode: str,
+    grid_spacing_mm: float | None = None,
+) -> int:
+    """Rough spot count from mask areas (used only to pick sync vs async)."""
+    area = sum(polygon_area(m.vertices) for m in masks if len(m.vertices) >= 3)
+    if algorithm_mode == "simple":
+        spacing = grid_spacing_mm if grid_spacing_mm is not None else SIMPLE_GRID_SPACING_MM
+        return int(area / (spacing * spacing))
+    spot_area = math.pi * (SPOT_DIAMETER_MM / 2) ** 2
+    return int(area * target_coverage_pct / 100.0 / spot_area)
+
+
+def should_run_async(mode: str, estimated_spots: int) -> bool:
+    """mode: "sync" | "async" | "auto" (async only for plans of at least PLAN_ASYNC_MIN_SPOTS spots)."""
+    if mode == "sync":
+        return False
+    if mode == "async":
+        return True
+    threshold = int(os.environ.get("PLAN_ASYNC_MIN_SPOTS", str(DEFAULT_PLAN_ASYNC_MIN_SPOTS)))
+    return estimated_spots >= threshold
+
+
+class PlanJobQueue:
+    """Bounded FIFO of planning jobs executed in a process pool (thread-safe)."""
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._pending: deque[_QueuedJob] = deque()
+        self._jobs: OrderedDict[str, PlanJob] = OrderedDict()
+        self._cond = threading.Condition()
+        self._executor: ProcessPoolExecutor | None = None
+        self._threads: list[threading.Thread] = []
+        self._shutdown = False
+
+    def submit(
+        self,
+        user_id: int,
+        image_id: int,
+        plan_kwargs: dict[str, Any],
+        finish: PlanFinisher,
+    ) -> PlanJob:
+        """Queue generate_plan_by_mode(**plan_kwargs); finish persists the result."""
+        job = PlanJob(job_id=uuid.uuid4().hex, user_id=user_id, image_id=image_id)
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Plan job queue is shut down")
+            if len(self._pending) >= self.max_pending:
+                raise PlanQueueFull(f"{len(self._pending)} planning jobs already queued")
+            self._start_workers()
+            self._prune()
+            self._jobs[job.job_id] = job
+            self._pending.append(_QueuedJob(job, plan_kwargs, finish))
+            self._cond.notify()
+        return job
+
+    def get(self, job_id: str) -> PlanJob | None:
+        """Snapshot of a job (a copy, so callers never see a half-updated record)."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return None if job is None else PlanJob(**job.__dict__)
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            counts = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return {"workers": self.workers, "max_pending": self.max_pending, **counts}
+
+    def shutdown(self) -> None:
+        """Stop dispatchers (running plans finish; queued jobs are marked failed)."""
+        with self._cond:
+            self._shutdown = True
+            while self._pending:
+                self._finish(self._pending.popleft().job, JOB_FAILED, error="Server shutting down")
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+            executor, self._executor = self._executor, None
+        for thread in threads:
+            thread.join()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _start_workers(self) -> None:
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._dispatch, name=f"plan-job-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._shutdown:
+                    self._cond.wait()
+                if self._shutdown:
+                    return
+                item = self._pending.popleft()
+                executor = self._executor
+                item.job.status = JOB_RUNNING
+                item.job.progress = PROGRESS_STARTED
+                item.job.started_at = _now_iso()
+            self._run(item, executor)
+
+    def _run(self, item: _QueuedJob, executor: ProcessPoolExecutor) -> None:
+        def compute() -> PlanResult:
+            plan = executor.submit(generate_plan_by_mode, **item.plan_kwargs).result()
+            with self._cond:
+                item.job.progress = PROGRESS_PLANNED
+            return plan
+
+        try:
+            iteration_id = item.finish(compute)
+        except Exception as exc:
+            logger.exception("Planning job %s failed.", item.job.job_id)
+            with self._cond:
+                self._finish(item.job, JOB_FAILED, error=str(exc) or type(exc).__name__)
+            return
+        with self._cond:
+            self._finish(item.job, JOB_DONE, iteration_id=iteration_id)
+
+    def _finish(
+        self, job: PlanJob, status: str, iteration_id: int | None = None, error: str | None = None
+    ) -> None:
+        job.status = status
+        job.iteration_id = iteration_id
+        job.error = error
+        job.progress = 1.0 if status == JOB_DONE else job.progress
+        job.finished_at = _now_iso()
+        job.finished_monotonic = time.monotonic()
+
+    def _prune(self) -> None:
+        """Drop finished jobs past retention or beyond PLAN_JOB_MAX_FINISHED (oldest first)."""
+        cutoff = time.monotonic() - PLAN_JOB_RETENTION_SECONDS
+        finished = [j for j in self._jobs.values() if j.finished_monotonic is not None]
+        excess = len(finished) - PLAN_JOB_MAX_FINISHED
+        for job in finished:
+            if job.finished_monotonic < cutoff or excess > 0:
+                del self._jobs[job.job_id]
+                excess -= 1
+
+
+_queue: PlanJobQueue | None = None
+_queue_lock = threading.Lock()
+
+
+def get_plan_job_queue() -> PlanJobQueue:
+    """Process-wide queue (created on first use from PLAN_JOB_WORKERS / PLAN_JOB_MAX_PENDING)."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = PlanJobQueue(
+                int(os.environ.get("PLAN_JOB_WORKERS", str(DEFAULT_PLAN_JOB_WORKERS))),
+                int(os.environ.get("PLAN_JOB_MAX_PENDING", str(DEFAULT_PLAN_JOB_MAX_PENDING))),
+            )
+        return _queue
+
+
+def shutdown_plan_jobs() -> None:
+    """Shut the process-wide queue down (application shutdown)."""
+    global _queue
+    with _queue_lock:
+        queue, _queue = _queue, None
+    if queue is not None:
+        queue.shutdown()
+
+
+def plan_job_stats() -> dict[str, int] | None:
+    with _queue_lock:
+        return None if _queue is None else _queue.stats()
@@ -0,0 +1,94 @@
+"""
+Plan validation engine: spots outside masks, overlapping spot pairs, plan_valid.
+
+Used at the end of generate_plan and for re-validating spots already stored for an iteration.
+- Outside count: batched containment per mask (bbox reject, only still-unmatched spots).
+- Overlap count: hashed grid (cell = threshold) so only pairs in neighbouring cells are compared.
+- plan_valid: at least one spot, <= 5% outside masks, no overlapping pairs.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from app.services.mask_geometry import PreparedPolygon, points_in_any_polygon
+
+# Same tolerance as the reference nested-loop check (dist < min_dist - 1e-6 = overlap)
+OVERLAP_TOLERANCE_MM = 1e-6
+# Plan is still valid when at most this fraction of spots lies outside every mask
+MAX_OUTSIDE_FRACTION = 0.05
+
+
+@dataclass(frozen=True)
+class PlanValidation:
+    """Validation metrics for one plan (same fields as plan_iterations columns)."""
+
+    spots_count: int
+    spots_outside_mask_count: int
+    overlap_count: int
+    plan_valid: int
+
+
+def count_spots_outside_masks(
+    points: Sequence[tuple[float, float]],
+    mask_vertices_list: Sequence[PreparedPolygon | Sequence[tuple[float, float]]],
+) -> int:
+    """Number of points not inside any mask polygon."""
+    if not points:
+        return 0
+    inside = points_in_any_polygon(points, mask_vertices_list)
+    return sum(1 for hit in inside if not hit)
+
+
+def count_overlapping_pairs(
+    points: Sequence[tuple[float, float]],
+    min_dist_mm: float,
+    tolerance_mm: float = OVERLAP_TOLERANCE_MM,
+) -> int:
+    """Number of unordered pairs (i < j) closer than min_dist_mm - tolerance_mm."""
+    threshold = min_dist_mm - tolerance_mm
+    if threshold <= 0 or len(points) < 2:
+        return 0
+    thr2 = threshold * threshold
+    cells: dict[tuple[int, int], list[int]] = {}
+    keys: list[tuple[int, int]] = []
+    for i, (x, y) in enumerate(points):
+        key = (int(math.floor(x / threshold)), int(math.floor(y / threshold)))
+        keys.append(key)
+        cells.setdefault(key, []).append(i)
+
+    overlap = 0
+    for i, (x, y) in enumerate(points):
+        ci, cj = keys[i]
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                for j in cells.get((ci + di, cj + dj), ()):
+                    if j <= i:
+                        continue
+                    ox, oy = points[j]
+                    if (x - ox) ** 2 + (y - oy) ** 2 < thr2:
+                        overlap += 1
+    return overlap
+
+
+def validate_plan_spots(
+    points: Sequence[tuple[float, float]],
+    mask_vertices_list: Sequence[PreparedPolygon | Sequence[tuple[float, float]]],
+    min_dist_mm: float,
+) -> PlanValidation:
+    """
+    Validate spot positions against masks and min distance.
+    Points and mask vertices must be in the same frame (center mm or top-left mm).
+    """
+    n = len(points)
+    outside = count_spots_outside_masks(points, mask_vertices_list)
+    overlap = count_overlapping_pairs(points, min_dist_mm)
+    plan_valid = 1 if n > 0 and outside / n <= MAX_OUTSIDE_FRACTION and overlap == 0 else 0
+    return PlanValidation(
+        spots_count=n,
+        spots_outside_mask_count=outside,
+        overlap_count=overlap,
+        plan_valid=plan_valid,
+    )
@@ -0,0 +1,232 @@
+"""
+Spacing solver for diameter / polar-ring layouts: count model + secant refinement.
+
+Replaces the fixed 18-25 step bisections on spacing_mm in plan_grid.
+- Polar rings r = 0, s, 2s, ... with chord-limited diameter subsampling: the candidate
+  count per spacing is pure arithmetic (polar_candidate_count), no geometry needed.
+- search_spacing inverts the model for a first guess, calibrates it with the first real
+  evaluation (real / predicted), then takes log-log secant steps inside the bracket of
+  real evaluations: typically 1-4 real evaluations instead of 18-25.
+- Counts that jump (a whole ring entering a circular mask) leave the target inside a narrow
+  spacing window; the search then bisects the bracket until the count is within tolerance,
+  at most MAX_SPACING_EVALUATIONS times (the old bisection depth).
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from app.services.spot_arrays import SpotArrays
+
+# Hard cap on real evaluations (build + select/filter) per search: the depth of the bisection
+# this search replaced. Smooth counts land within tolerance in 1-4; step-shaped counts bisect.
+MAX_SPACING_EVALUATIONS = 18
+# Bisection steps when inverting the (cheap) count model
+_MODEL_INVERSION_STEPS = 40
+
+
+@dataclass(frozen=True)
+class PolarRing:
+    """One ring of the polar layout: radius, first diameter index and diameter stride."""
+
+    r_mm: float
+    offset: int
+    skip: int
+
+
+@dataclass
+class SpacingSearch:
+    """Outcome of a spacing search: chosen spacing, its spots, number of real evaluations."""
+
+    spacing_mm: float
+    spots: SpotArrays = field(default_factory=SpotArrays.empty)
+    evaluations: int = 0
+
+
+def polar_rings(
+    spacing_mm: float,
+    r_max: float,
+    n_angles: int,
+    angle_step_deg: float,
+) -> list[PolarRing]:
+    """
+    Rings r = spacing, 2*spacing, ..., r_max (center excluded).
+    On small radii diameters are skipped so chord distance >= spacing_mm;
+    the starting diameter rotates with the ring index.
+    """
+    dtheta_rad = math.radians(float(angle_step_deg))
+    rings: list[PolarRing] = []
+    ring_idx = 0
+    r = 0.0
+    while r <= r_max + 1e-9:
+        if r < 1e-8:
+            ring_idx += 1
+            r += spacing_mm
+            continue
+        ratio = spacing_mm / (2.0 * r)
+        if ratio >= 1.0:
+            skip = n_angles
+        else:
+            dphi = 2.0 * math.asin(ratio)
+            skip = max(1, int(math.ceil(dphi / max(dtheta_rad, 1e-12))))
+            skip = min(skip, n_angles)
+        rings.append(PolarRing(r_mm=r, offset=ring_idx % skip, skip=skip))
+        ring_idx += 1
+        r += spacing_mm
+    return rings
+
+
+def polar_candidate_count(
+    spacing_mm: float,
+    r_max: float,
+    n_angles: int,
+    angle_step_deg: float,
+) -> int:
+    """Number of full-aperture polar candidates (center + both sides of each chosen diameter)."""
+    if spacing_mm <= 0 or n_angles <= 0:
+        return 0
+    count = 1
+    for ring in polar_rings(spacing_mm, r_max, n_angles, angle_step_deg):
+        count += 2 * len(range(ring.offset, n_angles, ring.skip))
+    return count
+
+
+def invert_count_model(
+    predict: Callable[[float], float],
+    target_n: float,
+    lo: float,
+    hi: float,
+) -> float:
+    """Spacing in [lo, hi] where the decreasing model predict(spacing) crosses target_n."""
+    if predict(lo) <= target_n:
+        return lo
+    if predict(hi) >= target_n:
+        return hi
+    for _ in range(_MODEL_INVERSION_STEPS):
+        mid = (lo + hi) / 2.0
+        if predict(mid) > target_n:
+            lo = mid
+        else:
+            hi = mid
+        if hi - lo < 1e-9:
+            break
+    return (lo + hi) / 2.0
+
+
+def search_spacing(
+    evaluate: Callable[[float], SpotArrays],
+    predict: Callable[[float], float],
+    target_n: int,
+    lo: float,
+    hi: float,
+    *,
+    tolerance: int = 0,
+    max_evaluations: int = MAX_SPACING_EVALUATIONS,
+) -> SpacingSearch:
+    """
+    Find spacing in [lo, hi] whose evaluated spot count is closest to target_n.
+
+    evaluate(spacing) returns the spots (the expensive part); predict(spacing) is a cheap,
+    decreasing estimate of len(evaluate(spacing)). Stops as soon as the count is within
+    tolerance; otherwise narrows the bracket of real counts (model steps, then bisection)
+    and returns the closest of at most max_evaluations evaluations.
+    """
+    best = SpacingSearch(spacing_mm=lo)
+    if target_n <= 0 or hi < lo:
+        return best
+    # Widest spacing seen with too many spots / densest spacing seen with too few
+    dense: tuple[float, int] | None = None
+    sparse: tuple[float, int] | None = None
+    history: list[tuple[float, int]] = []
+    bisecting = False
+
+    spacing = invert_count_model(predict, target_n, lo, hi)
+    while best.evaluations < max_evaluations:
+        spots = evaluate(spacing)
+        n = len(spots)
+        best.evaluations += 1
+        if len(history) == 0 or abs(n - target_n) < abs(len(best.spots) - target_n):
+            best.spacing_mm = spacing
+            best.spots = spots
+        if abs(n - target_n) <= tolerance:
+            break
+        before_lo, before_hi = _bracket_ends(dense, sparse, lo, hi)
+        history.append((spacing, n))
+        # Count decreases with spacing: too many spots -> go wider, too few -> go denser
+        if n > target_n:
+            dense = (spacing, n)
+        else:
+            sparse = (spacing, n)
+        bracket_lo, bracket_hi = _bracket_ends(dense, sparse, lo, hi)
+        if bracket_hi - bracket_lo < 1e-9:
+            break
+        if dense is not None and sparse is not None and len(history) > 1:
+            # Counts that jump (e.g. a whole ring entering a circular mask) defeat interpolation:
+            # once a step fails to halve the bracket, bisect toward the jump for the rest
+            bisecting = bisecting or bracket_hi - bracket_lo > 0.5 * (before_hi - before_lo)
+        if bisecting:
+            spacing = (bracket_lo + bracket_hi) / 2.0
+        else:
+            spacing = _next_spacing(predict, target_n, history, dense, sparse, bracket_lo, bracket_hi)
+    return best
+
+
+def _bracket_ends(
+    dense: tuple[float, int] | None,
+    sparse: tuple[float, int] | None,
+    lo: float,
+    hi: float,
+) -> tuple[float, float]:
+    """Spacing interval still holding the target: between the closest real counts on each side."""
+    return (dense[0] if dense is not None else lo, sparse[0] if sparse is not None else hi)
+
+
+def _next_spacing(
+    predict: Callable[[float], float],
+    target_n: int,
+    history: list[tuple[float, int]],
+    dense: tuple[float, int] | None,
+    sparse: tuple[float, int] | None,
+    lo: float,
+    hi: float,
+) -> float:
+    """
+    Next spacing to evaluate inside the bracket [lo, hi].
+    One side known: calibrated model, then log-log secant (doubling the step while the count
+    stays on a plateau). Both sides known: log-log interpolation between them. Else bisect.
+    """
+    guess: float | None = None
+    s1, n1 = history[-1]
+    if dense is not None and sparse is not None:
+        guess = _log_secant(*dense, *sparse, target_n)
+    elif len(history) == 1:
+        predicted = predict(s1)
+        if predicted > 0 and n1 > 0:
+            scale = n1 / predicted
+            guess = invert_count_model(lambda s: scale * predict(s), target_n, lo, hi)
+    else:
+        s0, n0 = history[-2]
+        guess = _log_secant(s0, n0, s1, n1, target_n)
+        if guess is None and n1 > 0:
+            # Same count again (a plateau): step as if count ~ 1/spacing^2, at least twice as far
+            step = 0.5 * (math.log(n1) - math.log(target_n))
+            previous = abs(math.log(s1) - math.log(s0))
+            guess = math.exp(math.log(s1) + math.copysign(max(abs(step), 2.0 * previous), step))
+    if guess is not None:
+        guess = min(max(guess, lo), hi)
+    evaluated = {s for s, _ in history}
+    if guess is None or guess in evaluated:
+        guess = (lo + hi) / 2.0
+    return guess
+
+
+def _log_secant(s0: float, n0: int, s1: float, n1: int, target_n: int) -> float | None:
+    """Spacing where the line through (log s, log n) of two evaluations reaches target_n."""
+    if n0 <= 0 or n1 <= 0 or n0 == n1 or s0 == s1:
+        return None
+    slope = (math.log(n1) - math.log(n0)) / (math.log(s1) - math.log(s0))
+    if slope >= 0:
+        return None
+    return math.exp(math.log(s1) + (math.log(target_n) - math.log(n1)) / slope)
@@ -0,0 +1,73 @@
+"""
+Uniform-grid spatial index for minimum-distance queries (planner greedy selection).
+
+Cell size = min_dist_mm, so "is any accepted point closer than min_dist?" only needs
+the 3×3 block of cells around the query point instead of a scan over all points.
+Units: mm (same frame as the planner, center mm).
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable
+
+
+class SpatialIndex:
+    """Hash grid of (x, y) points; cell size is the default query distance."""
+
+    __slots__ = ("cell_size", "_cells", "_count")
+
+    def __init__(
+        self,
+        cell_size_mm: float,
+        points: Iterable[tuple[float, float]] = (),
+    ) -> None:
+        if cell_size_mm <= 0:
+            raise ValueError("cell_size_mm must be positive")
+        self.cell_size = float(cell_size_mm)
+        self._cells: dict[tuple[int, int], list[tuple[float, float]]] = {}
+        self._count = 0
+        self.extend(points)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _cell(self, x_mm: float, y_mm: float) -> tuple[int, int]:
+        return (int(math.floor(x_mm / self.cell_size)), int(math.floor(y_mm / self.cell_size)))
+
+    def add(self, x_mm: float, y_mm: float) -> None:
+        """Insert one point."""
+        key = self._cell(x_mm, y_mm)
+        bucket = self._cells.get(key)
+        if bucket is None:
+            self._cells[key] = [(x_mm, y_mm)]
+        else:
+            bucket.append((x_mm, y_mm))
+        self._count += 1
+
+    def extend(self, points: Iterable[tuple[float, float]]) -> None:
+        """Insert many points (e.g. seed from avoid_xy)."""
+        for x, y in points:
+            self.add(x, y)
+
+    def has_neighbor(self, x_mm: float, y_mm: float, min_dist_mm: float | None = None) -> bool:
+        """
+        True if any indexed point lies strictly closer than min_dist_mm (default: cell size).
+        min_dist_mm <= cell size → 3×3 neighbourhood; larger distances widen the block.
+        """
+        dist = self.cell_size if min_dist_mm is None else min_dist_mm
+        if self._count == 0 or dist <= 0:
+            return False
+        min2 = dist * dist
+        reach = max(1, int(math.ceil(dist / self.cell_size)))
+        ci, cj = self._cell(x_mm, y_mm)
+        cells = self._cells
+        for di in range(-reach, reach + 1):
+            for dj in range(-reach, reach + 1):
+                bucket = cells.get((ci + di, cj + dj))
+                if not bucket:
+                    continue
+                for ox, oy in bucket:
+                    if (x_mm - ox) ** 2 + (y_mm - oy) ** 2 < min2:
+                        return True
+        return False
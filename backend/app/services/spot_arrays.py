@@ -0,0 +1,165 @@
+"""
+Columnar spot container for the planner (struct of NumPy arrays).
+
+Planner stages pass SpotArrays instead of lists of (x, y, theta, t, mask_id) tuples:
+- x_mm, y_mm, theta_deg, t_mm: float64 (positions stay bit-identical to the scalar formulas);
+- mask_id: int32, NO_MASK_ID (-1) where a spot has no mask.
+Ordering uses np.lexsort (stable), so results match the previous Python key sorts.
+SpotRecord lists are only built when a caller asks for them (PlanResult.spots).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+# mask_id column value for spots without a mask (SpotRecord.mask_id = None)
+NO_MASK_ID = -1
+# On-disk / wire dtypes: explicit little-endian so blobs are portable
+FLOAT_DTYPE_LE = np.dtype("<f8")
+MASK_ID_DTYPE_LE = np.dtype("<i4")
+
+
+@dataclass
+class SpotRecord:
+    """Single spot for DB insert."""
+
+    x_mm: float
+    y_mm: float
+    theta_deg: float
+    t_mm: float
+    mask_id: int | None
+
+
+@dataclass(eq=False)
+class SpotArrays:
+    """Spots as parallel arrays (one row per spot, in current order)."""
+
+    x_mm: np.ndarray
+    y_mm: np.ndarray
+    theta_deg: np.ndarray
+    t_mm: np.ndarray
+    mask_id: np.ndarray
+
+    @classmethod
+    def empty(cls) -> SpotArrays:
+        return cls.from_columns([], [], [], [], [])
+
+    @classmethod
+    def from_columns(
+        cls,
+        x_mm: Sequence[float] | np.ndarray,
+        y_mm: Sequence[float] | np.ndarray,
+        theta_deg: Sequence[float] | np.ndarray,
+        t_mm: Sequence[float] | np.ndarray,
+        mask_id: Sequence[int | None] | np.ndarray | int | None,
+    ) -> SpotArrays:
+        """Build from columns; a scalar mask_id is broadcast to every spot."""
+        xs = np.asarray(x_mm, dtype=np.float64)
+        if mask_id is None or isinstance(mask_id, (int, np.integer)):
+            value = NO_MASK_ID if mask_id is None else int(mask_id)
+            ids = np.full(xs.shape[0], value, dtype=np.int32)
+        elif isinstance(mask_id, np.ndarray):
+            ids = mask_id.astype(np.int32, copy=False)
+        else:
+            ids = np.asarray([NO_MASK_ID if m is None else m for m in mask_id], dtype=np.int32)
+        return cls(
+            x_mm=xs,
+            y_mm=np.asarray(y_mm, dtype=np.float64),
+            theta_deg=np.asarray(theta_deg, dtype=np.float64),
+            t_mm=np.asarray(t_mm, dtype=np.float64),
+            mask_id=ids,
+        )
+
+    @classmethod
+    def from_tuples(cls, spots: Iterable[tuple[float, float, float, float, int | None]]) -> SpotArrays:
+        """Build from (x, y, theta_deg, t_mm, mask_id) tuples."""
+        rows = list(spots)
+        if not rows:
+            return cls.empty()
+        xs, ys, ths, ts, ids = zip(*rows)
+        return cls.from_columns(xs, ys, ths, ts, list(ids))
+
+    @classmethod
+    def concat(cls, parts: Sequence[SpotArrays]) -> SpotArrays:
+        if not parts:
+            return cls.empty()
+        return cls(
+            x_mm=np.concatenate([p.x_mm for p in parts]),
+            y_mm=np.concatenate([p.y_mm for p in parts]),
+            theta_deg=np.concatenate([p.theta_deg for p in parts]),
+            t_mm=np.concatenate([p.t_mm for p in parts]),
+            mask_id=np.concatenate([p.mask_id for p in parts]),
+        )
+
+    @classmethod
+    def from_blobs(
+        cls,
+        x_mm: bytes,
+        y_mm: bytes,
+        theta_deg: bytes,
+        t_mm: bytes,
+        mask_id: bytes,
+    ) -> SpotArrays:
+        """Build from little-endian column blobs (float64 x4, int32 mask_id)."""
+        return cls(
+            x_mm=np.frombuffer(x_mm, dtype=FLOAT_DTYPE_LE).astype(np.float64),
+            y_mm=np.frombuffer(y_mm, dtype=FLOAT_DTYPE_LE).astype(np.float64),
+            theta_deg=np.frombuffer(theta_deg, dtype=FLOAT_DTYPE_LE).astype(np.float64),
+            t_mm=np.frombuffer(t_mm, dtype=FLOAT_DTYPE_LE).astype(np.float64),
+            mask_id=np.frombuffer(mask_id, dtype=MASK_ID_DTYPE_LE).astype(np.int32),
+        )
+
+    def to_blobs(self) -> tuple[bytes, bytes, bytes, bytes, bytes]:
+        """Column blobs (x, y, theta, t, mask_id), little-endian; inverse of from_blobs."""
+        return (
+            self.x_mm.astype(FLOAT_DTYPE_LE).tobytes(),
+            self.y_mm.astype(FLOAT_DTYPE_LE).tobytes(),
+            self.theta_deg.astype(FLOAT_DTYPE_LE).tobytes(),
+            self.t_mm.astype(FLOAT_DTYPE_LE).tobytes(),
+            self.mask_id.astype(MASK_ID_DTYPE_LE).tobytes(),
+        )
+
+    def __len__(self) -> int:
+        return int(self.x_mm.shape[0])
+
+    def take(self, index: np.ndarray | Sequence[int]) -> SpotArrays:
+        """Rows selected (and ordered) by an index or boolean array."""
+        idx = np.asarray(index)
+        return SpotArrays(
+            x_mm=self.x_mm[idx],
+            y_mm=self.y_mm[idx],
+            theta_deg=self.theta_deg[idx],
+            t_mm=self.t_mm[idx],
+            mask_id=self.mask_id[idx],
+        )
+
+    def emission_order(self, angle_step_deg: int) -> np.ndarray:
+        """
+        Stable permutation into emission order: diameter index theta_k, then t alternating by parity.
+        Spots at theta >= 180° are folded onto the same diameter (theta - 180°, -t).
+        """
+        folded = self.theta_deg >= 180.0
+        diameter_angle = np.where(folded, self.theta_deg - 180.0, self.theta_deg)
+        t_signed = np.where(folded, -self.t_mm, self.t_mm)
+        theta_k = np.round(diameter_angle).astype(np.int64) // angle_step_deg
+        t_sort = np.where(theta_k % 2 == 0, t_signed, -t_signed)
+        return np.lexsort((t_sort, theta_k))
+
+    def center_out_order(self) -> np.ndarray:
+        """Stable permutation by (|t|, theta): center-outward processing for greedy selection."""
+        return np.lexsort((self.theta_deg, np.abs(self.t_mm)))
+
+    def to_records(self) -> list[SpotRecord]:
+        return [
+            SpotRecord(x_mm=x, y_mm=y, theta_deg=th, t_mm=t, mask_id=None if m == NO_MASK_ID else m)
+            for x, y, th, t, m in zip(
+                self.x_mm.tolist(),
+                self.y_mm.tolist(),
+                self.theta_deg.tolist(),
+                self.t_mm.tolist(),
+                self.mask_id.tolist(),
+            )
+        ]
@@ -0,0 +1,316 @@
+"""
+Bulk persistence of a generated plan: iteration row, spots and audit events in one transaction.
+
+- Spots arrive as SpotArrays in center mm; conversion to top-left mm (DB/frontend convention)
+  is vectorized, rows go in with one executemany.
+- One created_at (SQLite datetime('now') format) is shared by the iteration, its spots and
+  its audit events instead of evaluating datetime('now') per row.
+- BEGIN IMMEDIATE takes the write lock up front; any failure rolls everything back.
+- Storage format (SPOT_STORAGE_FORMAT): "rows" (default) writes one spots row per spot;
+  "blocks" (opt-in) writes one spot_blocks row per iteration (little-endian column blobs).
+- Readers accept both formats; block spots get synthetic ids (block_spot_id), unique per spot.
+- iter_spots yields spots in chunks (rows: cursor fetchmany) for streaming responses.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.services.coordinates import center_mm_to_top_left_mm_arrays
+from app.services.plan_grid import PlanResult
+from app.services.spot_arrays import NO_MASK_ID, SpotArrays
+
+SPOT_STORAGE_BLOCKS = "blocks"
+SPOT_STORAGE_ROWS = "rows"
+# Synthetic spot id for block storage: iteration_id * stride + sequence_index (plans stay far below)
+BLOCK_SPOT_ID_STRIDE = 1_000_000
+# Spots per chunk when streaming (iter_spots)
+SPOT_STREAM_CHUNK = 1000
+
+_SPOT_KEYS = (
+    "id",
+    "iteration_id",
+    "sequence_index",
+    "x_mm",
+    "y_mm",
+    "theta_deg",
+    "t_mm",
+    "mask_id",
+    "component_id",
+    "created_at",
+)
+
+
+@dataclass(frozen=True)
+class IterationInsert:
+    """Columns of the plan_iterations row (metrics come from the PlanResult)."""
+
+    image_id: int
+    parent_id: int | None
+    created_by: int
+    is_demo: int
+    params_snapshot: str
+    target_coverage_pct: float
+    algorithm_mode: str
+
+
+def spots_to_top_left(arrays: SpotArrays, width_mm: float, height_mm: float) -> SpotArrays:
+    """Same spots with x/y converted from center mm to top-left mm."""
+    x_tl, y_tl = center_mm_to_top_left_mm_arrays(arrays.x_mm, arrays.y_mm, width_mm, height_mm)
+    return SpotArrays(x_mm=x_tl, y_mm=y_tl, theta_deg=arrays.theta_deg, t_mm=arrays.t_mm, mask_id=arrays.mask_id)
+
+
+def get_spot_storage_format() -> str:
+    """Storage format for new iterations: rows, or blocks when SPOT_STORAGE_FORMAT=blocks."""
+    value = os.environ.get("SPOT_STORAGE_FORMAT", SPOT_STORAGE_ROWS).strip().lower()
+    return SPOT_STORAGE_BLOCKS if value == SPOT_STORAGE_BLOCKS else SPOT_STORAGE_ROWS
+
+
+def block_spot_id(iteration_id: int, sequence_index: int) -> int:
+    return iteration_id * BLOCK_SPOT_ID_STRIDE + sequence_index
+
+
+def insert_spot_block(
+    db: sqlite3.Connection,
+    iteration_id: int,
+    spots_top_left: SpotArrays,
+    created_at: str,
+) -> None:
+    """Insert all spots of one iteration as a single spot_blocks row (column blobs)."""
+    x_blob, y_blob, theta_blob, t_blob, mask_blob = spots_top_left.to_blobs()
+    db.execute(
+        "INSERT INTO spot_blocks (iteration_id, spots_count, x_mm, y_mm, theta_deg, t_mm, mask_id, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (iteration_id, len(spots_top_left), x_blob, y_blob, theta_blob, t_blob, mask_blob, created_at),
+    )
+
+
+def insert_spots(
+    db: sqlite3.Connection,
+    iteration_id: int,
+    spots_top_left: SpotArrays,
+    created_at: str,
+) -> None:
+    """Insert all spots of one iteration (sequence_index = row order) with a single executemany."""
+    mask_ids = [None if m == NO_MASK_ID else m for m in spots_top_left.mask_id.tolist()]
+    db.executemany(
+        "INSERT INTO spots (iteration_id, sequence_index, x_mm, y_mm, theta_deg, t_mm, mask_id, component_id, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?)",
+        zip(
+            [iteration_id] * len(mask_ids),
+            range(len(mask_ids)),
+            spots_top_left.x_mm.tolist(),
+            spots_top_left.y_mm.tolist(),
+            spots_top_left.theta_deg.tolist(),
+            spots_top_left.t_mm.tolist(),
+            mask_ids,
+            [created_at] * len(mask_ids),
+        ),
+    )
+
+
+def save_iteration(
+    db: sqlite3.Connection,
+    iteration: IterationInsert,
+    plan: PlanResult,
+    width_mm: float,
+    height_mm: float,
+    storage_format: str | None = None,
+) -> int:
+    """Insert iteration, spots and audit events atomically; return the new iteration id."""
+    if storage_format is None:
+        storage_format = get_spot_storage_format()
+    if not db.in_transaction:
+        db.execute("BEGIN IMMEDIATE")
+    try:
+        created_at = db.execute("SELECT datetime('now')").fetchone()[0]
+        cursor = db.execute(
+            "INSERT INTO plan_iterations (image_id, parent_id, created_by, status, is_demo, "
+            "params_snapshot, target_coverage_pct, achieved_coverage_pct, spots_count, "
+            "spots_outside_mask_count, overlap_count, plan_valid, algorithm_mode, created_at) "
+            "VALUES (?, ?, ?, 'draft', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                iteration.image_id,
+                iteration.parent_id,
+                iteration.created_by,
+                iteration.is_demo,
+                iteration.params_snapshot,
+                iteration.target_coverage_pct,
+                plan.achieved_coverage_pct,
+                plan.spots_count,
+                plan.spots_outside_mask_count,
+                plan.overlap_count,
+                plan.plan_valid,
+                iteration.algorithm_mode,
+                created_at,
+            ),
+        )
+        row_id = int(cursor.lastrowid)
+
+        # Store spots in top-left mm (DB/frontend convention)
+        spots_top_left = spots_to_top_left(plan.arrays, width_mm, height_mm)
+        if storage_format == SPOT_STORAGE_ROWS:
+            insert_spots(db, row_id, spots_top_left, created_at)
+        else:
+            insert_spot_block(db, row_id, spots_top_left, created_at)
+
+        events: list[tuple[str, dict]] = [
+            ("iteration_created", {}),
+            (
+                "plan_generated",
+                {
+                    "target_coverage_pct": iteration.target_coverage_pct,
+                    "spots_count": plan.spots_count,
+                    "achieved_coverage_pct": plan.achieved_coverage_pct,
+                    "spacing_evaluations": plan.spacing_evaluations,
+                },
+            ),
+        ]
+        if plan.fallback_used:
+            events.append(("fallback_used", {}))
+        db.executemany(
+            "INSERT INTO audit_log (iteration_id, event_type, payload, user_id, created_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (row_id, event_type, json.dumps(payload), iteration.created_by, created_at)
+                for event_type, payload in events
+            ],
+        )
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    return row_id
+
+
+def read_spot_block(db: sqlite3.Connection, iteration_id: int) -> tuple[SpotArrays, str] | None:
+    """Decoded spot block (top-left mm) and its created_at, or None if the iteration has no block."""
+    row = db.execute(
+        "SELECT x_mm, y_mm, theta_deg, t_mm, mask_id, created_at FROM spot_blocks WHERE iteration_id = ?",
+        (iteration_id,),
+    ).fetchone()
+    if row is None:
+        return None
+    return SpotArrays.from_blobs(row[0], row[1], row[2], row[3], row[4]), row[5]
+
+
+def spot_storage_of(db: sqlite3.Connection, iteration_id: int) -> str:
+    """How an iteration's spots are stored now (blocks | rows); changes when pack_spot_rows runs."""
+    row = db.execute("SELECT 1 FROM spot_blocks WHERE iteration_id = ?", (iteration_id,)).fetchone()
+    return SPOT_STORAGE_BLOCKS if row is not None else SPOT_STORAGE_ROWS
+
+
+def iter_spots(
+    db: sqlite3.Connection,
+    iteration_id: int,
+    chunk_size: int = SPOT_STREAM_CHUNK,
+) -> Iterator[list[dict]]:
+    """Spots as SpotSchema dicts in chunks of chunk_size, ordered by sequence_index (block or rows)."""
+    block = read_spot_block(db, iteration_id)
+    if block is None:
+        cursor = db.execute(
+            "SELECT id, iteration_id, sequence_index, x_mm, y_mm, theta_deg, t_mm, "
+            "mask_id, component_id, created_at FROM spots WHERE iteration_id = ? "
+            "ORDER BY sequence_index ASC",
+            (iteration_id,),
+        )
+        while rows := cursor.fetchmany(chunk_size):
+            yield [dict(zip(_SPOT_KEYS, tuple(r))) for r in rows]
+        return
+    arrays, created_at = block
+    base_id = block_spot_id(iteration_id, 0)
+    for start in range(0, len(arrays), chunk_size):
+        part = slice(start, start + chunk_size)
+        yield [
+            {
+                "id": base_id + seq,
+                "iteration_id": iteration_id,
+                "sequence_index": seq,
+                "x_mm": x,
+                "y_mm": y,
+                "theta_deg": th,
+                "t_mm": t,
+                "mask_id": None if m == NO_MASK_ID else m,
+                "component_id": None,
+                "created_at": created_at,
+            }
+            for seq, (x, y, th, t, m) in enumerate(
+                zip(
+                    arrays.x_mm[part].tolist(),
+                    arrays.y_mm[part].tolist(),
+                    arrays.theta_deg[part].tolist(),
+                    arrays.t_mm[part].tolist(),
+                    arrays.mask_id[part].tolist(),
+                ),
+                start=start,
+            )
+        ]
+
+
+def load_spots(db: sqlite3.Connection, iteration_id: int) -> list[dict]:
+    """All spots of one iteration as SpotSchema dicts, ordered by sequence_index."""
+    return [spot for chunk in iter_spots(db, iteration_id) for spot in chunk]
+
+
+def load_spot_arrays(db: sqlite3.Connection, iteration_id: int) -> tuple[np.ndarray, SpotArrays]:
+    """(sequence_index, spots in top-left mm) ordered by sequence_index, without per-spot dicts."""
+    block = read_spot_block(db, iteration_id)
+    if block is not None:
+        arrays = block[0]
+        return np.arange(len(arrays), dtype=np.int64), arrays
+    rows = db.execute(
+        "SELECT sequence_index, x_mm, y_mm, theta_deg, t_mm, mask_id FROM spots "
+        "WHERE iteration_id = ? ORDER BY sequence_index ASC",
+        (iteration_id,),
+    ).fetchall()
+    if not rows:
+        return np.zeros(0, dtype=np.int64), SpotArrays.empty()
+    seq, xs, ys, ths, ts, ids = zip(*rows)
+    return np.asarray(seq, dtype=np.int64), SpotArrays.from_columns(xs, ys, ths, ts, list(ids))
+
+
+def load_spot_xy(db: sqlite3.Connection, iteration_id: int) -> list[tuple[float, float]]:
+    """(x_mm, y_mm) in top-left mm, ordered by sequence_index (block or rows)."""
+    block = read_spot_block(db, iteration_id)
+    if block is not None:
+        arrays = block[0]
+        return list(zip(arrays.x_mm.tolist(), arrays.y_mm.tolist()))
+    rows = db.execute(
+        "SELECT x_mm, y_mm FROM spots WHERE iteration_id = ? ORDER BY sequence_index ASC",
+        (iteration_id,),
+    ).fetchall()
+    return [(float(r[0]), float(r[1])) for r in rows]
+
+
+def pack_spot_rows(db: sqlite3.Connection, iteration_id: int) -> bool:
+    """
+    Move one iteration's spots rows into a spot_blocks row (caller commits).
+    Skipped (False) when a block already exists, there are no rows, component_id is set
+    or sequence_index is not 0..n-1 (the block cannot represent those).
+    """
+    if read_spot_block(db, iteration_id) is not None:
+        return False
+    rows = db.execute(
+        "SELECT sequence_index, x_mm, y_mm, theta_deg, t_mm, mask_id, component_id, created_at "
+        "FROM spots WHERE iteration_id = ? ORDER BY sequence_index ASC",
+        (iteration_id,),
+    ).fetchall()
+    if not rows:
+        return False
+    if any(r[0] != k or r[6] is not None for k, r in enumerate(rows)):
+        return False
+    arrays = SpotArrays.from_columns(
+        [r[1] for r in rows],
+        [r[2] for r in rows],
+        [r[3] for r in rows],
+        [r[4] for r in rows],
+        [r[5] for r in rows],
+    )
+    insert_spot_block(db, iteration_id, arrays, rows[0][7])
+    db.execute("DELETE FROM spots WHERE iteration_id = ?", (iteration_id,))
+    return True
@@ -0,0 +1,56 @@
+"""
+Binary wire format for iteration spots (GET /api/iterations/{id}/spots?format=bin).
+
+Layout (all little-endian), sized so every array starts on an 8-byte boundary:
+- header, 16 bytes: magic b"LXSP", uint16 version, uint16 header size (16), uint32 spots count,
+  uint32 iteration id;
+- float64[n] x_mm, float64[n] y_mm, float64[n] theta_deg, float64[n] t_mm;
+- int32[n] sequence_index, int32[n] mask_id (NO_MASK_ID = -1 where the spot has no mask).
+Clients map each block straight into a Float64Array / Int32Array (offset = 16 + k * 8n, ...).
+component_id is not carried (it is never set by the planner).
+"""
+
+from __future__ import annotations
+
+import struct
+
+import numpy as np
+
+from app.services.spot_arrays import FLOAT_DTYPE_LE, MASK_ID_DTYPE_LE, SpotArrays
+
+SPOTS_BIN_MAGIC = b"LXSP"
+SPOTS_BIN_VERSION = 1
+SPOTS_BIN_MEDIA_TYPE = "application/octet-stream"
+_HEADER = struct.Struct("<4sHHII")
+
+
+def encode_spots_bin(iteration_id: int, sequence_index: np.ndarray, spots: SpotArrays) -> bytes:
+    """Header + contiguous column arrays (see module docstring)."""
+    n = len(spots)
+    header = _HEADER.pack(SPOTS_BIN_MAGIC, SPOTS_BIN_VERSION, _HEADER.size, n, iteration_id)
+    return b"".join(
+        (
+            header,
+            spots.x_mm.astype(FLOAT_DTYPE_LE).tobytes(),
+            spots.y_mm.astype(FLOAT_DTYPE_LE).tobytes(),
+            spots.theta_deg.astype(FLOAT_DTYPE_LE).tobytes(),
+            spots.t_mm.astype(FLOAT_DTYPE_LE).tobytes(),
+            np.asarray(sequence_index).astype(MASK_ID_DTYPE_LE).tobytes(),
+            spots.mask_id.astype(MASK_ID_DTYPE_LE).tobytes(),
+        )
+    )
+
+
+def decode_spots_bin(payload: bytes) -> tuple[int, np.ndarray, SpotArrays]:
+    """Inverse of encode_spots_bin: (iteration_id, sequence_index, spots). Raises ValueError if malformed."""
+    if len(payload) < _HEADER.size:
+        raise ValueError("Spots payload too short")
+    magic, version, header_size, n, iteration_id = _HEADER.unpack_from(payload)
+    if magic != SPOTS_BIN_MAGIC or version != SPOTS_BIN_VERSION:
+        raise ValueError("Unsupported spots payload")
+    if len(payload) != header_size + 40 * n:
+        raise ValueError("Spots payload size does not match header")
+    floats = np.frombuffer(payload, dtype=FLOAT_DTYPE_LE, count=4 * n, offset=header_size).reshape(4, n)
+    ints = np.frombuffer(payload, dtype=MASK_ID_DTYPE_LE, count=2 * n, offset=header_size + 32 * n).reshape(2, n)
+    spots = SpotArrays.from_columns(floats[0], floats[1], floats[2], floats[3], ints[1])
+    return iteration_id, ints[0].astype(np.int64), spots
@@ -0,0 +1,113 @@
+"""
+Content-addressed storage for uploaded images.
+
+- stage_upload streams the request body to a temp file in the upload dir in fixed-size chunks,
+  hashing as it goes and stopping at max_bytes (constant memory per upload). The source is the
+  file part Starlette has already spooled; the request body itself is bounded while it is received
+  by app.middleware.upload_limit (max_upload_request_bytes).
+- Files are stored flat as <sha256><suffix> (readers resolve upload_dir / Path(storage_path).name),
+  so identical uploads share one file; ".jpeg" is normalized to ".jpg".
+- Reference count = images rows with that content_sha256 and storage_path (indexed), so it cannot
+  drift from the table. release_file removes the file when the last row is gone; callers run
+  place/release inside a BEGIN IMMEDIATE transaction so uploads and deletes are serialized, and
+  release only once the row delete is committed (a failed commit must not lose the file).
+- Files with legacy (non content-addressed) names are never removed here.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+# Read size per chunk while streaming an upload
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Default upper bound for one upload (UPLOAD_MAX_BYTES overrides)
+DEFAULT_MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+# Request body allowance on top of the file: multipart boundaries, part headers, width_mm
+UPLOAD_MULTIPART_OVERHEAD_BYTES = 64 * 1024
+_SUFFIX_ALIASES = {".jpeg": ".jpg"}
+
+
+class UploadTooLarge(Exception):
+    """Upload exceeded the configured maximum size."""
+
+
+@dataclass(frozen=True)
+class StagedUpload:
+    """Upload streamed to a temp file (same directory as the final file, so rename is atomic)."""
+
+    temp_path: Path
+    size_bytes: int
+    content_sha256: str
+
+
+def get_max_upload_bytes() -> int:
+    return int(os.environ.get("UPLOAD_MAX_BYTES", str(DEFAULT_MAX_UPLOAD_BYTES)))
+
+
+def max_upload_request_bytes() -> int:
+    """Largest upload request body accepted (enforced by UploadLimitMiddleware while receiving)."""
+    return get_max_upload_bytes() + UPLOAD_MULTIPART_OVERHEAD_BYTES
+
+
+def stage_upload(source: BinaryIO, upload_dir: Path, max_bytes: int) -> StagedUpload:
+    """Copy source to a temp file chunk by chunk, hashing; raises UploadTooLarge past max_bytes."""
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(dir=upload_dir, prefix=".upload-", suffix=".part")
+    temp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            while chunk := source.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                handle.write(chunk)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return StagedUpload(temp_path=temp_path, size_bytes=size, content_sha256=digest.hexdigest())
+
+
+def discard_staged(staged: StagedUpload) -> None:
+    staged.temp_path.unlink(missing_ok=True)
+
+
+def content_addressed_name(content_sha256: str, suffix: str) -> str:
+    suffix = suffix.lower()
+    return f"{content_sha256}{_SUFFIX_ALIASES.get(suffix, suffix)}"
+
+
+def place_staged(staged: StagedUpload, dest_path: Path) -> bool:
+    """Move the staged file to dest_path; if it already exists (same content), drop the temp. True if new."""
+    if dest_path.is_file():
+        discard_staged(staged)
+        return False
+    os.replace(staged.temp_path, dest_path)
+    return True
+
+
+def release_file(
+    db: sqlite3.Connection,
+    upload_dir: Path,
+    storage_path: str,
+    content_sha256: str | None,
+) -> bool:
+    """Remove the stored file if no images row references it any more. True if removed."""
+    name = Path(storage_path).name
+    if not content_sha256 or Path(name).stem != content_sha256:
+        return False
+    remaining = db.execute(
+        "SELECT COUNT(*) FROM images WHERE content_sha256 = ? AND storage_path = ?",
+        (content_sha256, storage_path),
+    ).fetchone()[0]
+    if remaining:
+        return False
+    (upload_dir / name).unlink(missing_ok=True)
+    return True
@@ -12,6 +12,8 @@ load_dotenv(_backend_dir / ".env")
 load_dotenv(_backend_dir.parent / ".env")
 load_dotenv()
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -22,12 +24,30 @@ from app.api.images import router as images_router
 from app.api.iteration_by_id import router as iteration_by_id_router
 from app.api.iterations import router as iterations_router
 from app.api.masks import router as masks_router
-from app.middleware.auth import auth_middleware
+from app.api.plan_jobs import router as plan_jobs_router
+from app.auth.session import reload_session_settings
+from app.db.pool import close_pools, pool_stats
+from app.middleware.auth import AuthMiddleware
+from app.middleware.upload_limit import UploadLimitMiddleware
+from app.services.plan_cache import plan_cache
+from app.services.plan_jobs import plan_job_stats, shutdown_plan_jobs
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Ustawienia sesji (AUTH_*) czytane raz przy starcie
+    reload_session_settings()
+    yield
+    # Dokończ zadania planowania, potem zamknij połączenia z puli SQLite
+    shutdown_plan_jobs()
+    close_pools()
+
 
 app = FastAPI(
     title="LaserXe API",
     description="Backend API: generacja siatki spotów, sekwencja emisji, walidacja, logowanie.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS: frontend (e.g. Astro on :4321) calls this API on :8000 — browser blocks without Allow-Origin.
@@ -39,17 +59,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.middleware("http")(auth_middleware)
+# Limit rozmiaru uploadu sprawdzany przy odbiorze treści żądania (przed parsowaniem formularza)
+app.add_middleware(UploadLimitMiddleware)
+# Czyste ASGI (bez BaseHTTPMiddleware): odpowiedzi strumieniowe nie są opakowywane
+app.add_middleware(AuthMiddleware)
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
 app.include_router(images_router, prefix="/api/images", tags=["images"])
 app.include_router(masks_router, prefix="/api/images", tags=["masks"])
 app.include_router(iterations_router, prefix="/api/images", tags=["iterations"])
 app.include_router(iteration_by_id_router, prefix="/api/iterations", tags=["iterations"])
+app.include_router(plan_jobs_router, prefix="/api/plan-jobs", tags=["iterations"])
 app.include_router(audit_log_router, prefix="/api", tags=["audit-log"])
 app.include_router(grid_generator_router, prefix="/api/grid-generator", tags=["grid-generator"])
 
 
 @app.get("/health")
 def health():
-    """Endpoint do sprawdzenia dostępności API (CI/CD, Docker)."""
-    return {"status": "ok"}
+    """Endpoint do sprawdzenia dostępności API (CI/CD, Docker) + liczniki cache planów, puli połączeń i zadań."""
+    return {
+        "status": "ok",
+        "plan_cache": plan_cache.stats(),
+        "db_pool": pool_stats(),
+        "plan_jobs": plan_job_stats(),
+    }
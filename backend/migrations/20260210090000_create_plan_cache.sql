@@ -0,0 +1,24 @@
+-- Cache wyników planera (generate_plan_by_mode) kluczowany hashem treści wejścia
+-- Tabela: plan_cache
+-- cache_key = SHA-256 (maski w center mm, pokrycie, coverage_per_mask, tryb, rozstaw, wersja algorytmu).
+-- Spoty zapisane kolumnowo: x_mm, y_mm, theta_deg, t_mm (float64 LE), mask_id (int32 LE).
+
+create table if not exists plan_cache (
+    cache_key text primary key,
+    achieved_coverage_pct real,
+    spots_count integer not null,
+    spots_outside_mask_count integer not null,
+    overlap_count integer not null,
+    plan_valid integer not null,
+    fallback_used integer not null default 0,
+    spacing_evaluations integer not null default 0,
+    x_mm blob not null,
+    y_mm blob not null,
+    theta_deg blob not null,
+    t_mm blob not null,
+    mask_id blob not null,
+    created_at text not null,
+    last_used_at text not null
+);
+
+create index if not exists idx_plan_cache_last_used_at on plan_cache (last_used_at);
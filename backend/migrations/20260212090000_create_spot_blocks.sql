@@ -0,0 +1,17 @@
+-- Kolumnowy zapis spotów iteracji: jeden wiersz na iterację zamiast jednego wiersza na spot
+-- Tabela: spot_blocks
+-- x_mm, y_mm, theta_deg, t_mm: float64 LE; mask_id: int32 LE (-1 = brak maski). Kolejność = sequence_index.
+-- Starsze iteracje zostają w tabeli spots (odczyt obsługuje oba formaty);
+-- konwersja: python backend/scripts/migrate_spots_to_blocks.py
+
+create table if not exists spot_blocks (
+    iteration_id integer primary key,
+    spots_count integer not null,
+    x_mm blob not null,
+    y_mm blob not null,
+    theta_deg blob not null,
+    t_mm blob not null,
+    mask_id blob not null,
+    created_at text not null,
+    foreign key (iteration_id) references plan_iterations(id) on delete cascade
+);
@@ -0,0 +1,10 @@
+-- Wymiary w pikselach i hash treści obrazu zapisywane przy uploadzie (planowanie bez otwierania pliku)
+-- Tabela: images
+-- Istniejące wiersze: width_px/height_px/content_sha256 = NULL; uzupełnia je
+-- scripts/backfill_image_dimensions.py (uruchamiany też przez run_migrations.py) albo pierwsze planowanie.
+
+alter table images add column width_px integer;
+alter table images add column height_px integer;
+alter table images add column content_sha256 text;
+
+create index if not exists idx_images_content_sha256 on images(content_sha256);
@@ -0,0 +1,12 @@
+-- Indeksy złożone pod paginację kursorową audit_log po (created_at, id)
+-- Tabela: audit_log
+-- id (rowid) jest niejawnie ostatnią kolumną każdego indeksu, więc (filtr, created_at) porządkuje
+-- wiersze po (created_at, id) w obrębie filtra – kolejna strona to jedno wyszukanie w indeksie.
+-- Indeksy jednokolumnowe po iteration_id i user_id są prefiksami nowych, więc zostają usunięte.
+
+create index if not exists idx_audit_log_iteration_created on audit_log(iteration_id, created_at);
+create index if not exists idx_audit_log_user_created on audit_log(user_id, created_at);
+create index if not exists idx_audit_log_event_type_created on audit_log(event_type, created_at);
+
+drop index if exists idx_audit_log_iteration_id;
+drop index if exists idx_audit_log_user_id;
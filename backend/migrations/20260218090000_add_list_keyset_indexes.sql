@@ -0,0 +1,10 @@
+-- Indeksy złożone pod paginację kursorową list obrazów i iteracji po (created_at, id)
+-- Tabele: images, plan_iterations
+-- id (rowid) jest niejawnie ostatnią kolumną indeksu: (created_by, created_at) i (image_id, created_at)
+-- porządkują wiersze po (created_at, id) – kolejna strona to jedno wyszukanie w indeksie.
+-- idx_plan_iterations_image_id jest prefiksem nowego indeksu, więc zostaje usunięty.
+
+create index if not exists idx_images_created_by_created on images(created_by, created_at);
+create index if not exists idx_plan_iterations_image_created on plan_iterations(image_id, created_at);
+
+drop index if exists idx_plan_iterations_image_id;
@@ -0,0 +1,39 @@
+"""
+Uzupełnia images.width_px / height_px / content_sha256 dla wierszy sprzed migracji add_images_dimensions.
+Użycie: python scripts/backfill_image_dimensions.py [ścieżka_do_bazy]
+Pliki szukane w UPLOAD_DIR (domyślnie backend/uploads), po nazwie pliku z storage_path.
+"""
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+# backend/scripts -> backend
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from app.db.connection import get_db_path  # noqa: E402
+from app.services.image_meta import backfill_image_dimensions  # noqa: E402
+
+
+def get_upload_dir() -> Path:
+    path = Path(os.environ.get("UPLOAD_DIR", "uploads"))
+    return path if path.is_absolute() else BACKEND / path
+
+
+def run_backfill(db_path: str) -> tuple[int, int]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return backfill_image_dimensions(conn, get_upload_dir())
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    db_path = sys.argv[1] if len(sys.argv) > 1 else get_db_path()
+    updated, missing = run_backfill(db_path)
+    print(f"Images updated: {updated}, missing/unreadable files: {missing}")
+
+
+if __name__ == "__main__":
+    main()
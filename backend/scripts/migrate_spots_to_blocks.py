@@ -0,0 +1,52 @@
+"""
+Konwersja istniejących spotów (tabela spots, wiersz na spot) do spot_blocks (wiersz na iterację).
+Użycie: python scripts/migrate_spots_to_blocks.py [ścieżka_do_bazy] [--vacuum]
+Bez ścieżki: DATABASE_URL lub ./laserme.db. Wymaga migracji create_spot_blocks.
+Idempotentny: iteracje z istniejącym blokiem są pomijane; commit co BATCH_SIZE iteracji.
+"""
+import sqlite3
+import sys
+from pathlib import Path
+
+# backend/scripts -> backend
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from app.db.connection import get_db_path  # noqa: E402
+from app.services.spot_store import pack_spot_rows  # noqa: E402
+
+BATCH_SIZE = 200
+
+
+def migrate_spots_to_blocks(db_path: str, vacuum: bool = False) -> tuple[int, int]:
+    """Pack spots rows into blocks; return (converted, skipped) iteration counts."""
+    conn = sqlite3.connect(db_path)
+    try:
+        iteration_ids = [
+            row[0] for row in conn.execute("select distinct iteration_id from spots order by iteration_id")
+        ]
+        converted = skipped = 0
+        for k, iteration_id in enumerate(iteration_ids, start=1):
+            if pack_spot_rows(conn, iteration_id):
+                converted += 1
+            else:
+                skipped += 1
+            if k % BATCH_SIZE == 0:
+                conn.commit()
+        conn.commit()
+        if vacuum:
+            conn.execute("vacuum")
+    finally:
+        conn.close()
+    return converted, skipped
+
+
+def main() -> None:
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    db_path = args[0] if args else get_db_path()
+    converted, skipped = migrate_spots_to_blocks(db_path, vacuum="--vacuum" in sys.argv)
+    print(f"Converted: {converted} iterations, skipped: {skipped}")
+
+
+if __name__ == "__main__":
+    main()
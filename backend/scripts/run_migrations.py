@@ -54,6 +54,9 @@ def main() -> None:
     # Seed domyślnego użytkownika (user / 123)
     from scripts.seed_default_user import seed_default_user
     seed_default_user(db_path)
+    # Wymiary w px i hash dla obrazów sprzed kolumn width_px/height_px
+    from scripts.backfill_image_dimensions import run_backfill
+    run_backfill(db_path)
     print("Migrations and seed done.")
 
 
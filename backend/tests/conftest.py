@@ -0,0 +1,59 @@
+"""Shared API fixtures: in-memory DB built from the migrations, logged-in TestClient."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from contextlib import nullcontext
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from passlib.hash import bcrypt
+
+from app.auth.session import reload_session_settings
+from app.db.connection import get_db, get_db_factory, get_read_db
+from app.services.keyset import approx_counts
+from main import app
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+
+
+@pytest.fixture()
+def conn() -> sqlite3.Connection:
+    os.environ["AUTH_SECRET_KEY"] = "test-secret"
+    os.environ["AUTH_COOKIE_NAME"] = "laserxe_session"
+    os.environ["AUTH_COOKIE_SECURE"] = "false"
+    os.environ["AUTH_COOKIE_SAMESITE"] = "lax"
+    os.environ["AUTH_COOKIE_MAX_AGE_SECONDS"] = "3600"
+    reload_session_settings()
+    approx_counts.clear()
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    for path in sorted(MIGRATIONS.glob("*.sql")):
+        conn.executescript(path.read_text(encoding="utf-8"))
+    conn.execute(
+        "insert into users (login, password_hash, created_at) values ('user', ?, datetime('now'))",
+        (bcrypt.using(rounds=4).hash("123"),),
+    )
+    conn.execute("insert into images (storage_path, width_mm, created_by, created_at) values ('a.png', 30, 1, datetime('now'))")
+    conn.execute("insert into masks (image_id, vertices, created_at) values (1, '[]', datetime('now'))")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture()
+def client(conn: sqlite3.Connection):
+    def _override_get_db():
+        yield conn
+
+    app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_read_db] = _override_get_db
+    app.dependency_overrides[get_db_factory] = lambda: lambda: nullcontext(conn)
+    test_client = TestClient(app)
+    assert test_client.post("/api/auth/login", json={"login": "user", "password": "123"}).status_code == 200
+    try:
+        yield test_client
+    finally:
+        app.dependency_overrides.clear()
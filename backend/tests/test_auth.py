@@ -5,7 +5,8 @@ import pytest
 from fastapi.testclient import TestClient
 from passlib.hash import bcrypt
 
-from app.db.connection import get_db
+from app.auth.session import reload_session_settings
+from app.db.connection import get_db, get_read_db
 from main import app
 
 
@@ -40,6 +41,7 @@ def client():
     os.environ["AUTH_COOKIE_SECURE"] = "false"
     os.environ["AUTH_COOKIE_SAMESITE"] = "lax"
     os.environ["AUTH_COOKIE_MAX_AGE_SECONDS"] = "3600"
+    reload_session_settings()
 
     # check_same_thread=False so the same connection can be used from the test
     # thread (setup) and from the request thread (TestClient runs requests in another thread).
@@ -52,6 +54,7 @@ def client():
         yield conn
 
     app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_read_db] = _override_get_db
     test_client = TestClient(app)
     try:
         yield test_client
@@ -110,3 +113,42 @@ def test_login_missing_fields_returns_422(client: TestClient) -> None:
 def test_login_empty_fields_returns_422(client: TestClient) -> None:
     response = client.post("/api/auth/login", json={"login": "", "password": ""})
     assert response.status_code == 422
+
+
+def test_token_cache_serves_verified_payload_until_exp() -> None:
+    from app.auth.session import SessionTokenCache
+
+    cache = SessionTokenCache(max_entries=2)
+    cache.put("a", {"sub": 1, "exp": 100})
+    cache.put("b", {"sub": 2, "exp": 200})
+    assert cache.get("a", now=99) == {"sub": 1, "exp": 100}
+    cache.put("c", {"sub": 3, "exp": 300})  # evicts least recently used ("b")
+    assert cache.get("b", now=0) is None
+    assert cache.get("a", now=100) is None  # expired -> dropped
+    assert len(cache) == 1
+
+
+def test_settings_are_cached_until_reload(client: TestClient) -> None:
+    from app.auth.session import session_token_cache
+
+    assert client.post("/api/auth/login", json={"login": "user", "password": "123"}).status_code == 200
+    assert client.get("/api/auth/me").status_code == 200
+    assert len(session_token_cache) == 1
+    os.environ["AUTH_SECRET_KEY"] = "rotated"
+    try:
+        # Not re-read per request: the cookie stays valid until the explicit reload
+        assert client.get("/api/auth/me").status_code == 200
+        reload_session_settings()
+        assert len(session_token_cache) == 0
+        assert client.get("/api/auth/me").status_code == 401
+    finally:
+        os.environ["AUTH_SECRET_KEY"] = "test-secret"
+        reload_session_settings()
+
+
+def test_tampered_cookie_is_rejected(client: TestClient) -> None:
+    assert client.post("/api/auth/login", json={"login": "user", "password": "123"}).status_code == 200
+    token = client.cookies.get("laserxe_session")
+    payload_b64, signature = token.split(".", 1)
+    client.cookies.set("laserxe_session", f"{payload_b64}x.{signature}")
+    assert client.get("/api/auth/me").status_code == 401
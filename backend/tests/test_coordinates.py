@@ -5,10 +5,12 @@ Phase D: roundtrip, image center mapping, vertices conversion.
 
 from __future__ import annotations
 
+import numpy as np
 import pytest
 
 from app.services.coordinates import (
     center_mm_to_top_left_mm,
+    center_mm_to_top_left_mm_arrays,
     top_left_mm_to_center_mm,
     vertices_center_to_top_left,
     vertices_top_left_to_center,
@@ -64,3 +66,12 @@ def test_vertices_roundtrip() -> None:
     verts_tl2 = vertices_center_to_top_left(verts_c, width_mm, height_mm)
     for (a, b), (c, d) in zip(verts_tl, verts_tl2):
         assert abs(a - c) < 1e-9 and abs(b - d) < 1e-9
+
+
+def test_array_conversion_matches_scalar() -> None:
+    """Vectorized center → top-left gives exactly the scalar results."""
+    xs = np.array([-7.3, 0.0, 1e-3, 12.5])
+    ys = np.array([4.2, 0.0, -9.9, -12.5])
+    x_tl, y_tl = center_mm_to_top_left_mm_arrays(xs, ys, 30.0, 22.5)
+    expected = [center_mm_to_top_left_mm(x, y, 30.0, 22.5) for x, y in zip(xs.tolist(), ys.tolist())]
+    assert list(zip(x_tl.tolist(), y_tl.tolist())) == expected
@@ -0,0 +1,98 @@
+"""Tests for the pooled SQLite connections (pragmas, reuse, bounds, reader/writer split)."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.db.pool as pool_module
+from app.db.pool import ConnectionPool, DatabasePools, PoolTimeout
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+
+
+def test_connections_are_configured_once_and_reused(tmp_path: Path) -> None:
+    pool = ConnectionPool(str(tmp_path / "a.db"), 2, busy_timeout_ms=1234, mmap_size=4096)
+    conn = pool.acquire()
+    assert conn.execute("pragma journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("pragma synchronous").fetchone()[0] == 1
+    assert conn.execute("pragma busy_timeout").fetchone()[0] == 1234
+    assert conn.execute("pragma foreign_keys").fetchone()[0] == 0
+    pool.release(conn)
+    with pool.connection() as again:
+        assert again is conn
+    assert pool.stats()["size"] == 1
+    pool.close()
+
+
+def test_release_rolls_back_open_transaction(tmp_path: Path) -> None:
+    pool = ConnectionPool(str(tmp_path / "a.db"), 1)
+    with pool.connection() as conn:
+        conn.execute("create table t (x integer)")
+        conn.commit()
+        conn.execute("insert into t values (1)")
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("select count(*) from t").fetchone()[0] == 0
+    pool.close()
+
+
+def test_exhausted_pool_waits_then_times_out(tmp_path: Path) -> None:
+    pool = ConnectionPool(str(tmp_path / "a.db"), 1, timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+
+    pool.timeout = 5.0
+    threading.Timer(0.05, pool.release, args=(held,)).start()
+    started = time.perf_counter()
+    with pool.connection() as conn:
+        assert conn is held
+    assert time.perf_counter() - started < 5.0
+    stats = pool.stats()
+    assert stats["waits"] == 1 and stats["wait_ms_max"] > 0
+    assert stats["checked_out"] == 0 and stats["waiting"] == 0
+    pool.close()
+
+
+def test_readers_see_committed_writes_while_writer_is_open(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("DB_READER_POOL_SIZE", "2")
+    pools = DatabasePools(str(tmp_path / "a.db"))
+    assert pools.for_method("GET") is pools.reader
+    assert pools.for_method("post") is pools.writer
+    with pools.writer.connection() as writer:
+        writer.execute("create table t (x integer)")
+        writer.execute("insert into t values (1)")
+        writer.commit()
+        writer.execute("insert into t values (2)")
+        with pools.reader.connection() as reader:
+            # WAL: the reader is not blocked by the open write transaction and sees the last commit
+            assert reader.execute("select count(*) from t").fetchone()[0] == 1
+    assert pools.stats()["reader"]["max_size"] == 2
+    pools.close()
+
+
+def test_get_db_uses_pools_and_health_reports_them(tmp_path: Path, monkeypatch) -> None:
+    from main import app
+
+    db_path = tmp_path / "api.db"
+    with sqlite3.connect(db_path) as conn:
+        for path in sorted(MIGRATIONS.glob("*.sql")):
+            conn.executescript(path.read_text(encoding="utf-8"))
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_path}")
+    monkeypatch.setenv("AUTH_SECRET_KEY", "test-secret")
+    monkeypatch.setattr(pool_module, "_pools", None)
+    with TestClient(app) as client:
+        assert client.post("/api/auth/login", json={"login": "x", "password": "y"}).status_code == 401
+        stats = client.get("/health").json()["db_pool"]
+        # Login only reads (bcrypt runs outside the write path): reader pool, writer untouched
+        assert stats["reader"]["acquisitions"] == 1
+        assert stats["reader"]["checked_out"] == 0
+        assert stats["writer"]["acquisitions"] == 0
+    assert pool_module._pools is None
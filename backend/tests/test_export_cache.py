@@ -0,0 +1,55 @@
+"""Tests for the on-disk export render cache."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from app.services.export_cache import ExportRenderCache, get_export_cache
+
+
+def test_put_then_get_returns_file(tmp_path: Path) -> None:
+    cache = ExportRenderCache(tmp_path / "c", max_bytes=1000)
+    assert cache.get("abc", "png") is None
+    path = cache.put("abc", "png", b"data")
+    assert path.read_bytes() == b"data"
+    assert cache.get("abc", "png") == path
+    assert cache.get("abc", "jpg") is None
+
+
+def test_eviction_removes_least_recently_used(tmp_path: Path) -> None:
+    cache = ExportRenderCache(tmp_path, max_bytes=250)
+    old = cache.put("old", "png", b"x" * 100)
+    used = cache.put("used", "png", b"x" * 100)
+    os.utime(old, ns=(1, 1))
+    os.utime(used, ns=(2, 2))
+    cache.get("used", "png")  # hit refreshes mtime
+    cache.put("new", "png", b"x" * 100)
+    assert not old.exists()
+    assert used.exists() and cache.path_for("new", "png").exists()
+
+
+def test_default_directory_is_under_upload_dir(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.delenv("EXPORT_CACHE_DIR", raising=False)
+    assert get_export_cache(tmp_path).directory == tmp_path / ".export-cache"
+
+
+def test_recently_used_files_survive_eviction(tmp_path: Path) -> None:
+    """A file just returned by get()/put() may still be sending: kept even over the bound."""
+    cache = ExportRenderCache(tmp_path, max_bytes=150)
+    served = cache.put("served", "png", b"x" * 100)
+    cache.put("new", "png", b"x" * 100)
+    assert served.exists()
+    os.utime(served, ns=(1, 1))
+    cache.put("newer", "png", b"x" * 100)
+    assert not served.exists()
+
+
+def test_one_instance_per_directory(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.delenv("EXPORT_CACHE_DIR", raising=False)
+    monkeypatch.setenv("EXPORT_CACHE_MAX_BYTES", "1000")
+    first = get_export_cache(tmp_path)
+    monkeypatch.setenv("EXPORT_CACHE_MAX_BYTES", "2000")
+    second = get_export_cache(tmp_path)
+    assert first is second and second.max_bytes == 2000
+    assert get_export_cache(tmp_path / "other") is not first
@@ -14,6 +14,7 @@ from app.services.grid_generator import (
     generate_grid,
     generate_grid_simple,
     generate_grid_advanced,
+    _simple_axis_count,
 )
 from main import app
 
@@ -84,6 +85,16 @@ def test_generate_grid_simple_theta_t_from_center() -> None:
         assert abs(s.theta_deg - expected_theta) < 1e-6
 
 
+def test_generate_grid_simple_analytic_count_matches_lattice() -> None:
+    """Analytic per-axis count squared equals the materialized grid; spots stay inside [r, 12-r]."""
+    for d in (0.31, 0.5, 0.8, 1.0, 11.7 / 9, 2.5):
+        result = generate_grid_simple(spot_diameter_um=300, axis_distance_mm=d)
+        assert result.spots_count == _simple_axis_count(d, 300) ** 2
+        for s in result.spots:
+            assert 0.15 - 1e-9 <= s.x_mm <= 11.85 + 1e-9
+            assert 0.15 - 1e-9 <= s.y_mm <= 11.85 + 1e-9
+
+
 def test_generate_grid_advanced_basic() -> None:
     """Advanced aperture: 25 mm diameter, yields spots inside circle."""
     result = generate_grid_advanced(
@@ -211,7 +222,7 @@ def client_with_auth():
 
     import sqlite3
     from passlib.hash import bcrypt
-    from app.db.connection import get_db
+    from app.db.connection import get_db, get_read_db
 
     conn = sqlite3.connect(":memory:", check_same_thread=False)
     conn.row_factory = sqlite3.Row
@@ -236,6 +247,7 @@ def client_with_auth():
         yield conn
 
     app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_read_db] = _override_get_db
     client = TestClient(app)
     login = client.post("/api/auth/login", json={"login": "user", "password": "123"})
     assert login.status_code == 200
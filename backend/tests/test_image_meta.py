@@ -0,0 +1,79 @@
+"""Tests for image metadata captured at upload (pixel size, content hash) and its backfill."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+from PIL import Image
+
+from app.api.iterations import _get_image_width_height_mm
+from app.services.image_meta import (
+    backfill_image_dimensions,
+    height_mm_from_pixels,
+    probe_image_bytes,
+    probe_image_file,
+)
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+
+
+def _png_bytes(size: tuple[int, int]) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, "white").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_probe_bytes_reads_size_and_hash() -> None:
+    data = _png_bytes((40, 25))
+    meta = probe_image_bytes(data)
+    assert (meta.width_px, meta.height_px) == (40, 25)
+    assert meta.content_sha256 == hashlib.sha256(data).hexdigest()
+    assert probe_image_bytes(b"not an image") is None
+
+
+def test_probe_file_matches_bytes(tmp_path: Path) -> None:
+    data = _png_bytes((7, 9))
+    (tmp_path / "a.png").write_bytes(data)
+    assert probe_image_file(tmp_path / "a.png") == probe_image_bytes(data)
+    assert probe_image_file(tmp_path / "missing.png") is None
+
+
+def test_height_from_pixels() -> None:
+    assert height_mm_from_pixels(30.0, 300, 200) == 20.0
+    assert height_mm_from_pixels(30.0, None, 200) is None
+
+
+def test_backfill_fills_rows_without_pixel_size(conn: sqlite3.Connection, tmp_path: Path) -> None:
+    (tmp_path / "a.png").write_bytes(_png_bytes((60, 45)))
+    conn.execute("insert into images (storage_path, width_mm, created_by) values ('uploads/gone.png', 10, 1)")
+    assert backfill_image_dimensions(conn, tmp_path) == (1, 1)
+    row = conn.execute("select width_px, height_px, content_sha256 from images where id = 1").fetchone()
+    assert (row["width_px"], row["height_px"]) == (60, 45) and len(row["content_sha256"]) == 64
+    assert backfill_image_dimensions(conn, tmp_path) == (0, 1)
+
+
+def test_plan_size_backfill_writes_through_the_writer(tmp_path: Path, monkeypatch) -> None:
+    """The lazy probe stores the pixel size on a db_factory writer; the reader is never written."""
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    (tmp_path / "a.png").write_bytes(_png_bytes((60, 45)))
+    db_path = tmp_path / "meta.db"
+    with closing(sqlite3.connect(db_path)) as setup:
+        for path in sorted(MIGRATIONS.glob("*.sql")):
+            setup.executescript(path.read_text(encoding="utf-8"))
+        setup.execute("insert into users (login, password_hash, created_at) values ('u', 'x', datetime('now'))")
+        setup.execute("insert into images (storage_path, width_mm, created_by, created_at) "
+                      "values ('a.png', 30, 1, datetime('now'))")
+        setup.commit()
+    reader = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    reader.row_factory = sqlite3.Row
+    writer = sqlite3.connect(db_path)
+    try:
+        assert _get_image_width_height_mm(reader, 1, 1, lambda: closing(writer)) == (30.0, 22.5)
+        row = reader.execute("select width_px, height_px from images where id = 1").fetchone()
+        assert (row["width_px"], row["height_px"]) == (60, 45)
+    finally:
+        reader.close()
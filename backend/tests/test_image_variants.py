@@ -0,0 +1,39 @@
+"""Tests for downscaled image variants (keys, bounds, output format)."""
+
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+from PIL import Image
+
+from app.services.image_variants import needs_variant, render_variant, variant_key
+
+
+def test_render_variant_bounds_longest_side_and_keeps_format(tmp_path: Path) -> None:
+    jpg = tmp_path / "a.jpg"
+    Image.new("RGB", (900, 1800), "red").save(jpg, format="JPEG")
+    content = render_variant(jpg, "thumb")
+    with Image.open(io.BytesIO(content)) as img:
+        assert img.format == "JPEG"
+        assert img.size == (160, 320)
+    png = tmp_path / "b.png"
+    Image.new("RGBA", (2560, 100), (0, 0, 0, 0)).save(png)
+    with Image.open(io.BytesIO(render_variant(png, "medium"))) as img:
+        assert (img.format, img.mode, img.size) == ("PNG", "RGBA", (1280, 50))
+    assert render_variant(png, "thumb") is not None
+    small = tmp_path / "c.png"
+    Image.new("RGB", (200, 100)).save(small)
+    assert render_variant(small, "thumb") is None
+
+
+def test_variant_key_and_needs_variant(tmp_path: Path) -> None:
+    path = tmp_path / "a.png"
+    Image.new("RGB", (10, 10)).save(path)
+    assert variant_key(path, "thumb", "abc") == variant_key(tmp_path / "other.png", "thumb", "abc")
+    assert variant_key(path, "thumb", "abc") != variant_key(path, "medium", "abc")
+    assert variant_key(path, "thumb", None) != variant_key(path, "thumb", "abc")
+    assert not needs_variant("full", 5000, 5000)
+    assert not needs_variant("thumb", 320, 200)
+    assert needs_variant("thumb", 321, 200)
+    assert needs_variant("medium", None, None)
@@ -0,0 +1,184 @@
+"""API tests for image upload metadata and its use by planning."""
+
+from __future__ import annotations
+
+import io
+import sqlite3
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.db.connection import get_db
+from main import app
+
+
+def _upload(client: TestClient, data: bytes, name: str = "photo.png"):
+    return client.post(
+        "/api/images",
+        files={"file": (name, data, "image/png")},
+        data={"width_mm": "30"},
+    )
+
+
+def test_upload_stores_pixel_size_and_rejects_non_images(
+    client: TestClient, conn: sqlite3.Connection, tmp_path: Path, monkeypatch
+) -> None:
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    buf = io.BytesIO()
+    Image.new("RGB", (300, 150), "white").save(buf, format="PNG")
+    res = _upload(client, buf.getvalue())
+    assert res.status_code == 201
+    body = res.json()
+    assert (body["width_px"], body["height_px"]) == (300, 150)
+    row = conn.execute("select content_sha256 from images where id = ?", (body["id"],)).fetchone()
+    assert row["content_sha256"] is not None
+    assert _upload(client, b"\x89PNG broken").status_code == 400
+
+
+def test_planning_uses_stored_size_without_the_file(
+    client: TestClient, conn: sqlite3.Connection, tmp_path: Path, monkeypatch
+) -> None:
+    """Stored 300x150 px -> height 15 mm: a centered square mask maps to the top-left frame accordingly."""
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    conn.execute("update images set width_px = 300, height_px = 150 where id = 1")
+    conn.execute(
+        "update masks set vertices = ? where image_id = 1",
+        ('[{"x": 12, "y": 4.5}, {"x": 18, "y": 4.5}, {"x": 18, "y": 10.5}, {"x": 12, "y": 10.5}]',),
+    )
+    conn.commit()
+    res = client.post("/api/images/1/iterations", json={"target_coverage_pct": 5, "algorithm_mode": "advanced"})
+    assert res.status_code == 201
+    spots = client.get(f"/api/iterations/{res.json()['id']}/spots").json()["items"]
+    assert spots
+    assert all(12 <= s["x_mm"] <= 18 and 4.5 <= s["y_mm"] <= 10.5 for s in spots)
+
+
+def _png(size: tuple[int, int], color: str = "white") -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_identical_uploads_share_one_file_until_last_delete(
+    client: TestClient, tmp_path: Path, monkeypatch
+) -> None:
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    data = _png((20, 10))
+    first = _upload(client, data).json()
+    second = _upload(client, data, name="copy.PNG").json()
+    other = _upload(client, _png((20, 10), "black")).json()
+    assert first["storage_path"] == second["storage_path"] != other["storage_path"]
+    stored = tmp_path / Path(first["storage_path"]).name
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        {stored.name, Path(other["storage_path"]).name}
+    )
+    assert client.delete(f"/api/images/{first['id']}").status_code == 204
+    assert stored.is_file()
+    assert client.get(f"/api/images/{second['id']}/file").content == data
+    assert client.delete(f"/api/images/{second['id']}").status_code == 204
+    assert not stored.exists()
+
+
+class _CommitFails:
+    """Connection proxy whose commit fails (rollback and reads go to the real connection)."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn, name)
+
+    def commit(self) -> None:
+        raise sqlite3.OperationalError("disk I/O error")
+
+
+def test_failed_delete_keeps_the_stored_file(
+    client: TestClient, conn: sqlite3.Connection, tmp_path: Path, monkeypatch
+) -> None:
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    image = _upload(client, _png((20, 10))).json()
+    stored = tmp_path / Path(image["storage_path"]).name
+
+    def _failing_db():
+        yield _CommitFails(conn)
+
+    app.dependency_overrides[get_db] = _failing_db
+    with pytest.raises(sqlite3.OperationalError):
+        client.delete(f"/api/images/{image['id']}")
+    assert conn.execute("select count(*) from images where id = ?", (image["id"],)).fetchone()[0] == 1
+    assert stored.is_file()
+
+def test_upload_over_limit_is_rejected_without_leftovers(
+    client: TestClient, tmp_path: Path, monkeypatch
+) -> None:
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setenv("UPLOAD_MAX_BYTES", "100")
+    res = _upload(client, _png((200, 200), "red") + b"\0" * 200)
+    assert res.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_oversized_body_is_rejected_while_received(
+    client: TestClient, tmp_path: Path, monkeypatch
+) -> None:
+    """Past UPLOAD_MAX_BYTES + multipart allowance: 413 before the form is parsed (handler never runs)."""
+    import app.api.images as images_api
+
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setenv("UPLOAD_MAX_BYTES", "100")
+    monkeypatch.setattr(images_api, "stage_upload", lambda *a: pytest.fail("handler reached"))
+    boundary = "b0undary"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"width_mm\"\r\n\r\n30\r\n"
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.png\"\r\n"
+        "Content-Type: image/png\r\n\r\n"
+    ).encode() + b"\0" * (200 * 1024) + f"\r\n--{boundary}--\r\n".encode()
+    headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+    declared = client.post("/api/images", content=body, headers=headers)
+    assert declared.status_code == 413
+    assert declared.json()["detail"] == "File too large (max 100 bytes)"
+
+    def chunked():
+        for start in range(0, len(body), 16 * 1024):
+            yield body[start : start + 16 * 1024]
+
+    streamed = client.post("/api/images", content=chunked(), headers=headers)
+    assert streamed.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_size_variants_are_downscaled_once_and_cached(
+    client: TestClient, tmp_path: Path, monkeypatch
+) -> None:
+    import app.api.images as images_api
+
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    monkeypatch.delenv("IMAGE_VARIANT_CACHE_DIR", raising=False)
+    image_id = _upload(client, _png((2000, 1000))).json()["id"]
+    url = f"/api/images/{image_id}/file"
+    assert Image.open(io.BytesIO(client.get(url).content)).size == (2000, 1000)
+    thumb = client.get(url + "?size=thumb")
+    assert thumb.status_code == 200 and thumb.headers["content-type"] == "image/png"
+    assert Image.open(io.BytesIO(thumb.content)).size == (320, 160)
+    assert len(list((tmp_path / ".variant-cache").glob("*.png"))) == 1
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("variant should be served from disk")
+
+    monkeypatch.setattr(images_api, "render_variant", _fail)
+    assert client.get(url + "?size=thumb").content == thumb.content
+    monkeypatch.undo()
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    assert Image.open(io.BytesIO(client.get(url + "?size=medium").content)).size == (1280, 640)
+    assert client.get(url + "?size=huge").status_code == 400
+
+
+def test_small_image_variant_is_the_original(client: TestClient, tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    data = _png((100, 50))
+    image_id = _upload(client, data).json()["id"]
+    assert client.get(f"/api/images/{image_id}/file?size=thumb").content == data
+    assert not (tmp_path / ".variant-cache").exists()
@@ -0,0 +1,201 @@
+"""API tests for iteration spots (streamed JSON and CSV, binary format), exports and conditional GET."""
+
+from __future__ import annotations
+
+import io
+import sqlite3
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import app.api.iteration_by_id as iteration_by_id
+from app.services.plan_grid import MaskPolygon, generate_plan
+from app.services.spot_store import (
+    SPOT_STORAGE_BLOCKS,
+    SPOT_STORAGE_ROWS,
+    IterationInsert,
+    load_spots,
+    pack_spot_rows,
+    save_iteration,
+)
+from app.services.spot_wire import decode_spots_bin
+
+SQUARE = MaskPolygon(mask_id=1, vertices=[(-3.0, -3.0), (3.0, -3.0), (3.0, 3.0), (-3.0, 3.0)])
+
+
+def _save(conn: sqlite3.Connection, storage_format: str) -> int:
+    plan = generate_plan([SQUARE], 5.0, None, 30.0)
+    iteration = IterationInsert(
+        image_id=1,
+        parent_id=None,
+        created_by=1,
+        is_demo=0,
+        params_snapshot='{"algorithm_mode": "advanced"}',
+        target_coverage_pct=5.0,
+        algorithm_mode="advanced",
+    )
+    return save_iteration(conn, iteration, plan, 30.0, 20.0, storage_format)
+
+
+@pytest.mark.parametrize("storage_format", [SPOT_STORAGE_BLOCKS, SPOT_STORAGE_ROWS])
+def test_binary_spots_match_json(client: TestClient, conn: sqlite3.Connection, storage_format: str) -> None:
+    iteration_id = _save(conn, storage_format)
+    items = client.get(f"/api/iterations/{iteration_id}/spots").json()["items"]
+    res = client.get(f"/api/iterations/{iteration_id}/spots?format=bin")
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/octet-stream"
+    decoded_id, seq, spots = decode_spots_bin(res.content)
+    assert decoded_id == iteration_id
+    assert seq.tolist() == [s["sequence_index"] for s in items]
+    assert spots.x_mm.tolist() == [s["x_mm"] for s in items]
+    assert spots.y_mm.tolist() == [s["y_mm"] for s in items]
+    assert spots.t_mm.tolist() == [s["t_mm"] for s in items]
+    assert spots.mask_id.tolist() == [s["mask_id"] for s in items]
+
+
+def test_accept_header_selects_binary_unless_format_given(client: TestClient, conn: sqlite3.Connection) -> None:
+    iteration_id = _save(conn, SPOT_STORAGE_BLOCKS)
+    headers = {"Accept": "application/octet-stream"}
+    res = client.get(f"/api/iterations/{iteration_id}/spots", headers=headers)
+    assert res.headers["content-type"] == "application/octet-stream"
+    res = client.get(f"/api/iterations/{iteration_id}/spots?format=json", headers=headers)
+    assert res.headers["content-type"] == "application/json"
+    res = client.get(f"/api/iterations/{iteration_id}/spots?format=csv")
+    assert res.headers["content-type"].startswith("text/csv")
+    assert res.text.splitlines()[0] == "# algorithm_mode=advanced"
+
+
+@pytest.mark.parametrize("storage_format", [SPOT_STORAGE_BLOCKS, SPOT_STORAGE_ROWS])
+def test_streamed_json_and_csv_contain_every_spot(
+    client: TestClient, conn: sqlite3.Connection, storage_format: str
+) -> None:
+    iteration_id = _save(conn, storage_format)
+    expected = load_spots(conn, iteration_id)
+    res = client.get(f"/api/iterations/{iteration_id}/spots?format=json")
+    assert res.json() == {"items": expected}
+    lines = client.get(f"/api/iterations/{iteration_id}/spots?format=csv").text.splitlines()
+    assert lines[1] == "sequence_index,theta_deg,t_mm,x_mm,y_mm,mask_id,component_id"
+    assert len(lines) == 2 + len(expected)
+    s = expected[-1]
+    assert lines[-1] == f"{s['sequence_index']},{s['theta_deg']},{s['t_mm']},{s['x_mm']},{s['y_mm']},{s['mask_id']},"
+
+
+def test_spots_etag_and_not_modified(client: TestClient, conn: sqlite3.Connection) -> None:
+    iteration_id = _save(conn, SPOT_STORAGE_BLOCKS)
+    url = f"/api/iterations/{iteration_id}/spots"
+    res = client.get(url)
+    etag = res.headers["etag"]
+    assert res.headers["cache-control"] == "private, no-cache"
+    assert client.get(url + "?format=csv").headers["etag"] != etag
+    res = client.get(url, headers={"If-None-Match": f'W/"other", {etag}'})
+    assert res.status_code == 304 and res.content == b""
+    assert res.headers["etag"] == etag
+    conn.execute("update plan_iterations set status = 'accepted' where id = ?", (iteration_id,))
+    conn.commit()
+    res = client.get(url)
+    assert res.headers["etag"] == etag
+    assert "immutable" in res.headers["cache-control"]
+
+
+def test_spots_etag_changes_when_rows_are_packed_into_a_block(
+    client: TestClient, conn: sqlite3.Connection
+) -> None:
+    """migrate_spots_to_blocks rewrites spot ids: cached (immutable) responses must not match."""
+    iteration_id = _save(conn, SPOT_STORAGE_ROWS)
+    conn.execute("update plan_iterations set status = 'accepted' where id = ?", (iteration_id,))
+    conn.commit()
+    url = f"/api/iterations/{iteration_id}/spots"
+    before = client.get(url)
+    export_before = client.get(f"/api/iterations/{iteration_id}/export?format=json").headers["etag"]
+    assert pack_spot_rows(conn, iteration_id)
+    conn.commit()
+    after = client.get(url, headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.headers["etag"] != before.headers["etag"]
+    assert [s["id"] for s in after.json()["items"]] != [s["id"] for s in before.json()["items"]]
+    assert client.get(f"/api/iterations/{iteration_id}/export?format=json").headers["etag"] != export_before
+
+
+def test_export_etag_changes_with_masks(client: TestClient, conn: sqlite3.Connection) -> None:
+    iteration_id = _save(conn, SPOT_STORAGE_BLOCKS)
+    url = f"/api/iterations/{iteration_id}/export?format=json"
+    res = client.get(url)
+    etag = res.headers["etag"]
+    assert res.json()["metadata"]["iteration_id"] == iteration_id
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    conn.execute("update masks set mask_label = 'edited' where image_id = 1")
+    conn.commit()
+    res = client.get(url, headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["etag"] != etag
+
+
+def test_png_export_is_rendered_once_then_served_from_disk(
+    client: TestClient, conn: sqlite3.Connection, tmp_path: Path, monkeypatch
+) -> None:
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    monkeypatch.delenv("EXPORT_CACHE_DIR", raising=False)
+    Image.new("RGB", (120, 80), "white").save(tmp_path / "a.png")
+    iteration_id = _save(conn, SPOT_STORAGE_BLOCKS)
+    url = f"/api/iterations/{iteration_id}/export?format=png"
+    first = client.get(url)
+    assert first.status_code == 200 and first.headers["content-type"] == "image/png"
+    assert list((tmp_path / ".export-cache").glob("*.png"))
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("export should be served from the render cache")
+
+    monkeypatch.setattr(iteration_by_id, "_render_export_image", _fail)
+    second = client.get(url)
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    monkeypatch.undo()
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    small = client.get(url + "&max_px=64")
+    assert small.headers["etag"] != first.headers["etag"]
+    assert Image.open(io.BytesIO(small.content)).size == (64, 43)
+
+
+def test_validation_reads_masks_like_the_planner(client: TestClient, conn: sqlite3.Connection) -> None:
+    """[x, y] pairs count as mask points; short or malformed masks are skipped, not a 500."""
+    iteration_id = _save(conn, SPOT_STORAGE_BLOCKS)
+    spots_count = conn.execute(
+        "select spots_count from plan_iterations where id = ?", (iteration_id,)
+    ).fetchone()[0]
+    # SQUARE in top-left mm of the 30 x 20 mm image
+    conn.execute("update masks set vertices = '[[12, 7], [18, 7], [18, 13], [12, 13]]' where id = 1")
+    conn.executemany(
+        "insert into masks (image_id, vertices, created_at) values (1, ?, datetime('now'))",
+        [('[{"x": 1, "y": 1}, {"x": 2, "y": 2}]',), ("not json",), ('[{"x": "a", "y": 1}]',)],
+    )
+    conn.commit()
+    body = client.get(f"/api/iterations/{iteration_id}/validation").json()
+    assert body == {
+        "iteration_id": iteration_id,
+        "spots_count": spots_count,
+        "spots_outside_mask_count": 0,
+        "overlap_count": 0,
+        "plan_valid": 1,
+    }
+
+    conn.execute("update masks set vertices = '[[0, 0], [1, 0], [1, 1], [0, 1]]' where id = 1")
+    conn.commit()
+    moved = client.get(f"/api/iterations/{iteration_id}/validation").json()
+    assert moved["spots_outside_mask_count"] == spots_count and moved["plan_valid"] == 0
+
+
+def test_validation_of_other_users_iteration_is_404(client: TestClient, conn: sqlite3.Connection) -> None:
+    conn.execute("insert into users (login, password_hash, created_at) values ('other', 'x', datetime('now'))")
+    conn.execute(
+        "insert into images (storage_path, width_mm, created_by, created_at) values ('b.png', 30, 2, datetime('now'))"
+    )
+    conn.execute(
+        "insert into plan_iterations (image_id, created_by, status, plan_valid, created_at) "
+        "values (2, 2, 'draft', 1, datetime('now'))"
+    )
+    conn.commit()
+    assert client.get("/api/iterations/1/validation").status_code == 404
+    assert client.get("/api/iterations/999/validation").status_code == 404
@@ -0,0 +1,39 @@
+"""Tests for keyset cursors and cached approximate totals."""
+
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from app.services.keyset import ApproxCountCache, decode_cursor, encode_cursor, parse_cursor
+
+
+def test_cursor_round_trip_and_validation() -> None:
+    token = encode_cursor("2026-02-16 09:00:00", 42, "desc")
+    parsed = decode_cursor(token, "desc")
+    assert (parsed.created_at, parsed.id) == ("2026-02-16 09:00:00", 42)
+    with pytest.raises(ValueError):
+        decode_cursor(token, "asc")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", "desc")
+    with pytest.raises(ValueError):
+        parse_cursor(token, "event_type", "desc")
+    assert parse_cursor(None, "event_type", "desc") is None
+
+
+def test_approx_count_tops_up_with_new_rows_and_refreshes() -> None:
+    db = sqlite3.connect(":memory:")
+    db.execute("create table t (id integer primary key autoincrement, k integer)")
+    db.executemany("insert into t (k) values (?)", [(1,), (1,), (2,)])
+    cache = ApproxCountCache(refresh_seconds=3600)
+    base = "FROM t WHERE k = ?"
+    assert cache.count(db, base, [1], "id") == 2
+    db.executemany("insert into t (k) values (?)", [(1,), (2,)])
+    assert cache.count(db, base, [1], "id") == 3
+    assert cache.count(db, base, [2], "id") == 2
+    # Deletes are only seen by the next full count
+    db.execute("delete from t where id = 1")
+    assert cache.count(db, base, [1], "id") == 3
+    cache.refresh_seconds = 0
+    assert cache.count(db, base, [1], "id") == 2
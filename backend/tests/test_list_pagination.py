@@ -0,0 +1,126 @@
+"""API tests for keyset pagination of image and iteration lists."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture()
+def iteration_rows(conn: sqlite3.Connection) -> list[int]:
+    """20 iterations of image 1; created_at repeats so ties are broken by id."""
+    conn.executemany(
+        "insert into plan_iterations (image_id, created_by, status, is_demo, params_snapshot, "
+        "algorithm_mode, plan_valid, created_at) values (1, 1, ?, 0, ?, ?, 1, ?)",
+        [
+            (
+                "accepted" if i % 4 == 0 else "draft",
+                json.dumps({"scale_mm": 1.0, "spot_diameter_um": 300, "angle_step_deg": 5, "coverage_pct": 10,
+                            "coverage_per_mask": None, "algorithm_mode": "simple" if i % 2 else "advanced"}),
+                "simple" if i % 2 else "advanced",
+                f"2026-02-01 10:00:{i // 3:02d}",
+            )
+            for i in range(20)
+        ],
+    )
+    conn.commit()
+    return [r[0] for r in conn.execute("select id from plan_iterations order by created_at desc, id desc")]
+
+
+def _walk(client: TestClient, url: str, params: dict) -> tuple[list[dict], set]:
+    items: list[dict] = []
+    totals = set()
+    cursor = None
+    while True:
+        body = client.get(url, params=params | ({"cursor": cursor} if cursor else {})).json()
+        totals.add(body["total"])
+        items.extend(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items, totals
+
+
+@pytest.mark.parametrize("view", ["full", "summary"])
+def test_iteration_cursor_pages_cover_every_row_once(
+    client: TestClient, iteration_rows: list[int], view: str
+) -> None:
+    items, totals = _walk(client, "/api/images/1/iterations", {"page_size": 6, "view": view})
+    assert [item["id"] for item in items] == iteration_rows
+    assert totals == {20}
+    if view == "summary":
+        assert all("params_snapshot" not in item for item in items)
+        assert {item["algorithm_mode"] for item in items} == {"simple", "advanced"}
+    else:
+        assert all(item["params_snapshot"]["angle_step_deg"] == 5 for item in items)
+    page2 = client.get("/api/images/1/iterations", params={"page_size": 6, "page": 2, "view": view}).json()
+    assert [item["id"] for item in page2["items"]] == iteration_rows[6:12]
+
+
+def test_iteration_cursor_filters_and_errors(client: TestClient, iteration_rows: list[int]) -> None:
+    items, totals = _walk(
+        client, "/api/images/1/iterations", {"page_size": 2, "status": "accepted", "view": "summary"}
+    )
+    assert totals == {5}
+    assert len(items) == 5 and {item["status"] for item in items} == {"accepted"}
+    url = "/api/images/1/iterations"
+    assert client.get(url, params={"with_total": "false"}).json()["total"] is None
+    assert client.get(url, params={"cursor": "garbage"}).status_code == 400
+    assert client.get(url, params={"sort": "id", "cursor": "garbage"}).status_code == 400
+    assert client.get(url, params={"view": "compact"}).status_code == 422
+
+
+def test_image_cursor_pages_cover_every_row_once(client: TestClient, conn: sqlite3.Connection) -> None:
+    conn.executemany(
+        "insert into images (storage_path, width_mm, created_by, created_at) values (?, 30, 1, ?)",
+        [(f"img{i}.png", f"2026-02-01 10:00:{i // 2:02d}") for i in range(9)],
+    )
+    conn.commit()
+    expected = [r[0] for r in conn.execute(
+        "select id from images where created_by = 1 order by created_at asc, id asc"
+    )]
+    items, totals = _walk(client, "/api/images", {"page_size": 4, "order": "asc"})
+    assert [item["id"] for item in items] == expected
+    assert totals == {10}
+
+
+def test_totals_follow_deletes_and_status_changes(client: TestClient, conn: sqlite3.Connection) -> None:
+    conn.executemany(
+        "insert into images (storage_path, width_mm, created_by, created_at) values (?, 30, 1, datetime('now'))",
+        [("b.png",), ("c.png",)],
+    )
+    conn.execute(
+        "insert into plan_iterations (image_id, created_by, status, is_demo, plan_valid, created_at) "
+        "values (1, 1, 'draft', 0, 1, datetime('now'))"
+    )
+    conn.commit()
+    assert client.get("/api/images").json()["total"] == 3
+    assert client.get("/api/images/1/iterations", params={"status": "draft"}).json()["total"] == 1
+    assert client.delete("/api/images/3").status_code == 204
+    body = client.get("/api/images").json()
+    assert body["total"] == len(body["items"]) == 2
+    assert client.patch("/api/iterations/1", json={"status": "accepted"}).status_code == 200
+    body = client.get("/api/images/1/iterations", params={"status": "draft"}).json()
+    assert body["total"] == len(body["items"]) == 0
+
+
+@pytest.mark.parametrize(
+    ("sql", "index"),
+    [
+        (
+            "select id from plan_iterations where image_id = ? and (created_at, id) < (?, ?) "
+            "order by created_at desc, id desc limit 10",
+            "idx_plan_iterations_image_created",
+        ),
+        (
+            "select id from images where created_by = ? and (created_at, id) < (?, ?) "
+            "order by created_at desc, id desc limit 10",
+            "idx_images_created_by_created",
+        ),
+    ],
+)
+def test_list_pages_use_composite_indexes(conn: sqlite3.Connection, sql: str, index: str) -> None:
+    plan = " ".join(row[3] for row in conn.execute(f"explain query plan {sql}", (1, "2026", 5)))
+    assert index in plan and "TEMP B-TREE" not in plan
@@ -0,0 +1,77 @@
+"""Tests for mask geometry: scalar ray casting vs batched NumPy containment."""
+
+from __future__ import annotations
+
+import math
+import random
+
+import numpy as np
+
+from app.services.mask_geometry import (
+    contains_points,
+    first_containing_polygon,
+    point_in_polygon,
+    prepare_polygon,
+)
+
+
+def _star(cx: float, cy: float, r: float, n: int = 300) -> list[tuple[float, float]]:
+    """Freehand-like wavy polygon with many vertices."""
+    verts = []
+    for k in range(n):
+        a = 2 * math.pi * k / n
+        rr = r * (1 + 0.3 * math.sin(7 * a))
+        verts.append((cx + rr * math.cos(a), cy + rr * math.sin(a)))
+    return verts
+
+
+def test_batched_matches_scalar_ray_casting() -> None:
+    rng = random.Random(11)
+    verts = _star(1.0, -0.5, 4.0)
+    xs = [rng.uniform(-6, 8) for _ in range(3000)]
+    ys = [rng.uniform(-7, 6) for _ in range(3000)]
+    batched = contains_points(prepare_polygon(verts), xs, ys)
+    scalar = [point_in_polygon(x, y, verts) for x, y in zip(xs, ys)]
+    assert batched.tolist() == scalar
+
+
+def test_boundary_points_match_scalar() -> None:
+    """Vertices, edge midpoints and horizontal edges follow the same crossing rule."""
+    square = [(0.0, 0.0), (2.0, 0.0), (2.0, 2.0), (0.0, 2.0)]
+    pts = [(0.0, 0.0), (1.0, 0.0), (2.0, 1.0), (1.0, 2.0), (0.0, 1.0), (1.0, 1.0), (2.0, 2.0)]
+    batched = contains_points(square, [p[0] for p in pts], [p[1] for p in pts])
+    assert batched.tolist() == [point_in_polygon(x, y, square) for x, y in pts]
+
+
+def test_degenerate_polygon_contains_nothing() -> None:
+    assert not contains_points([(0.0, 0.0), (1.0, 1.0)], [0.5], [0.5]).any()
+    assert contains_points([(0.0, 0.0), (1.0, 0.0), (0.0, 1.0)], [], []).shape == (0,)
+
+
+def test_first_containing_polygon_respects_order() -> None:
+    a = [(-1.0, -1.0), (1.0, -1.0), (1.0, 1.0), (-1.0, 1.0)]
+    b = [(0.0, -1.0), (3.0, -1.0), (3.0, 1.0), (0.0, 1.0)]
+    owner = first_containing_polygon([a, b], np.array([0.5, 2.0, 5.0]), np.array([0.0, 0.0, 0.0]))
+    assert owner.tolist() == [0, 1, -1]
+
+
+def test_prepared_polygon_caches_area_centroid_bbox() -> None:
+    """L-shaped polygon: area 3, area centroid differs from the vertex mean."""
+    verts = [(0.0, 0.0), (2.0, 0.0), (2.0, 1.0), (1.0, 1.0), (1.0, 2.0), (0.0, 2.0)]
+    poly = prepare_polygon(verts)
+    assert poly.area == 3.0
+    assert poly.bbox == (0.0, 0.0, 2.0, 2.0)
+    cx, cy = poly.centroid
+    assert abs(cx - 5.0 / 6.0) < 1e-12 and abs(cy - 5.0 / 6.0) < 1e-12
+
+
+def test_y_buckets_cover_every_crossing_edge() -> None:
+    """Many-vertex polygon uses y-buckets; points on bucket boundaries still match scalar."""
+    verts = _star(0.0, 0.0, 3.0, n=400)
+    poly = prepare_polygon(verts)
+    assert len(poly.bucket_edges) > 1
+    h = 1.0 / poly.bucket_inv_h
+    ys = [poly.bucket_y0 + k * h for k in range(len(poly.bucket_edges) + 1)]
+    xs = [0.1 * k - 2.0 for k in range(len(ys))]
+    batched = contains_points(poly, xs, ys)
+    assert batched.tolist() == [point_in_polygon(x, y, verts) for x, y in zip(xs, ys)]
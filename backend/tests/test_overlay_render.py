@@ -0,0 +1,59 @@
+"""Tests for the export overlay renderer (label image + palette vs per-shape RGB draws)."""
+
+from __future__ import annotations
+
+import io
+import math
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app.services.overlay_render import render_overlay
+
+
+def _reference_render(image_path: Path, width_mm: float, masks, spots) -> np.ndarray:
+    """Previous renderer: one ImageDraw call per mask and per spot on the RGB image."""
+    img = Image.open(image_path).convert("RGB")
+    scale = img.size[0] / width_mm
+    draw = ImageDraw.Draw(img)
+    for verts_mm in masks:
+        verts_px = [(int(x * scale), int(y * scale)) for x, y in verts_mm]
+        if len(verts_px) >= 3:
+            draw.polygon(verts_px, outline=(100, 200, 100), fill=(200, 255, 200))
+    r = max(2, int(3 * scale))
+    for x_mm, y_mm in spots:
+        x, y = int(x_mm * scale), int(y_mm * scale)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=(255, 100, 100), outline=(180, 0, 0))
+    return np.asarray(img)
+
+
+def _scene(tmp_path: Path, size: tuple[int, int], suffix: str = ".png"):
+    rng = np.random.default_rng(3)
+    path = tmp_path / f"photo{suffix}"
+    Image.fromarray(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)).save(path)
+    width_mm = 40.0
+    height_mm = width_mm * size[1] / size[0]
+    ring = [
+        (20 + 12 * math.cos(2 * math.pi * k / 200), height_mm / 2 + 8 * math.sin(2 * math.pi * k / 200))
+        for k in range(200)
+    ]
+    masks = [ring, [(1.0, 1.0), (15.0, 2.0), (3.0, 12.0)], [(0.0, 0.0), (1.0, 1.0)]]
+    spots = [(float(x), float(y)) for x, y in rng.uniform(-2, width_mm + 2, (300, 2))]
+    return path, width_mm, masks, spots
+
+
+def test_matches_per_shape_drawing_pixel_for_pixel(tmp_path: Path) -> None:
+    """Overlapping masks and spots (also partly off-image) resolve in the same draw order."""
+    path, width_mm, masks, spots = _scene(tmp_path, (400, 300))
+    out = render_overlay(path, width_mm, masks, spots, "png")
+    rendered = np.asarray(Image.open(io.BytesIO(out)))
+    assert np.array_equal(rendered, _reference_render(path, width_mm, masks, spots))
+
+
+def test_max_px_limits_longest_side(tmp_path: Path) -> None:
+    path, width_mm, masks, spots = _scene(tmp_path, (800, 500), ".jpg")
+    out = render_overlay(path, width_mm, masks, spots, "jpg", max_px=200)
+    assert Image.open(io.BytesIO(out)).size == (200, 125)
+    full = render_overlay(path, width_mm, masks, spots, "jpg", max_px=5000)
+    assert Image.open(io.BytesIO(full)).size == (800, 500)
@@ -0,0 +1,132 @@
+"""Tests for the plan result cache (content key, LRU, SQLite layer, single-flight, counters)."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from app.services.plan_cache import PlanCache, plan_cache_key
+from app.services.plan_grid import MaskPolygon, generate_plan_by_mode
+
+MIGRATION = Path(__file__).resolve().parent.parent / "migrations" / "20260210090000_create_plan_cache.sql"
+SQUARE = MaskPolygon(mask_id=1, vertices=[(-3.0, -3.0), (3.0, -3.0), (3.0, 3.0), (-3.0, 3.0)])
+
+
+def _plan():
+    return generate_plan_by_mode([SQUARE], 5.0, None, 30.0, "advanced")
+
+
+def _db() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.executescript(MIGRATION.read_text(encoding="utf-8"))
+    return conn
+
+
+def test_key_depends_on_every_input() -> None:
+    base = plan_cache_key([SQUARE], 5.0, None, 30.0, "advanced")
+    assert base == plan_cache_key([SQUARE], 5.0, None, 30.0, "advanced")
+    moved = MaskPolygon(mask_id=1, vertices=[(-3.0, -3.0), (3.0, -3.0), (3.0, 3.0), (-3.0, 3.00001)])
+    variants = {
+        plan_cache_key([moved], 5.0, None, 30.0, "advanced"),
+        plan_cache_key([SQUARE], 6.0, None, 30.0, "advanced"),
+        plan_cache_key([SQUARE], 5.0, {"1": 8.0}, 30.0, "advanced"),
+        plan_cache_key([SQUARE], 5.0, None, 30.0, "simple", grid_spacing_mm=0.8),
+    }
+    assert base not in variants and len(variants) == 4
+
+
+def test_memory_hit_returns_same_plan_without_recompute() -> None:
+    cache = PlanCache()
+    calls: list[int] = []
+
+    def compute():
+        calls.append(1)
+        return _plan()
+
+    first = cache.get_or_compute("k", compute)
+    second = cache.get_or_compute("k", compute)
+    assert len(calls) == 1
+    assert [(s.x_mm, s.y_mm, s.mask_id) for s in second.spots] == [(s.x_mm, s.y_mm, s.mask_id) for s in first.spots]
+    assert second is not first
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_sqlite_layer_survives_new_process_cache() -> None:
+    """A fresh PlanCache (e.g. after restart) loads the plan from the plan_cache table."""
+    conn = _db()
+    computed = PlanCache().get_or_compute("k", _plan, conn)
+    restarted = PlanCache()
+    loaded = restarted.get_or_compute("k", lambda: (_ for _ in ()).throw(AssertionError("recomputed")), conn)
+    assert restarted.stats()["db_hits"] == 1
+    assert loaded.spots_count == computed.spots_count
+    assert loaded.arrays.x_mm.tolist() == computed.arrays.x_mm.tolist()
+    assert loaded.arrays.mask_id.tolist() == computed.arrays.mask_id.tolist()
+    assert loaded.plan_valid == computed.plan_valid
+
+
+def test_missing_table_falls_back_to_memory() -> None:
+    conn = sqlite3.connect(":memory:")
+    cache = PlanCache()
+    assert cache.get_or_compute("k", _plan, conn).spots_count > 0
+    assert cache.get_or_compute("k", _plan, conn).spots_count > 0
+    assert cache.stats()["misses"] == 1
+
+
+def test_sqlite_layer_leaves_caller_transaction_alone() -> None:
+    """Pending caller work is neither committed nor rolled back by the cache (own savepoint)."""
+    conn = _db()
+    conn.execute("create table t (x integer)")
+    conn.commit()
+    conn.execute("insert into t values (1)")
+    PlanCache().get_or_compute("k", _plan, conn)
+    assert conn.in_transaction
+    conn.rollback()
+    assert conn.execute("select count(*) from t").fetchone()[0] == 0
+
+    bare = sqlite3.connect(":memory:")
+    bare.execute("create table t (x integer)")
+    bare.execute("insert into t values (1)")
+    PlanCache().get_or_compute("k", _plan, bare)
+    assert bare.in_transaction
+    bare.commit()
+    assert bare.execute("select count(*) from t").fetchone()[0] == 1
+
+    # Outside a caller transaction the stored row is committed on release
+    fresh = _db()
+    PlanCache().get_or_compute("k", _plan, fresh)
+    assert not fresh.in_transaction
+    assert fresh.execute("select count(*) from plan_cache").fetchone()[0] == 1
+
+
+def test_concurrent_identical_requests_compute_once() -> None:
+    cache = PlanCache()
+    calls: list[int] = []
+
+    def slow_compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return _plan()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", slow_compute))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert len({r.spots_count for r in results}) == 1
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["coalesced"] + stats["hits"] == 3
+
+
+def test_lru_evicts_least_recently_used() -> None:
+    cache = PlanCache(max_entries=2)
+    plan = _plan()
+    cache.get_or_compute("a", lambda: plan)
+    cache.get_or_compute("b", lambda: plan)
+    cache.get_or_compute("a", lambda: plan)
+    cache.get_or_compute("c", lambda: plan)
+    cache.get_or_compute("b", lambda: plan)
+    assert cache.stats()["misses"] == 4
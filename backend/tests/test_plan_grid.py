@@ -18,6 +18,7 @@ from app.services.plan_grid import (
     SIMPLE_GRID_SPACING_MM,
     generate_plan,
     generate_plan_by_mode,
+    generate_plan_full_aperture,
     generate_plan_simple,
 )
 
@@ -362,3 +363,55 @@ def test_simple_emission_order_boustrophedon() -> None:
             assert emitted_xs == xs, f"Row {row_idx} (y={y_val}): expected x asc {xs}, got {emitted_xs}"
         else:
             assert emitted_xs == list(reversed(xs)), f"Row {row_idx} (y={y_val}): expected x desc {list(reversed(xs))}, got {emitted_xs}"
+
+
+def test_simple_first_mask_wins_and_matches_scalar_lattice() -> None:
+    """Overlapping masks: each lattice point goes to the first containing mask (scalar reference)."""
+    from app.services.mask_geometry import point_in_polygon
+
+    masks = [_square_mask(1, -1.0, 0.0, 5.0), _square_mask(2, 1.0, 0.5, 5.0), _square_mask(3, 30.0, 30.0, 2.0)]
+    step = 0.45
+    result = generate_plan_simple(masks, image_width_mm=30.0, grid_spacing_mm=step)
+    cx = sum(x for m in masks for x, _ in m.vertices) / 12
+    cy = sum(y for m in masks for _, y in m.vertices) / 12
+    n = int(math.ceil(APERTURE_RADIUS_MM / step))
+    expected: dict[tuple[float, float], int] = {}
+    for i in range(-n, n + 1):
+        for j in range(-n, n + 1):
+            x, y = cx + i * step, cy + j * step
+            if (x - cx) ** 2 + (y - cy) ** 2 > APERTURE_RADIUS_MM**2 + 1e-9:
+                continue
+            owner = next((m.mask_id for m in masks if point_in_polygon(x, y, m.vertices)), None)
+            if owner is not None:
+                expected[(x, y)] = owner
+    assert {(s.x_mm, s.y_mm): s.mask_id for s in result.spots} == expected
+    assert result.spots_count == len(expected)
+    for s in result.spots:
+        assert abs(s.t_mm - math.hypot(s.x_mm - cx, s.y_mm - cy)) < 1e-9
+
+
+@pytest.mark.parametrize("kwargs", [{"target_coverage_pct": 10.0}, {"target_coverage_pct": None, "grid_spacing_mm": 0.8}])
+def test_full_aperture_matches_circle_mask_plan(kwargs: dict) -> None:
+    """Analytic full-circle engine gives the same spots as the unison plan on a circle polygon."""
+    n = 360
+    circle = [
+        (APERTURE_RADIUS_MM * math.cos(2 * math.pi * i / n), APERTURE_RADIUS_MM * math.sin(2 * math.pi * i / n))
+        for i in range(n)
+    ]
+    reference = generate_plan(
+        [MaskPolygon(mask_id=0, vertices=circle, mask_label=None)],
+        kwargs["target_coverage_pct"] or 0.0,
+        None,
+        25.0,
+        use_unison_grid=True,
+        grid_spacing_mm=kwargs.get("grid_spacing_mm"),
+    )
+    result = generate_plan_full_aperture(**kwargs)
+    assert result.spots_count == reference.spots_count > 0
+    for a, b in zip(result.spots, reference.spots):
+        assert abs(a.x_mm - b.x_mm) < 1e-9 and abs(a.y_mm - b.y_mm) < 1e-9
+        assert a.theta_deg == b.theta_deg
+    assert result.overlap_count == 0
+    assert result.spots_outside_mask_count == 0
+    assert result.plan_valid == 1
+    assert all(math.hypot(s.x_mm, s.y_mm) <= APERTURE_RADIUS_MM + 1e-9 for s in result.spots)
@@ -0,0 +1,181 @@
+"""Tests for background planning jobs (queue states, bounds, sync/async choice, API)."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.iterations import _plan_job_finisher, _prepare_plan
+from app.db.connection import get_db_factory
+from app.db.pool import close_pools, get_pools
+from app.schemas.iterations import IterationCreateSchema
+from app.services.plan_grid import MaskPolygon, generate_plan_by_mode
+from app.services.plan_jobs import (
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    PlanJobQueue,
+    PlanQueueFull,
+    estimate_plan_spots,
+    shutdown_plan_jobs,
+    should_run_async,
+)
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+SQUARE = MaskPolygon(mask_id=1, vertices=[(-3.0, -3.0), (3.0, -3.0), (3.0, 3.0), (-3.0, 3.0)])
+PLAN_KWARGS = {
+    "masks": [SQUARE],
+    "target_coverage_pct": 5.0,
+    "coverage_per_mask": None,
+    "image_width_mm": 30.0,
+    "algorithm_mode": "advanced",
+    "grid_spacing_mm": None,
+}
+
+
+def _wait(queue: PlanJobQueue, job_id: str, states: tuple[str, ...]):
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job.status in states:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} never reached {states}")
+
+
+def test_estimate_and_async_choice(monkeypatch) -> None:
+    # 36 mm^2 at 5% / (pi * 0.15^2) ~ 25 spots; simple 0.5 mm grid -> 144 points
+    assert estimate_plan_spots([SQUARE], 5.0, "advanced") == 25
+    assert estimate_plan_spots([SQUARE], 5.0, "simple", 0.5) == 144
+    monkeypatch.setenv("PLAN_ASYNC_MIN_SPOTS", "100")
+    assert not should_run_async("auto", 99)
+    assert should_run_async("auto", 100)
+    assert should_run_async("async", 0)
+    assert not should_run_async("sync", 10**6)
+
+
+def test_job_runs_plan_in_worker_process_and_reports_result() -> None:
+    queue = PlanJobQueue(workers=1, max_pending=4)
+    captured = {}
+
+    def finish(compute):
+        captured["plan"] = compute()
+        return 42
+
+    try:
+        job = queue.submit(1, 7, PLAN_KWARGS, finish)
+        assert job.status == JOB_QUEUED and job.progress == 0.0
+        done = _wait(queue, job.job_id, (JOB_DONE, JOB_FAILED))
+        assert (done.status, done.iteration_id, done.progress) == (JOB_DONE, 42, 1.0)
+        assert done.started_at is not None and done.finished_at is not None
+        expected = generate_plan_by_mode(**PLAN_KWARGS)
+        assert captured["plan"].arrays.x_mm.tolist() == expected.arrays.x_mm.tolist()
+
+        def fail(compute):
+            raise ValueError("disk full")
+
+        failed = _wait(queue, queue.submit(1, 7, PLAN_KWARGS, fail).job_id, (JOB_DONE, JOB_FAILED))
+        assert (failed.status, failed.error) == (JOB_FAILED, "disk full")
+        assert queue.stats()[JOB_DONE] == 1 and queue.stats()[JOB_FAILED] == 1
+    finally:
+        queue.shutdown()
+
+
+def test_queue_is_bounded_and_fifo() -> None:
+    queue = PlanJobQueue(workers=1, max_pending=1)
+    release = threading.Event()
+
+    def blocked(compute):
+        release.wait(30)
+        return 1
+
+    try:
+        first = queue.submit(1, 1, PLAN_KWARGS, blocked)
+        _wait(queue, first.job_id, (JOB_RUNNING,))
+        second = queue.submit(1, 1, PLAN_KWARGS, lambda compute: 2)
+        with pytest.raises(PlanQueueFull):
+            queue.submit(1, 1, PLAN_KWARGS, lambda compute: 3)
+        assert queue.get(second.job_id).status == JOB_QUEUED
+        release.set()
+        assert _wait(queue, second.job_id, (JOB_DONE,)).iteration_id == 2
+    finally:
+        release.set()
+        queue.shutdown()
+
+
+def test_async_post_returns_job_then_iteration(client: TestClient, conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "update masks set vertices = ? where image_id = 1",
+        ('[{"x": 12, "y": 12}, {"x": 18, "y": 12}, {"x": 18, "y": 18}, {"x": 12, "y": 18}]',),
+    )
+    conn.commit()
+    body = {"target_coverage_pct": 5, "algorithm_mode": "advanced"}
+    try:
+        res = client.post("/api/images/1/iterations?execution=async", json=body)
+        assert res.status_code == 202
+        job = res.json()
+        assert res.headers["location"] == f"/api/plan-jobs/{job['job_id']}"
+        deadline = time.monotonic() + 60
+        while job["status"] not in ("done", "failed") and time.monotonic() < deadline:
+            time.sleep(0.02)
+            job = client.get(f"/api/plan-jobs/{job['job_id']}").json()
+        assert job["status"] == "done", job
+        iteration = client.get(f"/api/iterations/{job['iteration_id']}").json()
+        assert iteration["spots_count"] > 0
+
+        sync = client.post("/api/images/1/iterations", json=body)
+        assert sync.status_code == 201
+        assert sync.json()["spots_count"] == iteration["spots_count"]
+        assert sync.json()["parent_id"] == job["iteration_id"]
+        assert client.get("/api/plan-jobs/unknown").status_code == 404
+    finally:
+        shutdown_plan_jobs()
+
+
+def test_job_holds_no_pooled_writer_while_planning(tmp_path: Path, monkeypatch) -> None:
+    """Through the real pools: while the plan computes, the (single) writer stays free."""
+    db_path = tmp_path / "jobs.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_path}")
+    monkeypatch.setenv("DB_WRITER_POOL_SIZE", "1")
+    monkeypatch.setenv("DB_POOL_TIMEOUT_SECONDS", "0.2")
+    setup = sqlite3.connect(db_path)
+    for path in sorted(MIGRATIONS.glob("*.sql")):
+        setup.executescript(path.read_text(encoding="utf-8"))
+    setup.execute("insert into users (login, password_hash, created_at) values ('u', 'x', datetime('now'))")
+    setup.execute("insert into images (storage_path, width_mm, width_px, height_px, created_by, created_at) "
+                  "values ('a.png', 30, 300, 300, 1, datetime('now'))")
+    setup.execute("insert into masks (image_id, vertices, created_at) values (1, ?, datetime('now'))",
+                  ('[{"x": 12, "y": 12}, {"x": 18, "y": 12}, {"x": 18, "y": 18}, {"x": 12, "y": 18}]',))
+    setup.commit()
+    setup.close()
+    close_pools()
+    try:
+        db_factory = get_db_factory()
+        writer = get_pools(str(db_path)).writer
+        with db_factory() as db:
+            prepared = _prepare_plan(
+                db, 1, 1, IterationCreateSchema(target_coverage_pct=4.5, algorithm_mode="advanced"), db_factory
+            )
+        seen = {}
+
+        def compute():
+            seen["checked_out"] = writer.stats()["checked_out"]
+            with writer.connection() as other:
+                other.execute("update images set width_mm = 30 where id = 1")
+                other.commit()
+            return generate_plan_by_mode(**prepared.plan_kwargs)
+
+        iteration_id = _plan_job_finisher(prepared, db_factory)(compute)
+        assert seen["checked_out"] == 0
+        assert writer.stats()["timeouts"] == 0 and writer.stats()["checked_out"] == 0
+        with db_factory() as db:
+            row = db.execute("select spots_count from plan_iterations where id = ?", (iteration_id,)).fetchone()
+        assert row["spots_count"] > 0
+    finally:
+        close_pools()
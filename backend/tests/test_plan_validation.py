@@ -0,0 +1,59 @@
+"""Tests for the plan validation engine (outside-mask count, overlap pairs, plan_valid)."""
+
+from __future__ import annotations
+
+import math
+import random
+
+from app.services.plan_validation import (
+    count_overlapping_pairs,
+    count_spots_outside_masks,
+    validate_plan_spots,
+)
+
+SQUARE = [(-2.0, -2.0), (2.0, -2.0), (2.0, 2.0), (-2.0, 2.0)]
+
+
+def _brute_force_overlaps(points: list[tuple[float, float]], min_dist: float) -> int:
+    overlap = 0
+    for i, (ax, ay) in enumerate(points):
+        for bx, by in points[i + 1 :]:
+            if math.hypot(ax - bx, ay - by) < min_dist - 1e-6:
+                overlap += 1
+    return overlap
+
+
+def test_overlap_count_matches_nested_loop() -> None:
+    rng = random.Random(3)
+    points = [(rng.uniform(-4, 4), rng.uniform(-4, 4)) for _ in range(400)]
+    assert count_overlapping_pairs(points, 0.315) == _brute_force_overlaps(points, 0.315)
+
+
+def test_overlap_counts_pairs_not_points() -> None:
+    """Three mutually close points are three overlapping pairs."""
+    points = [(0.0, 0.0), (0.1, 0.0), (0.0, 0.1), (5.0, 5.0)]
+    assert count_overlapping_pairs(points, 0.315) == 3
+
+
+def test_outside_count_uses_any_mask() -> None:
+    other = [(3.0, 3.0), (5.0, 3.0), (5.0, 5.0), (3.0, 5.0)]
+    points = [(0.0, 0.0), (4.0, 4.0), (10.0, 10.0)]
+    assert count_spots_outside_masks(points, [SQUARE]) == 2
+    assert count_spots_outside_masks(points, [SQUARE, other]) == 1
+    assert count_spots_outside_masks(points, []) == 3
+
+
+def test_validate_plan_spots_valid_grid() -> None:
+    points = [(x * 0.5, y * 0.5) for x in range(-3, 4) for y in range(-3, 4)]
+    result = validate_plan_spots(points, [SQUARE], 0.315)
+    assert result.spots_count == len(points)
+    assert result.spots_outside_mask_count == 0
+    assert result.overlap_count == 0
+    assert result.plan_valid == 1
+
+
+def test_validate_plan_spots_invalid_on_overlap_or_empty() -> None:
+    assert validate_plan_spots([(0.0, 0.0), (0.1, 0.0)], [SQUARE], 0.315).plan_valid == 0
+    empty = validate_plan_spots([], [SQUARE], 0.315)
+    assert empty.spots_count == 0
+    assert empty.plan_valid == 0
@@ -0,0 +1,95 @@
+"""Tests for the spacing solver: polar count model and model-guided secant search."""
+
+from __future__ import annotations
+
+import math
+
+import pytest
+
+from app.services.plan_grid import (
+    APERTURE_RADIUS_MM,
+    SPOT_DIAMETER_MM,
+    MaskPolygon,
+    _angles_0_to_180,
+    _build_candidates_polar_uniform_constrained,
+    _count_tolerance,
+    generate_plan,
+    generate_plan_full_aperture,
+    prepare_masks,
+)
+from app.services.spacing_model import (
+    MAX_SPACING_EVALUATIONS,
+    polar_candidate_count,
+    search_spacing,
+)
+
+
+def test_polar_count_model_matches_candidate_builder() -> None:
+    """Model is exact for the full-aperture candidate set (no mask)."""
+    for step in (5, 10):
+        angles = _angles_0_to_180(step)
+        for spacing in (0.315, 0.5, 0.8, 1.7):
+            cand = _build_candidates_polar_uniform_constrained(
+                0.0,
+                0.0,
+                angles_ordered=angles,
+                spacing_mm=spacing,
+                r_max=APERTURE_RADIUS_MM,
+                angle_step_deg=step,
+                mask_id=0,
+            )
+            assert polar_candidate_count(spacing, APERTURE_RADIUS_MM, len(angles), step) == len(cand)
+
+
+def test_search_uses_few_evaluations_with_biased_model() -> None:
+    """Model off by 30%: calibration + secant still lands on target in a few evaluations."""
+    calls: list[float] = []
+
+    def evaluate(spacing: float) -> list[int]:
+        calls.append(spacing)
+        return list(range(int(1000.0 / spacing**2)))
+
+    result = search_spacing(evaluate, lambda s: 700.0 / s**2, 250, 0.3, 5.0, tolerance=5)
+    assert abs(len(result.spots) - 250) <= 5
+    assert result.evaluations == len(calls) <= 4
+
+
+def test_search_returns_closest_when_target_unreachable() -> None:
+    """Target above the densest spacing: stops at the lower bound with the best count."""
+    result = search_spacing(lambda s: [0] * int(10 / s), lambda s: 10 / s, 1000, 0.5, 5.0)
+    assert result.spacing_mm == 0.5
+    assert len(result.spots) == 20
+    assert result.evaluations <= 2
+
+
+def test_search_bisects_into_a_narrow_count_step() -> None:
+    """Count jumps 121 -> 85 except in a 0.1 um window: the bracket is bisected down to it."""
+
+    def evaluate(spacing: float) -> list[int]:
+        if spacing < 0.8325:
+            return [0] * 121
+        return [0] * (113 if spacing < 0.8326 else 85)
+
+    result = search_spacing(evaluate, lambda s: 65.0 / s**2, 111, 0.315, 5.0, tolerance=2)
+    assert len(result.spots) == 113
+    assert result.evaluations <= MAX_SPACING_EVALUATIONS
+
+
+@pytest.mark.parametrize("coverage_pct", [10.0, 20.0])
+def test_per_mask_plan_hits_count_tolerance(coverage_pct: float) -> None:
+    """5 mm circle: whole rings enter at once, yet the plan stays within the 2% count tolerance."""
+    circle = MaskPolygon(
+        mask_id=1,
+        vertices=[(5.0 * math.cos(2 * math.pi * k / 64), 5.0 * math.sin(2 * math.pi * k / 64)) for k in range(64)],
+    )
+    spot_area = math.pi * (SPOT_DIAMETER_MM / 2) ** 2
+    target = round(coverage_pct / 100.0 * prepare_masks([circle])[0].area_mm2 / spot_area)
+    plan = generate_plan([circle], coverage_pct, None, 30.0)
+    assert abs(plan.spots_count - target) <= _count_tolerance(target)
+    assert 1 <= plan.spacing_evaluations <= MAX_SPACING_EVALUATIONS
+
+def test_full_aperture_plan_reports_evaluations() -> None:
+    by_coverage = generate_plan_full_aperture(10.0)
+    assert 1 <= by_coverage.spacing_evaluations <= 4
+    by_spacing = generate_plan_full_aperture(None, grid_spacing_mm=0.8)
+    assert by_spacing.spacing_evaluations == 1
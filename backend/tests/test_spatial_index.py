@@ -0,0 +1,51 @@
+"""Tests for the uniform-grid spatial index used by planner greedy selection."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from app.services.spatial_index import SpatialIndex
+
+
+def _brute_force(points: list[tuple[float, float]], x: float, y: float, dist: float) -> bool:
+    return any((x - px) ** 2 + (y - py) ** 2 < dist * dist for px, py in points)
+
+
+def test_empty_index_has_no_neighbors() -> None:
+    index = SpatialIndex(0.315)
+    assert len(index) == 0
+    assert not index.has_neighbor(0.0, 0.0)
+
+
+def test_neighbor_is_strictly_closer_than_cell_size() -> None:
+    """Point exactly at min_dist is not a neighbor (same '< min_dist' rule as the planner)."""
+    index = SpatialIndex(1.0, [(0.0, 0.0)])
+    assert index.has_neighbor(0.5, 0.5)
+    assert not index.has_neighbor(1.0, 0.0)
+    assert not index.has_neighbor(-0.8, 0.8)
+
+
+def test_matches_brute_force_across_cell_boundaries() -> None:
+    """3×3 lookup gives the same answer as a full scan, including negative coordinates."""
+    rng = random.Random(7)
+    points = [(rng.uniform(-5, 5), rng.uniform(-5, 5)) for _ in range(300)]
+    index = SpatialIndex(0.315, points)
+    assert len(index) == len(points)
+    for _ in range(2000):
+        x, y = rng.uniform(-6, 6), rng.uniform(-6, 6)
+        assert index.has_neighbor(x, y) == _brute_force(points, x, y, 0.315)
+
+
+def test_query_distance_larger_than_cell_widens_block() -> None:
+    """Distances larger than the cell size still find far neighbors."""
+    index = SpatialIndex(0.3, [(0.0, 0.0)])
+    assert not index.has_neighbor(1.0, 0.0)
+    assert index.has_neighbor(1.0, 0.0, 1.2)
+    assert not index.has_neighbor(1.0, 1.0, 1.4)
+
+
+def test_invalid_cell_size_raises() -> None:
+    with pytest.raises(ValueError, match="cell_size_mm"):
+        SpatialIndex(0.0)
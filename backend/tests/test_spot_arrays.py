@@ -0,0 +1,54 @@
+"""Tests for the columnar spot container (lexsort emission order, lazy records)."""
+
+from __future__ import annotations
+
+import random
+
+import numpy as np
+
+from app.services.plan_grid import MaskPolygon, PlanResult, generate_plan
+from app.services.spot_arrays import NO_MASK_ID, SpotArrays
+
+
+def _reference_emission_key(angle_step: int):
+    def key(s: tuple) -> tuple:
+        theta_deg, t_mm = s[2], s[3]
+        diameter_angle = theta_deg if theta_deg < 180.0 else theta_deg - 180.0
+        t_signed = t_mm if theta_deg < 180.0 else -t_mm
+        theta_k = int(round(diameter_angle)) // angle_step
+        return (theta_k, t_signed if theta_k % 2 == 0 else -t_signed)
+
+    return key
+
+
+def test_emission_order_matches_python_key_sort() -> None:
+    """Stable lexsort gives the same order as the tuple key, including folded θ >= 180° and ties."""
+    rng = random.Random(5)
+    rows = [
+        (float(i), 0.0, float(rng.choice(range(0, 360, 5))), float(rng.choice([-1.0, 0.0, 0.5, 1.0])), i)
+        for i in range(500)
+    ]
+    arrays = SpotArrays.from_tuples(rows)
+    expected = [r[4] for r in sorted(rows, key=_reference_emission_key(5))]
+    assert arrays.take(arrays.emission_order(5)).mask_id.tolist() == expected
+
+
+def test_columns_dtypes_and_missing_mask_id() -> None:
+    arrays = SpotArrays.from_tuples([(1.0, 2.0, 0.0, 0.5, None), (3.0, 4.0, 5.0, 1.0, 7)])
+    assert arrays.x_mm.dtype == np.float64
+    assert arrays.mask_id.dtype == np.int32
+    assert arrays.mask_id.tolist() == [NO_MASK_ID, 7]
+    records = arrays.to_records()
+    assert records[0].mask_id is None and records[1].mask_id == 7
+    assert len(SpotArrays.concat([arrays, SpotArrays.empty()])) == 2
+
+
+def test_plan_result_records_are_lazy_and_cached() -> None:
+    assert PlanResult().spots == []
+    square = MaskPolygon(mask_id=1, vertices=[(-3.0, -3.0), (3.0, -3.0), (3.0, 3.0), (-3.0, 3.0)])
+    result = generate_plan([square], 5.0, None, 30.0)
+    assert result._records is None
+    spots = result.spots
+    assert result.spots is spots
+    assert [s.x_mm for s in spots] == result.arrays.x_mm.tolist()
+    assert {s.mask_id for s in spots} == {1}
@@ -0,0 +1,128 @@
+"""Tests for bulk plan persistence (iteration + spots + audit in one transaction)."""
+
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from app.services.plan_grid import MaskPolygon, generate_plan
+from app.services.spot_store import (
+    SPOT_STORAGE_BLOCKS,
+    SPOT_STORAGE_ROWS,
+    IterationInsert,
+    block_spot_id,
+    get_spot_storage_format,
+    iter_spots,
+    load_spot_xy,
+    load_spots,
+    pack_spot_rows,
+    save_iteration,
+)
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+SQUARE = MaskPolygon(mask_id=1, vertices=[(-3.0, -3.0), (3.0, -3.0), (3.0, 3.0), (-3.0, 3.0)])
+
+
+@pytest.fixture()
+def db() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    for path in sorted(MIGRATIONS.glob("*.sql")):
+        conn.executescript(path.read_text(encoding="utf-8"))
+    conn.execute("insert into users (login, password_hash, created_at) values ('u', 'x', datetime('now'))")
+    conn.execute("insert into images (storage_path, width_mm, created_by, created_at) values ('a.png', 30, 1, datetime('now'))")
+    conn.execute("insert into masks (image_id, vertices, created_at) values (1, '[]', datetime('now'))")
+    conn.commit()
+    return conn
+
+
+def _iteration() -> IterationInsert:
+    return IterationInsert(
+        image_id=1,
+        parent_id=None,
+        created_by=1,
+        is_demo=0,
+        params_snapshot="{}",
+        target_coverage_pct=5.0,
+        algorithm_mode="advanced",
+    )
+
+
+def _without_row_identity(spots: list[dict]) -> list[dict]:
+    return [{k: v for k, v in s.items() if k not in ("id", "iteration_id", "created_at")} for s in spots]
+
+
+def test_save_iteration_writes_spots_in_top_left_with_one_timestamp(db: sqlite3.Connection) -> None:
+    plan = generate_plan([SQUARE], 5.0, None, 30.0)
+    row_id = save_iteration(db, _iteration(), plan, 30.0, 20.0, SPOT_STORAGE_ROWS)
+    rows = db.execute(
+        "select sequence_index, x_mm, y_mm, mask_id, created_at from spots where iteration_id = ? order by sequence_index",
+        (row_id,),
+    ).fetchall()
+    assert len(rows) == plan.spots_count
+    for (seq, x_tl, y_tl, mask_id, _), spot in zip(rows, plan.spots):
+        assert x_tl == spot.x_mm + 15.0 and y_tl == 10.0 - spot.y_mm
+        assert mask_id == 1
+    assert [r[0] for r in rows] == list(range(plan.spots_count))
+    iteration_ts = db.execute("select created_at from plan_iterations where id = ?", (row_id,)).fetchone()[0]
+    audit = db.execute("select event_type, created_at from audit_log where iteration_id = ? order by id", (row_id,)).fetchall()
+    assert [a[0] for a in audit] == ["iteration_created", "plan_generated"]
+    assert {r[4] for r in rows} | {a[1] for a in audit} == {iteration_ts}
+    assert not db.in_transaction
+
+
+def test_save_iteration_rolls_back_everything_on_failure(db: sqlite3.Connection) -> None:
+    """Failure after spots are written (audit insert) leaves no iteration and no spots."""
+    db.execute("drop table audit_log")
+    db.commit()
+    plan = generate_plan([SQUARE], 5.0, None, 30.0)
+    with pytest.raises(sqlite3.OperationalError):
+        save_iteration(db, _iteration(), plan, 30.0, 20.0)
+    assert db.execute("select count(*) from plan_iterations").fetchone()[0] == 0
+    assert db.execute("select count(*) from spots").fetchone()[0] == 0
+    assert db.execute("select count(*) from spot_blocks").fetchone()[0] == 0
+    assert not db.in_transaction
+
+
+def test_block_and_row_storage_read_back_identically(db: sqlite3.Connection) -> None:
+    """Same plan stored both ways: readers return the same spots except for the synthetic ids."""
+    plan = generate_plan([SQUARE], 5.0, None, 30.0)
+    rows_id = save_iteration(db, _iteration(), plan, 30.0, 20.0, SPOT_STORAGE_ROWS)
+    block_id = save_iteration(db, _iteration(), plan, 30.0, 20.0, SPOT_STORAGE_BLOCKS)
+    assert db.execute("select count(*) from spots where iteration_id = ?", (block_id,)).fetchone()[0] == 0
+    from_rows = load_spots(db, rows_id)
+    from_block = load_spots(db, block_id)
+    assert [s["id"] for s in from_block] == [block_spot_id(block_id, k) for k in range(plan.spots_count)]
+    assert _without_row_identity(from_block) == _without_row_identity(from_rows)
+    assert load_spot_xy(db, block_id) == load_spot_xy(db, rows_id)
+
+
+def test_pack_spot_rows_moves_rows_into_a_block(db: sqlite3.Connection) -> None:
+    plan = generate_plan([SQUARE], 5.0, None, 30.0)
+    row_id = save_iteration(db, _iteration(), plan, 30.0, 20.0, SPOT_STORAGE_ROWS)
+    before = load_spots(db, row_id)
+    assert pack_spot_rows(db, row_id)
+    db.commit()
+    assert db.execute("select count(*) from spots").fetchone()[0] == 0
+    after = load_spots(db, row_id)
+    assert [{**s, "id": 0} for s in after] == [{**s, "id": 0} for s in before]
+    assert not pack_spot_rows(db, row_id)
+
+
+def test_iter_spots_chunks_concatenate_to_full_list(db: sqlite3.Connection) -> None:
+    plan = generate_plan([SQUARE], 5.0, None, 30.0)
+    for storage_format in (SPOT_STORAGE_ROWS, SPOT_STORAGE_BLOCKS):
+        row_id = save_iteration(db, _iteration(), plan, 30.0, 20.0, storage_format)
+        chunks = list(iter_spots(db, row_id, chunk_size=7))
+        assert all(len(c) == 7 for c in chunks[:-1]) and 0 < len(chunks[-1]) <= 7
+        assert [s for c in chunks for s in c] == load_spots(db, row_id)
+
+
+def test_storage_format_defaults_to_rows(monkeypatch) -> None:
+    monkeypatch.delenv("SPOT_STORAGE_FORMAT", raising=False)
+    assert get_spot_storage_format() == SPOT_STORAGE_ROWS
+    monkeypatch.setenv("SPOT_STORAGE_FORMAT", " Blocks ")
+    assert get_spot_storage_format() == SPOT_STORAGE_BLOCKS
+    monkeypatch.setenv("SPOT_STORAGE_FORMAT", "columnar")
+    assert get_spot_storage_format() == SPOT_STORAGE_ROWS
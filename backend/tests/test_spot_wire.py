@@ -0,0 +1,44 @@
+"""Tests for the binary spots wire format."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.services.spot_arrays import NO_MASK_ID, SpotArrays
+from app.services.spot_wire import decode_spots_bin, encode_spots_bin
+
+
+def _spots() -> SpotArrays:
+    return SpotArrays.from_columns([0.1, 2.5, -3.0], [1.0, 0.2, 7.75], [0.0, 5.0, 185.0], [0.5, -1.25, 2.0], [4, None, 9])
+
+
+def test_round_trip_keeps_columns_and_sequence() -> None:
+    payload = encode_spots_bin(17, np.array([0, 1, 2]), _spots())
+    assert len(payload) == 16 + 40 * 3
+    iteration_id, seq, spots = decode_spots_bin(payload)
+    assert iteration_id == 17
+    assert seq.tolist() == [0, 1, 2]
+    assert spots.x_mm.tolist() == [0.1, 2.5, -3.0]
+    assert spots.theta_deg.tolist() == [0.0, 5.0, 185.0]
+    assert spots.mask_id.tolist() == [4, NO_MASK_ID, 9]
+
+
+def test_arrays_are_aligned_for_typed_array_views() -> None:
+    """Float64 blocks start at 8-byte offsets; x_mm follows the 16-byte header directly."""
+    payload = encode_spots_bin(1, np.array([0, 1, 2]), _spots())
+    x = np.frombuffer(payload, dtype="<f8", count=3, offset=16)
+    t = np.frombuffer(payload, dtype="<f8", count=3, offset=16 + 3 * 3 * 8)
+    mask_id = np.frombuffer(payload, dtype="<i4", count=3, offset=16 + 32 * 3 + 4 * 3)
+    assert x.tolist() == [0.1, 2.5, -3.0]
+    assert t.tolist() == [0.5, -1.25, 2.0]
+    assert mask_id.tolist() == [4, -1, 9]
+
+
+def test_empty_and_malformed_payloads() -> None:
+    iteration_id, seq, spots = decode_spots_bin(encode_spots_bin(3, np.zeros(0), SpotArrays.empty()))
+    assert (iteration_id, len(seq), len(spots)) == (3, 0, 0)
+    with pytest.raises(ValueError):
+        decode_spots_bin(b"LXSP")
+    with pytest.raises(ValueError):
+        decode_spots_bin(encode_spots_bin(1, np.array([0, 1, 2]), _spots())[:-4])
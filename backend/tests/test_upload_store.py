@@ -0,0 +1,47 @@
+"""Tests for streamed, content-addressed upload storage."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from app.services.upload_store import (
+    UploadTooLarge,
+    content_addressed_name,
+    place_staged,
+    release_file,
+    stage_upload,
+)
+
+
+def test_stage_upload_hashes_while_streaming(tmp_path: Path) -> None:
+    data = bytes(range(256)) * 9000  # > one chunk
+    staged = stage_upload(io.BytesIO(data), tmp_path, max_bytes=len(data))
+    assert staged.size_bytes == len(data)
+    assert staged.content_sha256 == hashlib.sha256(data).hexdigest()
+    assert staged.temp_path.read_bytes() == data
+
+
+def test_stage_upload_limit_removes_temp_file(tmp_path: Path) -> None:
+    with pytest.raises(UploadTooLarge):
+        stage_upload(io.BytesIO(b"x" * 11), tmp_path, max_bytes=10)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_place_staged_dedupes(tmp_path: Path) -> None:
+    dest = tmp_path / content_addressed_name("ab" * 32, ".JPEG")
+    assert dest.name.endswith(".jpg")
+    assert place_staged(stage_upload(io.BytesIO(b"same"), tmp_path, 100), dest)
+    assert not place_staged(stage_upload(io.BytesIO(b"same"), tmp_path, 100), dest)
+    assert [p.name for p in tmp_path.iterdir()] == [dest.name]
+
+
+def test_release_file_keeps_legacy_names(conn: sqlite3.Connection, tmp_path: Path) -> None:
+    legacy = tmp_path / "a.png"
+    legacy.write_bytes(b"x")
+    assert not release_file(conn, tmp_path, "uploads/a.png", "ab" * 32)
+    assert legacy.exists()
@@ -49,13 +49,19 @@ function AuditLogTab({ iterationIdFilter, imageId }: AuditLogTabProps) {
   const [fromDate, setFromDate] = React.useState("");
   const [toDate, setToDate] = React.useState("");
   const [onlyThisImage, setOnlyThisImage] = React.useState(false);
+  const [nextCursor, setNextCursor] = React.useState<string | null>(null);
+  // Keyset pagination: cursorsRef.current[p - 1] = cursor that loads page p (page 1 has none)
+  const cursorsRef = React.useRef<(string | null)[]>([null]);
 
   const fetchList = React.useCallback(async () => {
     setLoading(true);
     setError(null);
     try {
+      if (page === 1) cursorsRef.current = [null];
+      const cursor = cursorsRef.current[page - 1];
       const params = new URLSearchParams();
       params.set("page", String(page));
+      if (cursor) params.set("cursor", cursor);
       params.set("page_size", String(pageSize));
       params.set("sort", "created_at");
       params.set("order", "desc");
@@ -74,21 +80,26 @@ function AuditLogTab({ iterationIdFilter, imageId }: AuditLogTabProps) {
         if (res.status === 404) {
           setItems([]);
           setTotal(0);
+          setNextCursor(null);
           return;
         }
         setError("Failed to load audit log.");
         setItems([]);
         setTotal(0);
+        setNextCursor(null);
         return;
       }
       const data = (await res.json()) as AuditLogListResponseDto;
       setItems(data.items ?? []);
       setTotal(data.total ?? 0);
+      setNextCursor(data.next_cursor ?? null);
+      cursorsRef.current[page] = data.next_cursor ?? null;
     } catch (err) {
       if ((err as Error).message !== "Unauthorized") {
         setError("Connection error.");
         setItems([]);
         setTotal(0);
+        setNextCursor(null);
       }
     } finally {
       setLoading(false);
@@ -272,8 +283,8 @@ function AuditLogTab({ iterationIdFilter, imageId }: AuditLogTabProps) {
             <button
               type="button"
               className="rounded border border-input px-2 py-1 hover:bg-muted disabled:opacity-50"
-              disabled={page >= totalPages}
-              onClick={() => setPage((p) => Math.min(totalPages, p + 1))}
+              disabled={page >= totalPages && !nextCursor}
+              onClick={() => setPage((p) => (nextCursor ? p + 1 : Math.min(totalPages, p + 1)))}
             >
               <span data-lang="pl">Następna</span>
               <span data-lang="en">Next</span>
@@ -1,7 +1,7 @@
 import * as React from "react";
 import { apiFetch } from "@/lib/api";
 import { getAdvancedAlgorithmLabel } from "@/lib/constants";
-import type { ImageDto, IterationDto, IterationListResponseDto } from "@/types";
+import type { ImageDto, IterationSummaryDto, IterationSummaryListResponseDto } from "@/types";
 
 function formatDate(iso: string): string {
   try {
@@ -21,25 +21,38 @@ export interface HistoryTabProps {
 type AlgorithmFilter = "all" | "simple" | "advanced";
 
 function HistoryTab({ imageId, onShowIteration }: HistoryTabProps) {
-  const [items, setItems] = React.useState<IterationDto[]>([]);
+  const [items, setItems] = React.useState<IterationSummaryDto[]>([]);
   const [, setTotal] = React.useState(0);
+  const [nextCursor, setNextCursor] = React.useState<string | null>(null);
   const [loading, setLoading] = React.useState(true);
+  const [loadingMore, setLoadingMore] = React.useState(false);
   const [error, setError] = React.useState<string | null>(null);
   const [deletingId, setDeletingId] = React.useState<number | null>(null);
   const [algorithmFilter, setAlgorithmFilter] = React.useState<AlgorithmFilter>("all");
 
+  const listParams = React.useCallback(
+    (cursor?: string) => {
+      // Summary view: list rows without params_snapshot; keyset cursor for further pages
+      const params = new URLSearchParams({
+        page_size: "50",
+        sort: "created_at",
+        order: "desc",
+        view: "summary",
+      });
+      if (algorithmFilter !== "all") {
+        params.set("algorithm_mode", algorithmFilter);
+      }
+      if (cursor) params.set("cursor", cursor);
+      return params;
+    },
+    [algorithmFilter]
+  );
+
   const fetchList = React.useCallback(async () => {
     setLoading(true);
     setError(null);
-    const params = new URLSearchParams({
-      page: "1",
-      page_size: "50",
-      sort: "created_at",
-      order: "desc",
-    });
-    if (algorithmFilter !== "all") {
-      params.set("algorithm_mode", algorithmFilter);
-    }
+    setNextCursor(null);
+    const params = listParams();
     try {
       const res = await apiFetch(`/api/images/${imageId}/iterations?${params.toString()}`);
       if (!res.ok) {
@@ -53,9 +66,10 @@ function HistoryTab({ imageId, onShowIteration }: HistoryTabProps) {
         setTotal(0);
         return;
       }
-      const data = (await res.json()) as IterationListResponseDto;
+      const data = (await res.json()) as IterationSummaryListResponseDto;
       setItems(data.items ?? []);
       setTotal(data.total ?? 0);
+      setNextCursor(data.next_cursor ?? null);
     } catch (err) {
       if ((err as Error).message !== "Unauthorized") {
         setError("Connection error.");
@@ -65,12 +79,34 @@ function HistoryTab({ imageId, onShowIteration }: HistoryTabProps) {
     } finally {
       setLoading(false);
     }
-  }, [imageId, algorithmFilter]);
+  }, [imageId, listParams]);
 
   React.useEffect(() => {
     fetchList();
   }, [fetchList]);
 
+  const loadMore = React.useCallback(async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    setError(null);
+    try {
+      const res = await apiFetch(`/api/images/${imageId}/iterations?${listParams(nextCursor).toString()}`);
+      if (!res.ok) {
+        setError("Failed to load iteration history.");
+        return;
+      }
+      const data = (await res.json()) as IterationSummaryListResponseDto;
+      setItems((prev) => [...prev, ...(data.items ?? [])]);
+      setNextCursor(data.next_cursor ?? null);
+    } catch (err) {
+      if ((err as Error).message !== "Unauthorized") {
+        setError("Connection error.");
+      }
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [imageId, listParams, nextCursor]);
+
   const handleAlgorithmFilterChange = React.useCallback((e: React.ChangeEvent<HTMLSelectElement>) => {
     setAlgorithmFilter(e.target.value as AlgorithmFilter);
   }, []);
@@ -187,9 +223,9 @@ function HistoryTab({ imageId, onShowIteration }: HistoryTabProps) {
                   <td className="px-3 py-2">{formatDate(it.created_at)}</td>
                   <td className="px-3 py-2">{it.status}</td>
                   <td className="px-3 py-2">
-                    {it.params_snapshot?.algorithm_mode === "simple"
+                    {it.algorithm_mode === "simple"
                       ? "Simple"
-                      : it.params_snapshot?.algorithm_mode === "advanced"
+                      : it.algorithm_mode === "advanced"
                         ? getAdvancedAlgorithmLabel()
                         : "—"}
                   </td>
@@ -241,6 +277,26 @@ function HistoryTab({ imageId, onShowIteration }: HistoryTabProps) {
           </table>
         </div>
       )}
+      {!loading && nextCursor && (
+        <button
+          type="button"
+          className="text-sm text-primary underline-offset-4 hover:underline disabled:opacity-50"
+          disabled={loadingMore}
+          onClick={loadMore}
+        >
+          {loadingMore ? (
+            <>
+              <span data-lang="pl">Ładowanie…</span>
+              <span data-lang="en">Loading…</span>
+            </>
+          ) : (
+            <>
+              <span data-lang="pl">Pokaż więcej</span>
+              <span data-lang="en">Show more</span>
+            </>
+          )}
+        </button>
+      )}
     </div>
   );
 }
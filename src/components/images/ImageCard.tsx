@@ -44,7 +44,7 @@ function ImageCard({ image, imageUrl: imageUrlProp, demoMode, onDelete }: ImageC
     let objectUrl: string | null = null;
     (async () => {
       try {
-        const res = await apiFetch(`/api/images/${image.id}/file`);
+        const res = await apiFetch(`/api/images/${image.id}/file?size=thumb`);
         if (!res.ok) return;
         const blob = await res.blob();
         objectUrl = URL.createObjectURL(blob);
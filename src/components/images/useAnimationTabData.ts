@@ -60,7 +60,7 @@ export function useAnimationTabData(imageId: number, selectedFromParent: number
     setErrorImage(null);
     (async () => {
       try {
-        const blob = await fetchImageFile(imageId, { signal: ac.signal });
+        const blob = await fetchImageFile(imageId, { signal: ac.signal, size: "medium" });
         if (!blob) {
           setErrorImage(ERROR_IMAGE);
           return;
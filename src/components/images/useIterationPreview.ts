@@ -47,7 +47,7 @@ export function useIterationPreview(
     (async () => {
       try {
         const [blob, masksData, spotsData] = await Promise.all([
-          fetchImageFile(imageId),
+          fetchImageFile(imageId, { size: "medium" }),
           fetchMasks(imageId),
           fetchIterationSpots(iterationId),
         ]);
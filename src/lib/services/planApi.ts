@@ -4,22 +4,32 @@
  */
 import { apiFetch } from "@/lib/api";
 import type {
+  ImageFileSize,
   IterationCreateCommand,
   IterationDto,
   IterationListResponseDto,
+  IterationSpotsBinaryDto,
   MaskDto,
   MaskListResponseDto,
+  PlanJobDto,
   SpotDto,
 } from "@/types";
 
 const DEFAULT_ERROR_CREATE = "Nie udało się wygenerować planu.";
 const DEFAULT_ERROR_STATUS = "Nie udało się zmienić statusu.";
+const PLAN_JOB_POLL_MS = 500;
 
 /**
  * Creates a new plan iteration for the given image. On success returns the iteration.
- * On 4xx/5xx throws Error with API detail message or default.
+ * Large plans are answered with 202 + a planning job; the job is polled until done
+ * (onProgress receives its status) and the created iteration is returned.
+ * On 4xx/5xx or a failed job throws Error with API detail message or default.
  */
-export async function createIteration(imageId: number, body: IterationCreateCommand): Promise<IterationDto> {
+export async function createIteration(
+  imageId: number,
+  body: IterationCreateCommand,
+  onProgress?: (job: PlanJobDto) => void
+): Promise<IterationDto> {
   const payload = {
     target_coverage_pct: body.target_coverage_pct,
     coverage_per_mask: body.coverage_per_mask,
@@ -47,9 +57,32 @@ export async function createIteration(imageId: number, body: IterationCreateComm
     throw new Error(message);
   }
   if (!text) throw new Error(DEFAULT_ERROR_CREATE);
+  if (res.status === 202) {
+    const job = await waitForPlanJob(JSON.parse(text) as PlanJobDto, onProgress);
+    const iteration = job.iteration_id != null ? await fetchIteration(job.iteration_id) : null;
+    if (!iteration) throw new Error(DEFAULT_ERROR_CREATE);
+    return iteration;
+  }
   return JSON.parse(text) as IterationDto;
 }
 
+/**
+ * Polls GET /api/plan-jobs/{job_id} until the job is done; throws with the job error if it failed.
+ */
+export async function waitForPlanJob(job: PlanJobDto, onProgress?: (job: PlanJobDto) => void): Promise<PlanJobDto> {
+  let current = job;
+  onProgress?.(current);
+  while (current.status === "queued" || current.status === "running") {
+    await new Promise((resolve) => setTimeout(resolve, PLAN_JOB_POLL_MS));
+    const res = await apiFetch(`/api/plan-jobs/${current.job_id}`);
+    if (!res.ok) throw new Error(DEFAULT_ERROR_CREATE);
+    current = (await res.json()) as PlanJobDto;
+    onProgress?.(current);
+  }
+  if (current.status === "failed") throw new Error(current.error || DEFAULT_ERROR_CREATE);
+  return current;
+}
+
 /**
  * Fetches a single iteration by id. Returns null if not found or not ok.
  */
@@ -116,9 +149,14 @@ export async function fetchIterations(imageId: number, options?: PlanApiFetchOpt
 
 /**
  * Fetches image file as blob. Returns null if not ok.
+ * size selects a downscaled variant (overlays scale by natural width / width_mm, so any variant works).
  */
-export async function fetchImageFile(imageId: number, options?: PlanApiFetchOptions): Promise<Blob | null> {
-  const res = await apiFetch(`/api/images/${imageId}/file`, {
+export async function fetchImageFile(
+  imageId: number,
+  options?: PlanApiFetchOptions & { size?: ImageFileSize }
+): Promise<Blob | null> {
+  const query = options?.size && options.size !== "full" ? `?size=${options.size}` : "";
+  const res = await apiFetch(`/api/images/${imageId}/file${query}`, {
     signal: options?.signal,
   });
   if (!res.ok) return null;
@@ -159,6 +197,49 @@ export async function fetchIterationSpots(iterationId: number, options?: PlanApi
   }
 }
 
+const SPOTS_BIN_MAGIC = "LXSP";
+const SPOTS_BIN_VERSION = 1;
+
+/**
+ * Decodes the binary spots payload: 16-byte header (magic, uint16 version, uint16 header size,
+ * uint32 count, uint32 iteration id), then float64 x/y/theta/t and int32 sequence_index/mask_id
+ * columns, all little-endian. Typed arrays are zero-copy views (platform assumed little-endian).
+ * Returns null if the payload is malformed.
+ */
+export function decodeSpotsBinary(buffer: ArrayBuffer): IterationSpotsBinaryDto | null {
+  if (buffer.byteLength < 16) return null;
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+  if (magic !== SPOTS_BIN_MAGIC || view.getUint16(4, true) !== SPOTS_BIN_VERSION) return null;
+  const headerSize = view.getUint16(6, true);
+  const count = view.getUint32(8, true);
+  if (buffer.byteLength !== headerSize + 40 * count) return null;
+  const floatColumn = (k: number) => new Float64Array(buffer, headerSize + k * 8 * count, count);
+  const intColumn = (k: number) => new Int32Array(buffer, headerSize + 32 * count + k * 4 * count, count);
+  return {
+    iteration_id: view.getUint32(12, true),
+    count,
+    x_mm: floatColumn(0),
+    y_mm: floatColumn(1),
+    theta_deg: floatColumn(2),
+    t_mm: floatColumn(3),
+    sequence_index: intColumn(0),
+    mask_id: intColumn(1),
+  };
+}
+
+/**
+ * Fetches spots for an iteration in the binary format (typed arrays). Returns null on error.
+ */
+export async function fetchIterationSpotsBinary(
+  iterationId: number,
+  options?: PlanApiFetchOptions
+): Promise<IterationSpotsBinaryDto | null> {
+  const res = await apiFetch(`/api/iterations/${iterationId}/spots?format=bin`, { signal: options?.signal });
+  if (!res.ok) return null;
+  return decodeSpotsBinary(await res.arrayBuffer());
+}
+
 /**
  * Exports iteration as JSON blob. Returns null if not ok.
  */
@@ -178,10 +259,16 @@ export async function exportIterationCsv(iterationId: number): Promise<Blob | nu
 }
 
 /**
- * Exports iteration as image (png or jpg). Returns null if not ok.
+ * Exports iteration as image (png or jpg). Optional maxPx limits the longest side (faster preview).
+ * Returns null if not ok.
  */
-export async function exportIterationImage(iterationId: number, format: "png" | "jpg"): Promise<Blob | null> {
-  const res = await apiFetch(`/api/iterations/${iterationId}/export?format=${format}`);
+export async function exportIterationImage(
+  iterationId: number,
+  format: "png" | "jpg",
+  maxPx?: number
+): Promise<Blob | null> {
+  const query = maxPx ? `format=${format}&max_px=${maxPx}` : `format=${format}`;
+  const res = await apiFetch(`/api/iterations/${iterationId}/export?${query}`);
   if (!res.ok) return null;
   return res.blob();
 }
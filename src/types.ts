@@ -18,6 +18,9 @@ export interface ImageEntityDto {
   id: IdDto;
   storage_path: string;
   width_mm: number;
+  /** Pixel size captured at upload (null for images uploaded before it was stored). */
+  width_px?: number | null;
+  height_px?: number | null;
   created_by: IdDto | null;
   created_at: IsoDateTimeStringDto;
 }
@@ -115,7 +118,14 @@ export interface HealthStatusDto {
 // --- Image DTOs ---
 export type ImageDto = ImageEntityDto;
 
-export type ImageListResponseDto = PagedResultDto<ImageDto>;
+/** total may be null (with_total=false); next_cursor continues a created_at-sorted list. */
+export type ImageListResponseDto = Omit<PagedResultDto<ImageDto>, "total"> & {
+  total: number | null;
+  next_cursor?: string | null;
+};
+
+/** Variant served by GET /api/images/{id}/file?size= (thumb: 320 px, medium: 1280 px longest side). */
+export type ImageFileSize = "thumb" | "medium" | "full";
 
 // --- Mask DTOs ---
 export type MaskDto = Omit<MaskEntityDto, "vertices"> & {
@@ -129,19 +139,74 @@ export type IterationDto = Omit<PlanIterationEntityDto, "params_snapshot"> & {
   params_snapshot: IterationParamsSnapshotDto | null;
 };
 
-export type IterationListResponseDto = PagedResultDto<IterationDto>;
+export type IterationListResponseDto = Omit<PagedResultDto<IterationDto>, "total"> & {
+  total: number | null;
+  next_cursor?: string | null;
+};
+
+/** view=summary list row: no params_snapshot (fetch the iteration for it); algorithm_mode from its column. */
+export type IterationSummaryDto = Omit<PlanIterationEntityDto, "params_snapshot"> & {
+  algorithm_mode: "simple" | "advanced" | null;
+};
+
+export type IterationSummaryListResponseDto = Omit<PagedResultDto<IterationSummaryDto>, "total"> & {
+  total: number | null;
+  next_cursor?: string | null;
+};
+
+/** Background planning job: 202 body of POST /api/images/{id}/iterations, GET /api/plan-jobs/{job_id}. */
+export interface PlanJobDto {
+  job_id: string;
+  image_id: IdDto;
+  status: "queued" | "running" | "done" | "failed";
+  /** 0-1, stage based (queued 0, started 0.1, plan computed 0.8, saved 1). */
+  progress: number;
+  iteration_id: IdDto | null;
+  error: string | null;
+  created_at: IsoDateTimeStringDto;
+  started_at: IsoDateTimeStringDto | null;
+  finished_at: IsoDateTimeStringDto | null;
+}
 
 // --- Spot DTOs ---
 export type SpotDto = SpotEntityDto;
 
 export type IterationSpotsResponseDto = ItemsResultDto<SpotDto>;
 
+/**
+ * GET /api/iterations/{id}/spots?format=bin: columns as typed arrays (views on the response buffer).
+ * mask_id is -1 where the spot has no mask; component_id is not transmitted.
+ */
+export interface IterationSpotsBinaryDto {
+  iteration_id: IdDto;
+  count: number;
+  sequence_index: Int32Array;
+  x_mm: Float64Array;
+  y_mm: Float64Array;
+  theta_deg: Float64Array;
+  t_mm: Float64Array;
+  mask_id: Int32Array;
+}
+
+// --- Validation DTOs ---
+/** GET /api/iterations/{id}/validation: metrics recomputed from stored spots and current masks. */
+export interface IterationValidationDto {
+  iteration_id: IdDto;
+  spots_count: number;
+  spots_outside_mask_count: number;
+  overlap_count: number;
+  plan_valid: SqliteBoolDto;
+}
+
 // --- Audit log DTOs ---
 export type AuditLogEntryDto = Omit<AuditLogEntityDto, "payload"> & {
   payload: Record<string, unknown> | null;
 };
 
-export type AuditLogListResponseDto = PagedResultDto<AuditLogEntryDto>;
+/** next_cursor continues after the last item (null on the last page); pass it back as `cursor`. */
+export type AuditLogListResponseDto = PagedResultDto<AuditLogEntryDto> & {
+  next_cursor?: string | null;
+};
 
 // --- Export DTOs (JSON export) ---
 export type ExportMaskDto = Pick<MaskDto, "id" | "vertices" | "mask_label">;
@@ -192,6 +257,10 @@ export interface ImageListQueryCommand {
   page_size?: number;
   sort?: "created_at" | "id";
   order?: "asc" | "desc";
+  /** next_cursor of the previous page (keyset pagination; page is then ignored). */
+  cursor?: string;
+  /** false skips the total (total is then null). */
+  with_total?: boolean;
 }
 
 export interface MaskCreateCommand {
@@ -222,6 +291,12 @@ export interface IterationListQueryCommand {
   algorithm_mode?: "simple" | "advanced";
   sort?: "created_at" | "id";
   order?: "asc" | "desc";
+  /** next_cursor of the previous page (keyset pagination; page is then ignored). */
+  cursor?: string;
+  /** false skips the total (total is then null). */
+  with_total?: boolean;
+  /** summary omits params_snapshot. */
+  view?: "full" | "summary";
 }
 
 export interface SpotListQueryCommand {
@@ -238,6 +313,10 @@ export interface AuditLogListQueryCommand {
   to?: IsoDateTimeStringDto;
   sort?: "created_at";
   order?: "asc" | "desc";
+  /** next_cursor of the previous page (keyset pagination; page is then ignored). */
+  cursor?: string;
+  /** false skips the (approximate) total. */
+  with_total?: boolean;
 }
 
 export interface ExportQueryCommand {